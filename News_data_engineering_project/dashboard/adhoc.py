@@ -0,0 +1,184 @@
+"""Guarded execution of ad-hoc queries from the ClickHouse Browser and Neo4j Explorer.
+
+Both pages run whatever the user types. ``Limits`` bounds each run:
+- ClickHouse enforces the time, memory and row limits itself
+  (``clickhouse_settings``). Past ``max_rows`` the server stops reading rather
+  than failing the query, and ``readonly`` rejects writes and DDL. ``readonly``
+  has to be 2 so the limits can be sent with the query, and 2 would also let
+  the query raise them again. So queries with a ``SETTINGS`` clause or a
+  ``SET`` statement are rejected (``check_clickhouse_query``).
+- Neo4j gets the time limit as a transaction timeout and runs read-only
+  sessions. It has no per-query memory limit; ``dbms.memory.transaction.total.max``
+  on the server is the backstop.
+
+Results are streamed rather than fetched whole: ClickHouse blocks through
+``ClickHousePool.execute_iter``, and Neo4j records through the driver's result
+cursor, ``fetch_size`` at a time. At most ``max_rows`` are kept; anything past
+that is discarded by the server. ``on_progress(Progress)`` is called every
+``interval`` seconds, whether or not rows are arriving:
+- ClickHouse rows are read on a worker thread while the caller's thread
+  reports progress. Besides the rows received, ``Progress`` carries the rows
+  the server has read and expects to read, from its progress packets, so a
+  query that scans for a while before returning anything still moves.
+- Neo4j records are read on the caller's thread, which reports between
+  fetches.
+
+Streamlit interrupts a running script when the user clicks another widget, by
+raising from the next ``st`` call. Here that call is the progress callback.
+A ClickHouse query is then killed on the server, and the worker thread ends
+with it. A Neo4j stream is closed along with its session, which ends its
+transaction.
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, List
+
+from neo4j import READ_ACCESS, WRITE_ACCESS, Query
+
+
+@dataclass(frozen=True)
+class Limits:
+    """Per-run bounds for ad-hoc queries."""
+    max_rows: int = 10000
+    max_execution_time: int = 30  # seconds
+    max_memory_mb: int = 1024
+    read_only: bool = True
+
+    @classmethod
+    def from_env(cls):
+        """Limits from DASHBOARD_ADHOC_MAX_ROWS, _MAX_EXECUTION_TIME, _MAX_MEMORY_MB and _READ_ONLY."""
+        return cls(
+            max_rows=int(os.environ.get("DASHBOARD_ADHOC_MAX_ROWS", 10000)),
+            max_execution_time=int(os.environ.get("DASHBOARD_ADHOC_MAX_EXECUTION_TIME", 30)),
+            max_memory_mb=int(os.environ.get("DASHBOARD_ADHOC_MAX_MEMORY_MB", 1024)),
+            read_only=os.environ.get("DASHBOARD_ADHOC_READ_ONLY", "1") not in ("0", "false", "False"),
+        )
+
+    def describe(self):
+        text = f"{self.max_rows:,} rows · {self.max_execution_time}s · {self.max_memory_mb} MB"
+        return text + (" · read-only" if self.read_only else "")
+
+
+@dataclass
+class Progress:
+    rows: int  # received so far
+    elapsed_s: float
+    read_rows: int = 0  # read by the server, when it reports it
+    total_rows: int = 0  # the server's estimate of the rows it will read
+
+    def fraction(self, max_rows):
+        done = self.rows / max_rows
+        if self.total_rows:
+            done = max(done, self.read_rows / self.total_rows)
+        return min(done, 1.0)
+
+    def describe(self, unit="rows"):
+        text = f"{self.rows:,} {unit} in {self.elapsed_s:.1f}s"
+        if self.total_rows:
+            text += f" · read {self.read_rows:,} of ~{self.total_rows:,} rows"
+        return text
+
+
+@dataclass
+class StreamedResult:
+    rows: List[Any]
+    columns: List[str]
+    truncated: bool  # more rows existed past ``max_rows``
+    elapsed_s: float
+
+
+class QueryRejected(ValueError):
+    pass
+
+
+# String literals, quoted identifiers and comments, masked before looking for keywords.
+_QUOTED = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`(?:[^`\\]|\\.)*`|(?:--|#)[^\n]*|/\*.*?\*/""", re.S)
+# A SETTINGS clause anywhere (not a ``system.settings`` style name), or a SET statement.
+_OVERRIDES = re.compile(r"(?<![A-Za-z_]\.)\bSETTINGS\b|^\s*SET\b", re.I)
+
+
+def check_clickhouse_query(query):
+    """Raises QueryRejected if ``query`` would change settings, and with them the limits."""
+    if _OVERRIDES.search(_QUOTED.sub(" ", query)):
+        raise QueryRejected("Queries can't change settings (SETTINGS clause or SET); the limits above apply.")
+
+
+def clickhouse_settings(limits):
+    """Server-side settings enforcing ``limits`` on one query."""
+    settings = {
+        "max_execution_time": limits.max_execution_time,
+        "max_memory_usage": limits.max_memory_mb * 1024 * 1024,
+        # One row past the limit tells us the result was cut; "break" stops reading instead of failing.
+        "max_result_rows": limits.max_rows + 1,
+        "result_overflow_mode": "break",
+    }
+    if limits.read_only:
+        # 1 would refuse the settings above; check_clickhouse_query keeps the query from overriding them.
+        settings["readonly"] = 2
+    return settings
+
+
+def stream_clickhouse(pool, query, limits, on_progress=None, interval=0.25):
+    """Runs ``query`` on ``pool`` within ``limits``, keeping at most ``max_rows`` rows."""
+    check_clickhouse_query(query)
+    start = time.monotonic()
+    query_id = uuid.uuid4().hex
+    rows, columns, outcome = [], [], {"truncated": False}
+
+    def read():
+        try:
+            stream = pool.execute_iter(query, settings=clickhouse_settings(limits), with_column_types=True,
+                                       query_id=query_id)
+            with closing(stream):
+                columns.extend(name for name, _ in next(stream, []))
+                for row in stream:
+                    if len(rows) == limits.max_rows:
+                        outcome["truncated"] = True
+                        break
+                    rows.append(row)
+        except BaseException as e:
+            outcome["error"] = e
+
+    reader = threading.Thread(target=read, name=f"adhoc-{query_id}", daemon=True)
+    reader.start()
+    try:
+        while reader.is_alive():
+            reader.join(interval)
+            if on_progress and reader.is_alive():
+                read_rows, total_rows = pool.progress(query_id)
+                on_progress(Progress(len(rows), time.monotonic() - start, read_rows, total_rows))
+    except BaseException:
+        # Interrupted: stop the server, which ends the reader's stream; the rerun doesn't wait for it.
+        pool.kill(query_id)
+        raise
+    if "error" in outcome:
+        raise outcome["error"]
+    return StreamedResult(rows, columns, outcome["truncated"], round(time.monotonic() - start, 3))
+
+
+def stream_neo4j(driver, query, limits, on_progress=None, interval=0.25, fetch_size=100):
+    """Runs Cypher ``query`` within ``limits``, keeping at most ``max_rows`` records."""
+    start = reported = time.monotonic()
+    records, truncated = [], False
+    access_mode = READ_ACCESS if limits.read_only else WRITE_ACCESS
+    with driver.session(default_access_mode=access_mode, fetch_size=fetch_size) as session:
+        result = session.run(Query(query, timeout=limits.max_execution_time))
+        columns = list(result.keys())
+        for record in result:
+            if len(records) == limits.max_rows:
+                truncated = True
+                break
+            records.append(record)
+            # Records arrive fetch_size at a time, so this runs at least once per fetch.
+            now = time.monotonic()
+            if on_progress and now - reported >= interval:
+                reported = now
+                on_progress(Progress(len(records), now - start))
+        # Tells the server to drop the rest instead of sending it.
+        result.consume()
+    return StreamedResult(records, columns, truncated, round(time.monotonic() - start, 3))
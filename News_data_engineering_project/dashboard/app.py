@@ -1,15 +1,21 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from clickhouse_driver import Client
 import plotly.express as px
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import numpy as np
 from gnews import GNews
-from textblob import TextBlob
 from datetime import datetime
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from newsops_common.sentiment import get_engine
+import queries
+from local_engine import LocalEngine
+from utils import get_clickhouse_client as get_clickhouse_pool
 
 st.set_page_config(page_title="News Intelligence Dashboard", layout="wide")
 
@@ -136,83 +142,16 @@ st.markdown("""
 @st.cache_resource
 def get_clickhouse_client():
     # Attempt to load local data first (The "Bridge" Mode)
-    import json
-    import os
-    
     local_data_path = "../web_app/data/articles.json"
     if os.path.exists(local_data_path):
         try:
-            with open(local_data_path, "r") as f:
-                data = json.load(f)
-            
-            # Create a Mock Client that mimics execute() behavior on local data
-            class LocalClient:
-                def __init__(self, data):
-                    self.df = pd.DataFrame(data)
-                    # Ensure datetime
-                    self.df['published_at'] = pd.to_datetime(self.df['published_at'])
-                
-                def execute(self, query):
-                    # Simple mock query parser for the specific queries used in this app
-                    query = query.lower()
-                    
-                    # Handle COUNT queries (both count() and count(DISTINCT...))
-                    if "count" in query and "news_articles" in query:
-                         if "distinct publisher" in query:
-                             return [[len(self.df['publisher'].unique())]] if not self.df.empty else [[0]]
-                         if "distinct topic_id" in query:
-                             return [[len(self.df['topic_label'].unique())]] if not self.df.empty else [[0]]
-                         if "group by category" in query:
-                             if self.df.empty: return []
-                             grp = self.df.groupby('category').agg({'sentiment': 'mean', 'category': 'count'}).rename(columns={'category': 'count', 'sentiment': 'avg_sentiment'})
-                             # Format: category, count, avg_sentiment
-                             return [[idx, row['count'], row['avg_sentiment']] for idx, row in grp.iterrows()]
-                         if "group by topic_label" in query:
-                             if self.df.empty: return []
-                             grp = self.df['topic_label'].value_counts()
-                             return [[topic, count] for topic, count in grp.items()][:10]
-                         if "publisher is not null" in query: # Publisher stats
-                             if self.df.empty: return []
-                             grp = self.df['publisher'].value_counts()
-                             return [[pub, count] for pub, count in grp.items()][:10]
-                         if "length(locations) > 0" in query: # Geo/Network
-                             if self.df.empty: return []
-                             # Return title, locations, sentiment, category
-                             filtered = self.df[self.df['locations'].apply(lambda x: len(x) > 0 if isinstance(x, list) else False)]
-                             if "group by locations" in query: # Geo Heatmap
-                                return [] 
-                             
-                             # Network data
-                             return [[row['title'], row['locations'], row['sentiment'], row['category']] for _, row in filtered.iterrows()][:20]
-
-                         # Default to simple count()
-                         if "count()" in query or "count(*)" in query:
-                            return [[len(self.df)]]
-                    
-                    if "avg(sentiment)" in query:
-                        return [[self.df['sentiment'].mean()]] if not self.df.empty else [[0.0]]
-                    
-                    if "select title" in query and "limit 100" in query:
-                        return [[t] for t in self.df['title'].head(100)]
-                        
-                    if "tostartofhour" in query: # Sentiment trend
-                         # Mock trend buckets
-                         return [] 
-                         
-                    if "select title, publisher" in query: # Main feed
-                        return self.df[['title', 'publisher', 'category', 'sentiment', 'published_at', 'topic_label', 'locations']].head(20).values.tolist()
-
-                    return []
-
-            return LocalClient(data)
+            # The dashboard's own SQL, run on the snapshot by an embedded engine
+            return LocalEngine.from_json(local_data_path)
         except Exception as e:
             st.error(f"Failed to load local data: {e}")
-            pass
 
-    try:
-        return Client(host='clickhouse')
-    except:
-        return None
+    # One pool for the whole process, shared with the pages
+    return get_clickhouse_pool()
 
 client = get_clickhouse_client()
 
@@ -222,10 +161,11 @@ if client:
         st.markdown('<h2 class="section-header">📈 INTELLIGENCE METRICS</h2>', unsafe_allow_html=True)
         col1, col2, col3, col4 = st.columns(4)
         
-        total_articles = client.execute("SELECT count() FROM news_articles")[0][0]
-        avg_sentiment = client.execute("SELECT avg(sentiment) FROM news_articles")[0][0] or 0
-        unique_sources = client.execute("SELECT count(DISTINCT publisher) FROM news_articles")[0][0]
-        unique_topics = client.execute("SELECT count(DISTINCT topic_id) FROM news_articles WHERE topic_id >= 0")[0][0]
+        kpis = queries.kpis(client)
+        total_articles = kpis.articles
+        avg_sentiment = kpis.avg_sentiment
+        unique_sources = kpis.publishers
+        unique_topics = kpis.topics
         
         with col1:
             st.markdown(f'<div class="metric-card"><div class="big-number">{total_articles:,}</div><div class="metric-label">Total Articles</div></div>', unsafe_allow_html=True)
@@ -238,15 +178,11 @@ if client:
 
         # Category Breakdown
         st.markdown('<h2 class="section-header">📂 CATEGORY INTELLIGENCE</h2>', unsafe_allow_html=True)
-        category_data = client.execute("""
-            SELECT category, count() as count, avg(sentiment) as avg_sentiment
-            FROM news_articles 
-            GROUP BY category 
-            ORDER BY count DESC
-        """)
+        category_data = queries.category_breakdown(client)
         
         if category_data:
             df_cat = pd.DataFrame(category_data, columns=['Category', 'Count', 'Avg Sentiment'])
+            st.caption(queries.SENTIMENT_NOTE)
             
             col1, col2 = st.columns(2)
             with col1:
@@ -284,17 +220,10 @@ if client:
 
         # Topic Distribution
         st.markdown('<h2 class="section-header">📊 NEURAL TOPIC ANALYSIS</h2>', unsafe_allow_html=True)
-        topic_data = client.execute("""
-            SELECT topic_label, count() as count 
-            FROM news_articles 
-            WHERE topic_id >= 0 AND topic_label IS NOT NULL
-            GROUP BY topic_label 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
+        topic_data = queries.topic_breakdown(client, limit=10)
         
         if topic_data:
-            df_topics = pd.DataFrame(topic_data, columns=['Topic', 'Count'])
+            df_topics = pd.DataFrame([row[:2] for row in topic_data], columns=['Topic', 'Count'])
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             fig = px.bar(df_topics, x='Count', y='Topic', orientation='h',
                         title="Top 10 AI-Discovered Topics", color='Count',
@@ -309,15 +238,11 @@ if client:
 
         # Sentiment Trend
         st.markdown('<h2 class="section-header">📈 SENTIMENT INTELLIGENCE</h2>', unsafe_allow_html=True)
-        trend_data = client.execute("""
-            SELECT toStartOfHour(published_at) as hour, avg(sentiment) as sentiment
-            FROM news_articles 
-            GROUP BY hour 
-            ORDER BY hour
-        """)
+        trend_data = queries.hourly_series(client)
         
         if trend_data:
-            df_trend = pd.DataFrame(trend_data, columns=['Hour', 'Sentiment'])
+            df_trend = pd.DataFrame([(hour, sentiment) for hour, _, sentiment in trend_data], columns=['Hour', 'Sentiment'])
+            st.caption(queries.SENTIMENT_NOTE)
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             fig = px.line(df_trend, x='Hour', y='Sentiment', 
                          title="Real-time Sentiment Analysis")
@@ -392,67 +317,52 @@ if client:
                 st.plotly_chart(fig_map, use_container_width=True)
                 st.markdown('</div>', unsafe_allow_html=True)
         
-        # Entity Network (ClickHouse-based)
+        # Entity Network: co-mention graph precomputed by the pipeline (PageRank, communities, layout)
         st.markdown('<h2 class="section-header">🕸️ ENTITY NETWORK</h2>', unsafe_allow_html=True)
         
-        network_data = client.execute("""
-            SELECT title, locations, sentiment, category
-            FROM news_articles 
-            WHERE length(locations) > 0
-            LIMIT 20
-        """)
+        nodes, edges = queries.entity_network(client, limit=150)
         
-        if network_data:
+        if nodes:
             col_net1, col_net2 = st.columns(2)
             
             with col_net1:
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                st.markdown("### Article-Location Network")
+                st.markdown("### Publisher · Topic · Location Network")
                 
-                import networkx as nx
-                G = nx.Graph()
+                df_nodes = pd.DataFrame(nodes, columns=['Id', 'Kind', 'Name', 'Articles', 'PageRank', 'Community', 'X', 'Y'])
+                pos = dict(zip(df_nodes['Id'], zip(df_nodes['X'], df_nodes['Y'])))
                 
-                for row in network_data:
-                    title = row[0][:20] + '...' if len(row[0]) > 20 else row[0]
-                    locations = row[1] if row[1] else []
-                    sentiment = row[2]
-                    
-                    for location in locations[:2]:
-                        G.add_edge(title, location, weight=abs(sentiment))
+                edge_x, edge_y = [], []
+                for source, target, _ in edges:
+                    x0, y0 = pos[source]
+                    x1, y1 = pos[target]
+                    edge_x.extend([x0, x1, None])
+                    edge_y.extend([y0, y1, None])
                 
-                if G.nodes():
-                    pos = nx.spring_layout(G, k=1, iterations=30)
-                    
-                    edge_x, edge_y = [], []
-                    for edge in G.edges():
-                        x0, y0 = pos[edge[0]]
-                        x1, y1 = pos[edge[1]]
-                        edge_x.extend([x0, x1, None])
-                        edge_y.extend([y0, y1, None])
-                    
-                    node_x = [pos[node][0] for node in G.nodes()]
-                    node_y = [pos[node][1] for node in G.nodes()]
-                    node_text = list(G.nodes())
-                    
-                    fig_network = go.Figure(data=[
-                        go.Scatter(x=edge_x, y=edge_y, mode='lines', line=dict(width=1, color='rgba(125,125,125,0.5)'), hoverinfo='none'),
-                        go.Scatter(x=node_x, y=node_y, mode='markers+text', text=node_text, textposition="middle center",
-                                 marker=dict(size=8, color='#00ff88'), hoverinfo='text', textfont=dict(size=8))
-                    ])
-                    
-                    fig_network.update_layout(
-                        showlegend=False,
-                        height=400,
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        font=dict(color='white'),
-                        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
-                    )
-                    
-                    st.plotly_chart(fig_network, use_container_width=True)
-                else:
-                    st.info("No network relationships found")
+                # Size by PageRank, colour by community; only the top-ranked entities are labelled.
+                size = 6 + 30 * np.sqrt(df_nodes['PageRank'] / df_nodes['PageRank'].max())
+                labels = [name if i < 25 else '' for i, name in enumerate(df_nodes['Name'])]
+                hover = [f"{name} ({kind})<br>{articles} articles · community {community}"
+                         for name, kind, articles, community in zip(df_nodes['Name'], df_nodes['Kind'], df_nodes['Articles'], df_nodes['Community'])]
+                
+                fig_network = go.Figure(data=[
+                    go.Scatter(x=edge_x, y=edge_y, mode='lines', line=dict(width=0.5, color='rgba(125,125,125,0.4)'), hoverinfo='none'),
+                    go.Scatter(x=df_nodes['X'], y=df_nodes['Y'], mode='markers+text', text=labels, textposition="top center",
+                             hovertext=hover, hoverinfo='text', textfont=dict(size=8),
+                             marker=dict(size=size, color=df_nodes['Community'] % 10, colorscale='Turbo', line=dict(width=0)))
+                ])
+                
+                fig_network.update_layout(
+                    showlegend=False,
+                    height=400,
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='white'),
+                    xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                    yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
+                )
+                
+                st.plotly_chart(fig_network, use_container_width=True)
                 
                 st.markdown('</div>', unsafe_allow_html=True)
             
@@ -460,36 +370,27 @@ if client:
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                 st.markdown("### Location Stats")
                 
-                all_locations = []
-                for row in network_data:
-                    if row[1]:
-                        all_locations.extend(row[1])
+                location_counts = queries.top_entities(client, 'location', limit=8)
                 
-                if all_locations:
-                    from collections import Counter
-                    location_counts = Counter(all_locations).most_common(8)
-                    
-                    if location_counts:
-                        df_loc = pd.DataFrame(location_counts, columns=['Location', 'Count'])
-                        fig_loc = px.bar(df_loc, x='Count', y='Location', orientation='h',
-                                       title="Most Mentioned Locations")
-                        fig_loc.update_layout(
-                            height=400,
-                            paper_bgcolor='rgba(0,0,0,0)',
-                            plot_bgcolor='rgba(0,0,0,0)',
-                            font=dict(color='white')
-                        )
-                        st.plotly_chart(fig_loc, use_container_width=True)
-                    else:
-                        st.info("No location data available")
+                if location_counts:
+                    df_loc = pd.DataFrame(location_counts, columns=['Location', 'Count', 'Links', 'PageRank'])
+                    fig_loc = px.bar(df_loc, x='Count', y='Location', orientation='h',
+                                   hover_data=['Links'], title="Most Mentioned Locations")
+                    fig_loc.update_layout(
+                        height=400,
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='white')
+                    )
+                    st.plotly_chart(fig_loc, use_container_width=True)
                 else:
                     st.info("No location mentions found")
-                
+
                 st.markdown('</div>', unsafe_allow_html=True)
-        
+
         else:
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-            st.info("No network data available. Run the pipeline to populate location data.")
+            st.info("No entity graph yet. Run the pipeline's entity_graph asset to build it.")
             st.markdown('</div>', unsafe_allow_html=True)
 
         # Enhanced Article Feed
@@ -513,12 +414,11 @@ if client:
                     try:
                         news = google_news.get_news(category)
                         for article in news[:4]:
-                            sentiment = TextBlob(article.get('title', '')).sentiment.polarity
                             live_articles.append({
                                 'Title': article.get('title', 'No Title'),
                                 'Publisher': article.get('publisher', {}).get('title', 'Unknown'),
                                 'Category': category,
-                                'Sentiment': sentiment,
+                                'Sentiment': 0.0,
                                 'Published': datetime.now(),
                                 'Topic': 'Live Feed',
                                 'Locations': []
@@ -526,7 +426,10 @@ if client:
                     except Exception as e:
                         st.warning(f"GNews error for {category}: {e}")
                 
-                return pd.DataFrame(live_articles)
+                live_df = pd.DataFrame(live_articles)
+                if not live_df.empty:
+                    live_df['Sentiment'] = get_engine().polarity_of(live_df['Title'])
+                return live_df
             
             df_articles = fetch_live_news()
         else:
@@ -546,14 +449,7 @@ if client:
             
             # Get publisher stats from ClickHouse
             try:
-                publisher_stats = client.execute("""
-                    SELECT publisher, count() as article_count
-                    FROM news_articles 
-                    WHERE publisher IS NOT NULL AND publisher != ''
-                    GROUP BY publisher
-                    ORDER BY article_count DESC
-                    LIMIT 10
-                """)
+                publisher_stats = queries.top_publishers(client, limit=10)
                 publisher_data = {row[0]: row[1] for row in publisher_stats}
             except:
                 publisher_data = {}
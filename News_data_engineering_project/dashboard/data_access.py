@@ -0,0 +1,337 @@
+"""Shared ClickHouse access for the dashboard.
+
+A ``clickhouse_driver.Client`` holds one connection and is not thread-safe, and
+Streamlit runs every viewer's session on its own thread. ``ClickHousePool``
+keeps up to ``size`` clients and lends each one to a single query at a time, so
+all sessions share a few warm connections instead of opening one per rerun.
+It exposes ``execute`` with the same signature as ``Client.execute``, so pages
+use it like a client.
+
+Every query gets ``max_execution_time`` unless the caller overrides it. Reads
+that fail because the connection dropped (server restart, idle timeout) are
+retried once on a fresh connection. Per-query call counts, errors and timings
+are kept for ``stats()``.
+
+``execute_iter`` streams a result on a pooled connection, which stays lent out
+until the rows are read. If the iterator is closed early, for example when the
+page reading it is interrupted, the query is killed on the server instead of
+running to completion. While it runs, ``progress`` reports what the server
+has read so far, and ``kill`` stops it from another thread.
+
+``QueryCache`` wraps a pool and keeps read results in memory for every session,
+keyed by SQL, params and settings. Entries expire after ``ttl`` seconds, and
+the least recently used ones are evicted once the cache holds more than
+``max_bytes``. The data only changes when the pipeline loads it, so the cache
+also watches the ``data_version`` stamp that ``load_to_clickhouse`` writes to
+``table_options``. It checks the stamp at most every ``version_interval``
+seconds and drops every entry when it changes.
+"""
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from clickhouse_driver import Client, errors
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Safe to run twice: nothing the dashboard reads with these changes data.
+_READ_PREFIXES = ("SELECT", "WITH", "SHOW", "DESCRIBE", "DESC", "EXISTS", "EXPLAIN")
+
+_CONNECTION_ERRORS = (errors.NetworkError, errors.SocketTimeoutError, EOFError, ConnectionError, OSError)
+
+
+class PoolExhausted(RuntimeError):
+    """No connection became free within the pool's ``acquire_timeout``."""
+
+
+def query_label(query, width=80):
+    """One-line form of a query, used as its key in the timing stats."""
+    return _WHITESPACE.sub(" ", str(query)).strip()[:width]
+
+
+class QueryStats:
+    """Per-query call counts, errors, rows and timings, keyed by ``query_label``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, query, elapsed, rows):
+        """Adds one call to the query's stats; ``rows`` is None for a failed call."""
+        label = query_label(query)
+        with self._lock:
+            entry = self._entries.setdefault(label, {"calls": 0, "errors": 0, "rows": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["calls"] += 1
+            entry["errors"] += rows is None
+            entry["rows"] += rows or 0
+            entry["total_s"] += elapsed
+            entry["max_s"] = max(entry["max_s"], elapsed)
+
+    def rows(self):
+        """One dict per query, slowest total first."""
+        with self._lock:
+            queries = [{"query": label, **entry, "avg_ms": round(entry["total_s"] / entry["calls"] * 1000, 2)}
+                       for label, entry in self._entries.items()]
+        queries.sort(key=lambda q: q["total_s"], reverse=True)
+        return queries
+
+
+def result_rows(result, with_column_types=False):
+    """Row count of an ``execute`` result, for the stats."""
+    rows = result[0] if with_column_types else result
+    return len(rows) if isinstance(rows, list) else 0
+
+
+class ClickHousePool:
+    """Thread-safe pool of ClickHouse clients with default query settings and timing stats."""
+
+    def __init__(self, host="clickhouse", port=9000, size=8, max_execution_time=30, acquire_timeout=10.0,
+                 connect_timeout=5, **client_kwargs):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.settings = {"max_execution_time": max_execution_time}
+        self.client_kwargs = {"connect_timeout": connect_timeout, **client_kwargs}
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = QueryStats()
+        self._streams = {}
+        self._created = 0
+        self._reconnects = 0
+        self._waits = 0
+
+    def _new_client(self):
+        with self._lock:
+            self._created += 1
+        return Client(host=self.host, port=self.port, **self.client_kwargs)
+
+    @contextmanager
+    def client(self):
+        """Lends a client for several statements; it goes back to the pool afterwards."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._waits += 1
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                raise PoolExhausted(f"No ClickHouse connection free after {self.acquire_timeout}s "
+                                   f"(pool size {self.size})")
+        try:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                client = self._new_client()
+            try:
+                yield client
+            except errors.ServerException:
+                # The server rejected the query; the connection itself is fine.
+                raise
+            except BaseException:
+                # A client that failed mid-query may hold a half-read response; it reconnects on next use.
+                client.disconnect()
+                raise
+            finally:
+                self._idle.put(client)
+        finally:
+            self._slots.release()
+
+    def execute(self, query, params=None, settings=None, **kwargs):
+        """``Client.execute`` on a pooled connection, with the pool's default settings."""
+        settings = {**self.settings, **(settings or {})}
+        retry = str(query).lstrip().upper().startswith(_READ_PREFIXES)
+        start = time.perf_counter()
+        try:
+            try:
+                with self.client() as client:
+                    result = client.execute(query, params, settings=settings, **kwargs)
+            except _CONNECTION_ERRORS:
+                if not retry:
+                    raise
+                with self._lock:
+                    self._reconnects += 1
+                # The failed client was disconnected and reconnects on its next query.
+                with self.client() as client:
+                    result = client.execute(query, params, settings=settings, **kwargs)
+        except Exception:
+            self._stats.record(query, time.perf_counter() - start, None)
+            raise
+        self._stats.record(query, time.perf_counter() - start, result_rows(result, kwargs.get("with_column_types")))
+        return result
+
+    def execute_iter(self, query, params=None, settings=None, **kwargs):
+        """``Client.execute_iter`` on a pooled connection; closing it before the end kills the query.
+
+        Streams are not retried: rows may already have been handed out.
+        """
+        settings = {**self.settings, **(settings or {})}
+        query_id = kwargs.pop("query_id", None) or uuid.uuid4().hex
+        chunked = kwargs.get("chunk_size", 1) > 1
+        start = time.perf_counter()
+        # With column types, the first item streamed is the (name, type) list.
+        rows = -1 if kwargs.get("with_column_types") else 0
+        failed = finished = False
+        try:
+            with self.client() as client:
+                with self._lock:
+                    self._streams[query_id] = client
+                for item in client.execute_iter(query, params, settings=settings, query_id=query_id, **kwargs):
+                    rows += len(item) if chunked else 1
+                    yield item
+            finished = True
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._streams.pop(query_id, None)
+            self._stats.record(query, time.perf_counter() - start, None if failed else max(rows, 0))
+            if not finished:
+                # The lent client was disconnected; make sure the server stops working on the query too.
+                self.kill(query_id)
+
+    def progress(self, query_id):
+        """(rows read, rows to read) the server last reported for a running ``execute_iter`` query."""
+        with self._lock:
+            client = self._streams.get(query_id)
+        info = client.last_query if client is not None else None
+        if info is None:
+            return 0, 0
+        return info.progress.rows, info.progress.total_rows
+
+    def kill(self, query_id):
+        """Asks the server to stop the query with ``query_id``; failures are ignored."""
+        try:
+            self.execute("KILL QUERY WHERE query_id = %(query_id)s ASYNC", {"query_id": query_id})
+        except Exception:
+            pass
+
+    def stats(self):
+        """Pool counters and per-query timings, slowest total first."""
+        with self._lock:
+            pool = {"size": self.size, "connections_created": self._created, "idle": self._idle.qsize(),
+                    "reconnects": self._reconnects, "waits": self._waits}
+        return {"pool": pool, "queries": self._stats.rows()}
+
+    def disconnect(self):
+        while True:
+            try:
+                self._idle.get_nowait().disconnect()
+            except queue.Empty:
+                return
+
+
+_DATA_VERSION_QUERY = """
+    SELECT value FROM table_options FINAL WHERE table = 'news_articles' AND option = 'data_version'
+"""
+
+
+def result_size(value):
+    """Approximate memory held by a query result, in bytes."""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """Read-through cache of query results shared by all sessions, invalidated by the pipeline's data version."""
+
+    def __init__(self, pool, ttl=300, max_bytes=64 * 1024 * 1024, version_interval=10.0):
+        self.pool = pool
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.version_interval = version_interval
+        self._entries = OrderedDict()  # key -> (expires_at, size, result), least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked = 0.0
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _check_version(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._version_checked < self.version_interval:
+                return
+            self._version_checked = now
+        try:
+            rows = self.pool.execute(_DATA_VERSION_QUERY)
+        except errors.ServerException:
+            # No pipeline run has written table_options yet; entries still expire by TTL.
+            rows = []
+        version = rows[0][0] if rows else None
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._counts["invalidations"] += 1
+                self._version = version
+                self._entries.clear()
+                self._bytes = 0
+
+    def execute(self, query, params=None, settings=None, ttl=None, **kwargs):
+        """``Client.execute`` served from the cache for reads; ``ttl`` overrides the default for this query."""
+        if not str(query).lstrip().upper().startswith(_READ_PREFIXES):
+            return self.pool.execute(query, params, settings=settings, **kwargs)
+        self._check_version()
+        key = (query, repr(params), repr(settings), repr(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+                return entry[2]
+            self._counts["misses"] += 1
+        version = self._version
+        result = self.pool.execute(query, params, settings=settings, **kwargs)
+        size = result_size(result)
+        with self._lock:
+            # Results larger than the whole cache, or read before an invalidation, are not kept.
+            if size > self.max_bytes or version != self._version:
+                return result
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (now + (self.ttl if ttl is None else ttl), size, result)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._counts["evictions"] += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """The pool's stats plus cache counters under ``cache``."""
+        with self._lock:
+            cache = {**self._counts, "entries": len(self._entries), "mb": round(self._bytes / 1024 / 1024, 2),
+                     "data_version": self._version or "none"}
+        return {**self.pool.stats(), "cache": cache}
+
+
+def pool_from_env():
+    """Pool configured by CLICKHOUSE_HOST, CLICKHOUSE_PORT, CLICKHOUSE_POOL_SIZE and CLICKHOUSE_MAX_EXECUTION_TIME."""
+    return ClickHousePool(
+        host=os.environ.get("CLICKHOUSE_HOST", "clickhouse"),
+        port=int(os.environ.get("CLICKHOUSE_PORT", 9000)),
+        size=int(os.environ.get("CLICKHOUSE_POOL_SIZE", 8)),
+        max_execution_time=int(os.environ.get("CLICKHOUSE_MAX_EXECUTION_TIME", 30)),
+    )
+
+
+def cache_from_env(pool):
+    """Cache over ``pool`` configured by DASHBOARD_CACHE_TTL (seconds) and DASHBOARD_CACHE_MB."""
+    return QueryCache(
+        pool,
+        ttl=int(os.environ.get("DASHBOARD_CACHE_TTL", 300)),
+        max_bytes=int(os.environ.get("DASHBOARD_CACHE_MB", 64)) * 1024 * 1024,
+    )
@@ -0,0 +1,252 @@
+"""Embedded query engine for the dashboard's offline ("bridge") mode.
+
+When ``web_app/data/articles.json`` exists, the dashboard runs its own SQL on
+that snapshot instead of a ClickHouse server. ``LocalEngine`` does the
+following:
+- It normalizes the snapshot to the ``news_articles`` columns. Locations are
+  geocoded with the offline gazetteer, so the map has coordinates, and
+  ``topic_id`` is derived from ``topic_label``.
+- It writes the result once to Parquet, cached by the snapshot's size and
+  modification time.
+- It queries the Parquet file with DuckDB.
+
+The entity graph tables (``entity_graph_nodes``, ``entity_graph_edges``) are
+built from the snapshot with the pipeline's own ``newsops_common.entity_graph``
+and cached as Parquet next to the articles.
+
+The rollup tables are views with one row per article. ``sum(articles)`` counts
+articles, and ``uniqMerge`` of a state column counts distinct values.
+
+The ClickHouse-dialect shim is small:
+- ClickHouse functions the dashboard uses are defined as DuckDB macros
+  (``_MACROS``).
+- ``FINAL`` is dropped, since the snapshot holds one row per URL.
+- pyformat parameters are inlined as SQL literals.
+
+Engine errors are raised as clickhouse_driver's ``ServerException``, so callers
+handle a missing table or a bad query the same way as with the server.
+``LocalEngine.execute`` has the same signature as ``Client.execute``.
+
+To profile the dashboard's aggregate queries without a server, run
+``python local_engine.py [--repeat N] [snapshot.json]``.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+import duckdb
+import pandas as pd
+from clickhouse_driver.errors import ServerException
+
+from data_access import QueryStats, result_rows
+
+DEFAULT_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "web_app", "data", "articles.json")
+
+_MACROS = [
+    "CREATE MACRO toStartOfHour(x) AS date_trunc('hour', x)",
+    "CREATE MACRO toStartOfMinute(x) AS date_trunc('minute', x)",
+    "CREATE MACRO toStartOfDay(x) AS date_trunc('day', x)",
+    "CREATE MACRO toDate(x) AS CAST(x AS DATE)",
+    "CREATE MACRO toYYYYMM(x) AS year(x) * 100 + month(x)",
+    "CREATE MACRO today() AS current_date",
+    "CREATE MACRO uniq(x) AS count(DISTINCT x)",
+    "CREATE MACRO uniqExact(x) AS count(DISTINCT x)",
+    "CREATE MACRO uniqExactIf(x, cond) AS count(DISTINCT CASE WHEN cond THEN x END)",
+    "CREATE MACRO uniqMerge(x) AS count(DISTINCT x)",
+    "CREATE MACRO uniqMergeIf(x, cond) AS count(DISTINCT CASE WHEN cond THEN x END)",
+]
+
+# Rollup table -> expression for its time bucket, as in etl/news_pipeline/warehouse.py.
+_ROLLUPS = {
+    "news_rollup_hourly": "date_trunc('hour', published_at)",
+    "news_rollup_daily": "CAST(published_at AS DATE)",
+}
+
+_FINAL = re.compile(r"\bFINAL\b", re.IGNORECASE)
+_PARAM = re.compile(r"%\((\w+)\)s|%%")
+
+
+def literal(value):
+    """SQL literal for a query parameter."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        return f"TIMESTAMP '{value.replace(tzinfo=None).isoformat(sep=' ')}'"
+    if isinstance(value, date):
+        return f"DATE '{value.isoformat()}'"
+    if isinstance(value, (list, tuple, set)):
+        return "(" + ", ".join(literal(v) for v in value) + ")"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def to_duckdb(query, params=None):
+    """Rewrites a dashboard query in ClickHouse dialect for DuckDB, inlining ``params``."""
+    query = _FINAL.sub("", str(query))
+    if not params:
+        return query
+    return _PARAM.sub(lambda m: literal(params[m.group(1)]) if m.group(1) else "%", query)
+
+
+def snapshot_frame(records, gazetteer=None):
+    """The snapshot's articles as ``news_articles`` rows, one per URL."""
+    df = pd.DataFrame(records)
+    for column, default in [("title", ""), ("description", ""), ("url", ""), ("publisher", "Unknown"),
+                            ("category", "General"), ("topic_label", "General"), ("sentiment", 0.0)]:
+        if column not in df.columns:
+            df[column] = default
+        df[column] = df[column].fillna(default)
+    if "content" not in df.columns:
+        df["content"] = df["description"]
+    df["content"] = df["content"].fillna(df["description"])
+    df = df.drop_duplicates(subset=["url"], keep="last").reset_index(drop=True)
+
+    published = pd.to_datetime(df.get("published_at"), utc=True, errors="coerce", format="mixed")
+    df["published_at"] = published.dt.tz_convert(None).fillna(pd.Timestamp.now(tz="UTC").tz_convert(None))
+    df["processed_at"] = df["published_at"]
+    df["sentiment"] = df["sentiment"].astype("float64")
+    df["url_hash"] = pd.util.hash_pandas_object(df["url"], index=False).astype("uint64")
+    if "topic_id" not in df.columns:
+        # Labels like "3_election_vote" carry their id; others get one per distinct label.
+        ids = df["topic_label"].str.extract(r"^(-?\d+)_", expand=False)
+        codes = pd.Series(pd.factorize(df["topic_label"])[0], index=df.index)
+        df["topic_id"] = ids.astype("float").fillna(codes).astype("int32")
+
+    # Only names the gazetteer resolves are kept, paired one to one with their coordinates.
+    locations, coordinates = [], []
+    for names in df.get("locations", pd.Series([[]] * len(df))):
+        names = names if isinstance(names, list) else []
+        places = [(name, gazetteer.lookup(name) if gazetteer else None) for name in names]
+        resolved = [(name, place) for name, place in places if place is not None]
+        locations.append([name for name, _ in resolved])
+        coordinates.append([[place.lat, place.lon] for _, place in resolved])
+    df["locations"] = locations
+    df["coordinates"] = coordinates
+
+    columns = ["url_hash", "title", "description", "content", "published_at", "url", "publisher", "category",
+               "sentiment", "processed_at", "topic_id", "topic_label", "locations", "coordinates"]
+    return df[columns]
+
+
+def snapshot_groups(frame):
+    """(publisher, topic_label, locations, articles) per distinct combination, as ``warehouse.entity_groups``."""
+    locations = frame["locations"].map(lambda names: tuple(sorted(set(names))))
+    counts = frame.assign(locations=locations).groupby(["publisher", "topic_label", "locations"]).size()
+    return [(publisher, topic_label, list(names), int(n)) for (publisher, topic_label, names), n in counts.items()]
+
+
+def graph_paths(parquet_path):
+    """Parquet files holding the entity graph built from the articles in ``parquet_path``."""
+    stem = parquet_path[:-len(".parquet")]
+    return {"entity_graph_nodes": f"{stem}.nodes.parquet", "entity_graph_edges": f"{stem}.edges.parquet"}
+
+
+def _write_parquet(frame, path):
+    partial = f"{path}.{os.getpid()}.tmp"
+    with duckdb.connect() as connection:
+        connection.register("frame", frame)
+        connection.execute(f"COPY frame TO '{partial}' (FORMAT PARQUET)")
+    os.replace(partial, path)
+
+
+class LocalEngine:
+    """Runs the dashboard's ClickHouse queries on a local snapshot with DuckDB."""
+
+    def __init__(self, parquet_path):
+        self.parquet_path = parquet_path
+        self._connection = duckdb.connect()
+        self._connection.execute("SET TimeZone = 'UTC'")
+        for statement in _MACROS:
+            self._connection.execute(statement)
+        path = parquet_path.replace("'", "''")
+        self._connection.execute(f"CREATE VIEW news_articles AS SELECT * FROM read_parquet('{path}')")
+        for table, graph_path in graph_paths(parquet_path).items():
+            if os.path.exists(graph_path):
+                graph_path = graph_path.replace("'", "''")
+                self._connection.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{graph_path}')")
+        for table, bucket in _ROLLUPS.items():
+            self._connection.execute(f"""
+                CREATE VIEW {table} AS
+                SELECT {bucket} AS bucket, category, topic_id, topic_label, publisher,
+                       1 AS articles, sentiment AS sentiment_sum,
+                       url_hash AS articles_uniq, publisher AS publishers_uniq, topic_id AS topics_uniq
+                FROM news_articles
+            """)
+        self._lock = threading.Lock()
+        self._stats = QueryStats()
+
+    @classmethod
+    def from_json(cls, path=DEFAULT_SNAPSHOT, cache_dir=None):
+        """Engine over a JSON snapshot, converted to Parquet on first use and when the file changes."""
+        info = os.stat(path)
+        cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "newsops_bridge")
+        os.makedirs(cache_dir, exist_ok=True)
+        parquet_path = os.path.join(cache_dir, f"articles-{info.st_size}-{info.st_mtime_ns}.parquet")
+        if not os.path.exists(parquet_path):
+            from newsops_common.entity_graph import build
+            from newsops_common.gazetteer import get_gazetteer
+
+            with open(path, "r") as f:
+                frame = snapshot_frame(json.load(f), get_gazetteer())
+            # The graph is written first: the articles file marks the cache as complete.
+            graph = build(snapshot_groups(frame))
+            computed_at = datetime.utcfromtimestamp(info.st_mtime).replace(microsecond=0)
+            paths = graph_paths(parquet_path)
+            _write_parquet(graph.nodes.assign(computed_at=computed_at), paths["entity_graph_nodes"])
+            _write_parquet(graph.edges.assign(computed_at=computed_at), paths["entity_graph_edges"])
+            _write_parquet(frame, parquet_path)
+        return cls(parquet_path)
+
+    def execute(self, query, params=None, settings=None, with_column_types=False, **kwargs):
+        """``Client.execute`` on the snapshot; ``settings`` are accepted and ignored."""
+        sql = to_duckdb(query, params)
+        start = time.perf_counter()
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            cursor.execute(sql)
+            rows = cursor.fetchall()
+            columns = [(column[0], str(column[1])) for column in cursor.description or []]
+        except duckdb.Error as e:
+            self._stats.record(query, time.perf_counter() - start, None)
+            raise ServerException(str(e)) from e
+        finally:
+            cursor.close()
+        result = (rows, columns) if with_column_types else rows
+        self._stats.record(query, time.perf_counter() - start, result_rows(result, with_column_types))
+        return result
+
+    def stats(self):
+        return {"pool": {"engine": "duckdb", "snapshot": os.path.basename(self.parquet_path)},
+                "queries": self._stats.rows()}
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    import queries
+
+    parser = argparse.ArgumentParser(description="Profile the dashboard's aggregate queries on a local snapshot.")
+    parser.add_argument("snapshot", nargs="?", default=DEFAULT_SNAPSHOT)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = LocalEngine.from_json(args.snapshot)
+    for _ in range(args.repeat):
+        queries.kpis(engine)
+        queries.category_breakdown(engine)
+        queries.topic_breakdown(engine)
+        queries.top_publishers(engine)
+        queries.hourly_series(engine)
+        queries.daily_series(engine)
+    for row in engine.stats()["queries"]:
+        print(f"{row['avg_ms']:>9.2f} ms  {row['calls']:>3} calls  {row['rows']:>6} rows  {row['query']}")
@@ -1,12 +1,12 @@
 import streamlit as st
 import pandas as pd
-from utils import apply_style, get_clickhouse_client
+from utils import apply_style, get_cached_clickhouse_client
 
 apply_style()
 
 st.title("📰 All Articles")
 
-client = get_clickhouse_client()
+client = get_cached_clickhouse_client()
 
 try:
     # Filters
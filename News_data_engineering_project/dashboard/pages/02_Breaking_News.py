@@ -1,41 +1,39 @@
 import streamlit as st
 import pandas as pd
-from utils import apply_style, get_clickhouse_client
+from utils import apply_style, get_cached_clickhouse_client
+import queries
 
 apply_style()
 
 st.title("🚨 Breaking News")
 
-client = get_clickhouse_client()
+client = get_cached_clickhouse_client()
 
 try:
-    # Breaking news logic: High sentiment impact or keywords
-    query = """
-        SELECT title, publisher, category, sentiment, published_at, url
-        FROM news_articles 
-        WHERE (
-            abs(sentiment) > 0.7 OR
-            title ILIKE '%BREAKING%' OR 
-            title ILIKE '%URGENT%' OR
-            title ILIKE '%ALERT%'
-        )
-        AND published_at >= now() - INTERVAL 24 HOUR
-        ORDER BY published_at DESC
-        LIMIT 20
-    """
-    
-    data = client.execute(query)
-    df = pd.DataFrame(data, columns=['Title', 'Publisher', 'Category', 'Sentiment', 'Published', 'URL'])
-    
+    # Bursts flagged by the pipeline's detect_breaking_news: volume or sentiment far from the rolling baseline
+    data = queries.bursts(client, hours=24, limit=20)
+    df = pd.DataFrame(data, columns=['Start', 'End', 'Kind', 'Key', 'Signal', 'Articles', 'Sentiment', 'Expected', 'Score'])
+
     if not df.empty:
+        st.caption("Categories, topics and locations whose coverage in an hour broke from their usual level, strongest first.")
         for _, row in df.iterrows():
-            sentiment_color = "#ff4b4b" if row['Sentiment'] < 0 else "#00ff88"
+            if row['Signal'] == 'volume':
+                headline = f"📈 {row['Key']} — {row['Articles']} articles, usually {row['Expected']:.1f}"
+                border = "#ffb020"
+            else:
+                headline = f"{'📉' if row['Score'] < 0 else '📊'} {row['Key']} — sentiment {row['Sentiment']:.2f}, usually {row['Expected']:.2f}"
+                border = "#ff4b4b" if row['Score'] < 0 else "#00ff88"
+            articles = queries.burst_articles(client, row['Kind'], row['Key'], row['Start'], row['End'], limit=5)
+            links = "".join(
+                f'<li><a href="{url}" target="_blank" style="color: #4da6ff; text-decoration: none;">{title}</a>'
+                f' <span style="color: #aaa;">{publisher} • {sentiment:.2f}</span></li>'
+                for title, publisher, sentiment, _, url in articles
+            )
             st.markdown(f"""
-            <div style="padding: 1rem; border-radius: 10px; background: rgba(255,255,255,0.05); margin-bottom: 1rem; border-left: 5px solid {sentiment_color};">
-                <h3 style="margin:0">{row['Title']}</h3>
-                <p style="color: #aaa; margin: 0.5rem 0;">{row['Publisher']} • {row['Category']} • {row['Published']}</p>
-                <p>Sentiment: <span style="color:{sentiment_color}">{row['Sentiment']:.2f}</span></p>
-                <a href="{row['URL']}" target="_blank" style="color: #4da6ff; text-decoration: none;">Read Article →</a>
+            <div style="padding: 1rem; border-radius: 10px; background: rgba(255,255,255,0.05); margin-bottom: 1rem; border-left: 5px solid {border};">
+                <h3 style="margin:0">{headline}</h3>
+                <p style="color: #aaa; margin: 0.5rem 0;">{row['Kind'].title()} • {row['Start']:%Y-%m-%d %H:%M}–{row['End']:%H:%M} • z = {row['Score']:.1f}</p>
+                <ul style="margin: 0;">{links}</ul>
             </div>
             """, unsafe_allow_html=True)
     else:
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils import apply_style, get_clickhouse_client
+from utils import apply_style, get_cached_clickhouse_client
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 
@@ -9,7 +9,7 @@ apply_style()
 
 st.title("🔍 Topic Extraction")
 
-client = get_clickhouse_client()
+client = get_cached_clickhouse_client()
 
 try:
     # Fetch topic labels
@@ -1,13 +1,13 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils import apply_style, get_clickhouse_client
+from utils import apply_style, get_cached_clickhouse_client
 
 apply_style()
 
 st.title("📍 NER & Locations")
 
-client = get_clickhouse_client()
+client = get_cached_clickhouse_client()
 
 try:
     # Fetch locations and coordinates
@@ -1,24 +1,19 @@
 import streamlit as st
 import pandas as pd
-from utils import apply_style, get_clickhouse_client
+import plotly.express as px
+from utils import apply_style, get_cached_clickhouse_client
+import queries
 
 apply_style()
 
 st.title("📥 Ingestion Monitor")
 
-client = get_clickhouse_client()
+client = get_cached_clickhouse_client()
 
 try:
     # Articles per hour
-    query = """
-        SELECT toStartOfHour(published_at) as hour, count() as count 
-        FROM news_articles 
-        WHERE published_at >= now() - INTERVAL 24 HOUR 
-        GROUP BY hour 
-        ORDER BY hour
-    """
-    data = client.execute(query)
-    df = pd.DataFrame(data, columns=['Hour', 'Articles'])
+    data = queries.hourly_series(client, hours=24)
+    df = pd.DataFrame(data, columns=['Hour', 'Articles', 'Sentiment'])
     
     st.subheader("Ingestion Rate (Last 24 Hours)")
     if not df.empty:
@@ -29,7 +24,7 @@ try:
         st.info("No ingestion data for the last 24 hours.")
         
     # Total stats
-    total = client.execute("SELECT count() FROM news_articles")[0][0]
+    total = queries.kpis(client).articles
     st.metric("Total Articles Ingested", total)
 
 except Exception as e:
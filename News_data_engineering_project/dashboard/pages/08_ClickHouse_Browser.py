@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from adhoc import Limits, stream_clickhouse
 from utils import apply_style, get_clickhouse_client
 
 apply_style()
@@ -7,16 +8,36 @@ apply_style()
 st.title("🗄️ ClickHouse Browser")
 
 client = get_clickhouse_client()
+limits = Limits.from_env()
 
 query = st.text_area("Enter SQL Query", "SELECT * FROM news_articles LIMIT 10", height=150)
+st.caption(f"Limits per query: {limits.describe()}")
 
-if st.button("Run Query"):
+col_run, col_cancel = st.columns([1, 6])
+run = col_run.button("Run Query")
+# Clicking Cancel reruns the page, which interrupts a running query and kills it on the server.
+if col_cancel.button("Cancel") and st.session_state.pop("clickhouse_browser_running", False):
+    st.warning("Query cancelled.")
+
+if run:
+    progress = st.progress(0.0, text="Running query...")
+
+    def on_progress(status):
+        progress.progress(status.fraction(limits.max_rows), text=status.describe())
+
+    st.session_state["clickhouse_browser_running"] = True
     try:
-        data = client.execute(query)
-        if data:
-            st.success(f"Returned {len(data)} rows.")
-            st.dataframe(pd.DataFrame(data), use_container_width=True)
+        result = stream_clickhouse(client, query, limits, on_progress)
+        progress.empty()
+        if result.rows:
+            st.success(f"Returned {len(result.rows):,} rows in {result.elapsed_s:.2f}s.")
+            if result.truncated:
+                st.warning(f"Result cut off at {limits.max_rows:,} rows.")
+            st.dataframe(pd.DataFrame(result.rows, columns=result.columns), use_container_width=True)
         else:
             st.info("Query returned no results.")
     except Exception as e:
+        progress.empty()
         st.error(f"Query Error: {e}")
+    # Left set when the run is interrupted, so the rerun can tell a cancel from a stray click.
+    st.session_state.pop("clickhouse_browser_running", None)
@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
-from clickhouse_driver import Client
+from utils import get_clickhouse_client
 import plotly.express as px
 import plotly.graph_objects as go
 from textblob import TextBlob
 import numpy as np
+import queries
 
 # st.set_page_config(page_title="AI Insights", layout="wide")
 
@@ -36,28 +37,18 @@ st.markdown("""
 
 st.markdown('<h1 class="ai-header">🤖 AI INSIGHTS ENGINE</h1>', unsafe_allow_html=True)
 
-@st.cache_resource
-def get_client():
-    try:
-        return Client(host='clickhouse')
-    except:
-        return None
-
-client = get_client()
+client = get_clickhouse_client()
 
 if client:
     # AI Sentiment Predictions
     st.markdown("## 🧠 Sentiment Intelligence")
     
-    sentiment_data = client.execute("""
-        SELECT category, avg(sentiment) as avg_sentiment, count() as articles
-        FROM news_articles 
-        GROUP BY category
-        ORDER BY avg_sentiment DESC
-    """)
+    sentiment_data = queries.category_breakdown(client)
     
     if sentiment_data:
-        df_sentiment = pd.DataFrame(sentiment_data, columns=['Category', 'Sentiment', 'Articles'])
+        df_sentiment = pd.DataFrame(sentiment_data, columns=['Category', 'Articles', 'Sentiment'])
+        df_sentiment = df_sentiment.sort_values('Sentiment', ascending=False)
+        st.caption(queries.SENTIMENT_NOTE)
         
         col1, col2 = st.columns(2)
         
@@ -88,14 +79,7 @@ if client:
     # Topic Clustering
     st.markdown("## 🎯 Topic Intelligence")
     
-    topic_data = client.execute("""
-        SELECT topic_label, count() as count, avg(sentiment) as sentiment
-        FROM news_articles 
-        WHERE topic_label IS NOT NULL
-        GROUP BY topic_label
-        ORDER BY count DESC
-        LIMIT 8
-    """)
+    topic_data = queries.topic_breakdown(client, limit=8, assigned_only=False)
     
     if topic_data:
         df_topics = pd.DataFrame(topic_data, columns=['Topic', 'Count', 'Sentiment'])
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from clickhouse_driver import Client
+from utils import get_clickhouse_client
 from neo4j import GraphDatabase
 import json
 from datetime import datetime
@@ -29,7 +29,7 @@ st.markdown("# 📤 EXPORT INTELLIGENCE")
 @st.cache_resource
 def get_clients():
     try:
-        clickhouse = Client(host='clickhouse')
+        clickhouse = get_clickhouse_client()
         neo4j_driver = GraphDatabase.driver("bolt://neo4j:7687", auth=("neo4j", "password"))
         return clickhouse, neo4j_driver
     except:
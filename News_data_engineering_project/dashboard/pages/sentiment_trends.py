@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
-from clickhouse_driver import Client
+from utils import get_clickhouse_client
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 from datetime import datetime, timedelta
 import networkx as nx
+import queries
 
 # st.set_page_config(page_title="Analytics", layout="wide")
 
@@ -71,10 +72,6 @@ header { visibility: hidden !important; }
 
 st.markdown('<h1 class="section-title">🔬 ADVANCED ANALYTICS</h1>', unsafe_allow_html=True)
 
-@st.cache_resource
-def get_clickhouse_client():
-    return Client(host='clickhouse')
-
 try:
     client = get_clickhouse_client()
     
@@ -82,17 +79,18 @@ try:
     st.markdown('<h2 class="section-title">📈 INTELLIGENCE METRICS</h2>', unsafe_allow_html=True)
     
     col1, col2, col3, col4 = st.columns(4)
+    kpis = queries.kpis(client)
     
     with col1:
-        total_articles = client.execute("SELECT count() FROM news_articles")[0][0]
+        total_articles = kpis.articles
         st.markdown(f'<div class="analytics-card"><div class="metric-big">{total_articles:,}</div><p style="text-align:center; color:#888;">Total Articles</p></div>', unsafe_allow_html=True)
     
     with col2:
-        avg_sentiment = client.execute("SELECT avg(sentiment) FROM news_articles")[0][0] or 0
+        avg_sentiment = kpis.avg_sentiment
         st.markdown(f'<div class="analytics-card"><div class="metric-big">{avg_sentiment:.3f}</div><p style="text-align:center; color:#888;">Global Sentiment</p></div>', unsafe_allow_html=True)
     
     with col3:
-        unique_topics = client.execute("SELECT count(DISTINCT topic_id) FROM news_articles WHERE topic_id >= 0")[0][0]
+        unique_topics = kpis.topics
         st.markdown(f'<div class="analytics-card"><div class="metric-big">{unique_topics}</div><p style="text-align:center; color:#888;">Unique Topics</p></div>', unsafe_allow_html=True)
     
     with col4:
@@ -102,14 +100,11 @@ try:
     # Correlation Analysis
     st.markdown('<h2 class="section-title">🔗 CORRELATION MATRIX</h2>', unsafe_allow_html=True)
     
-    correlation_data = client.execute("""
-        SELECT category, avg(sentiment) as avg_sentiment, count() as article_count
-        FROM news_articles 
-        GROUP BY category
-    """)
+    correlation_data = queries.category_breakdown(client)
     
     if correlation_data:
-        df_corr = pd.DataFrame(correlation_data, columns=['Category', 'Sentiment', 'Count'])
+        df_corr = pd.DataFrame(correlation_data, columns=['Category', 'Count', 'Sentiment'])
+        st.caption(queries.SENTIMENT_NOTE)
         
         # Create correlation heatmap
         corr_matrix = df_corr[['Sentiment', 'Count']].corr()
@@ -136,16 +131,13 @@ try:
     st.markdown('<h2 class="section-title">🔮 PREDICTIVE INSIGHTS</h2>', unsafe_allow_html=True)
     
     pred_col1, pred_col2 = st.columns(2)
+    # One rollup read feeds both charts.
+    daily = queries.daily_series(client, days=7)
+    st.caption(queries.SENTIMENT_NOTE)
     
     with pred_col1:
         # Sentiment forecast
-        sentiment_trend = client.execute("""
-            SELECT toStartOfDay(published_at) as date, avg(sentiment) as sentiment
-            FROM news_articles 
-            WHERE published_at >= now() - INTERVAL 7 DAY
-            GROUP BY date 
-            ORDER BY date
-        """)
+        sentiment_trend = [(date, sentiment) for date, _, sentiment in daily]
         
         if sentiment_trend:
             df_sentiment = pd.DataFrame(sentiment_trend, columns=['Date', 'Sentiment'])
@@ -191,13 +183,7 @@ try:
     
     with pred_col2:
         # Volume prediction
-        volume_trend = client.execute("""
-            SELECT toStartOfDay(published_at) as date, count() as count
-            FROM news_articles 
-            WHERE published_at >= now() - INTERVAL 7 DAY
-            GROUP BY date 
-            ORDER BY date
-        """)
+        volume_trend = [(date, count) for date, count, _ in daily]
         
         if volume_trend:
             df_volume = pd.DataFrame(volume_trend, columns=['Date', 'Count'])
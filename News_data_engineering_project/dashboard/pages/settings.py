@@ -117,7 +117,9 @@ with col3:
 st.markdown('</div>', unsafe_allow_html=True)
 
 if st.button("💾 Save Settings", type="primary"):
+    # Keep keys this page doesn't edit (e.g. the pipeline's "ingest" block).
     new_settings = {
+        **current_settings,
         "refresh_interval": refresh_interval,
         "max_articles": max_articles,
         "sentiment_threshold": sentiment_threshold,
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from clickhouse_driver import Client
+from utils import get_cached_clickhouse_client, get_clickhouse_client
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
@@ -100,7 +100,7 @@ col1, col2 = st.columns(2)
 with col1:
     st.markdown("### ClickHouse")
     try:
-        client = Client(host='clickhouse')
+        client = get_clickhouse_client()
         count = client.execute("SELECT count() FROM news_articles")[0][0]
         st.success(f"✅ Connected - {count} articles")
         
@@ -147,4 +147,12 @@ df_metrics = pd.DataFrame(metrics_data)
 fig = px.bar(df_metrics, x='Component', y='Response Time (ms)', 
              color='Status', color_discrete_map={'Healthy': '#4ade80', 'Offline': '#f87171'})
 fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
-st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+st.plotly_chart(fig, use_container_width=True)
+
+# Dashboard query timings, across every session served by this process
+st.markdown("## ⏱️ Dashboard Queries")
+query_stats = get_cached_clickhouse_client().stats()
+st.caption(" | ".join(f"{k.replace('_', ' ')}: {v}" for k, v in query_stats['pool'].items()))
+st.caption("Result cache — " + " | ".join(f"{k.replace('_', ' ')}: {v}" for k, v in query_stats['cache'].items()))
+if query_stats['queries']:
+    st.dataframe(pd.DataFrame(query_stats['queries']), use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""Dashboard aggregates, read from the ClickHouse rollup tables.
+
+``news_rollup_hourly`` and ``news_rollup_daily`` are kept up to date by
+materialized views on ``news_articles`` (see etl/news_pipeline/warehouse.py).
+They hold one row per (bucket, category, topic, publisher) group, so these
+queries cost the same however many articles have been loaded. Row-level
+queries (latest articles, locations, anomalies) still read ``news_articles``.
+
+Article counts come from the ``articles_uniq`` state, so an article that was
+reloaded with a newer version counts once. Average sentiment is
+``sum(sentiment_sum) / sum(articles)``, which weighs an article once per
+load; pages showing it carry ``SENTIMENT_NOTE``.
+
+``kpis`` returns the headline metrics as one ``Kpis`` object. It reads them from
+``news_kpi_snapshot``, which the pipeline writes at the end of each load, so
+each page needs a single round trip for them.
+
+``entity_network`` and ``top_entities`` read the newest co-mention graph that
+the pipeline's ``entity_graph`` asset stores, with PageRank, community and
+layout already computed. No graph is built while a page renders.
+
+``bursts`` reads the breaking-news alerts of the pipeline's
+``detect_breaking_news`` asset, and ``burst_articles`` the articles behind one.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from clickhouse_driver.errors import ServerException
+
+HOURLY = "news_rollup_hourly"
+DAILY = "news_rollup_daily"
+KPI_SNAPSHOT = "news_kpi_snapshot"
+GRAPH_NODES = "entity_graph_nodes"
+GRAPH_EDGES = "entity_graph_edges"
+BURSTS = "news_bursts"
+_LATEST_GRAPH = f"computed_at = (SELECT max(computed_at) FROM {GRAPH_NODES})"
+
+SENTIMENT_NOTE = "Average sentiment weighs each load of an article, so reloaded articles count more than once."
+
+
+@dataclass(frozen=True)
+class Kpis:
+    """Headline metrics shown at the top of the dashboard."""
+    articles: int
+    avg_sentiment: float
+    publishers: int
+    topics: int
+    computed_at: Optional[datetime] = None  # None when computed from the rollups rather than a snapshot
+
+
+def kpis(client):
+    """The newest pipeline KPI snapshot, or the same metrics from the daily rollup in one query.
+
+    The snapshot counts each article once; the rollup fallback estimates the
+    distinct articles, publishers and topics.
+    """
+    try:
+        rows = client.execute(f"""
+            SELECT articles, avg_sentiment, publishers, topics, computed_at
+            FROM {KPI_SNAPSHOT}
+            ORDER BY computed_at DESC
+            LIMIT 1
+        """)
+    except ServerException:
+        # The pipeline hasn't created the snapshot table yet.
+        rows = []
+    if rows:
+        articles, sentiment, publishers, topics, computed_at = rows[0]
+        return Kpis(int(articles), float(sentiment), int(publishers), int(topics), computed_at)
+    articles, sentiment, publishers, topics = client.execute(f"""
+        SELECT uniqMerge(articles_uniq), if(sum(articles) = 0, 0, sum(sentiment_sum) / sum(articles)),
+               uniqMerge(publishers_uniq), uniqMergeIf(topics_uniq, topic_id >= 0)
+        FROM {DAILY}
+    """)[0]
+    return Kpis(int(articles or 0), float(sentiment or 0.0), int(publishers or 0), int(topics or 0))
+
+
+def category_breakdown(client):
+    """(category, articles, average sentiment) rows, largest first."""
+    return client.execute(f"""
+        SELECT category, uniqMerge(articles_uniq) AS count, sum(sentiment_sum) / sum(articles) AS avg_sentiment
+        FROM {DAILY}
+        GROUP BY category
+        ORDER BY count DESC
+    """)
+
+
+def topic_breakdown(client, limit=10, assigned_only=True):
+    """(topic label, articles, average sentiment) rows for the largest topics."""
+    where = "WHERE topic_id >= 0" if assigned_only else ""
+    return client.execute(f"""
+        SELECT topic_label, uniqMerge(articles_uniq) AS count, sum(sentiment_sum) / sum(articles) AS sentiment
+        FROM {DAILY}
+        {where}
+        GROUP BY topic_label
+        ORDER BY count DESC
+        LIMIT {int(limit)}
+    """)
+
+
+def top_publishers(client, limit=10):
+    """(publisher, articles) rows for the most active publishers."""
+    return client.execute(f"""
+        SELECT publisher, uniqMerge(articles_uniq) AS article_count
+        FROM {DAILY}
+        WHERE publisher != ''
+        GROUP BY publisher
+        ORDER BY article_count DESC
+        LIMIT {int(limit)}
+    """)
+
+
+def hourly_series(client, hours=None):
+    """(hour, articles, average sentiment) rows, oldest first; all history if ``hours`` is None."""
+    where = f"WHERE bucket >= now() - INTERVAL {int(hours)} HOUR" if hours else ""
+    return client.execute(f"""
+        SELECT bucket AS hour, uniqMerge(articles_uniq) AS count, sum(sentiment_sum) / sum(articles) AS sentiment
+        FROM {HOURLY}
+        {where}
+        GROUP BY hour
+        ORDER BY hour
+    """)
+
+
+def daily_series(client, days=7):
+    """(day, articles, average sentiment) rows for the last ``days`` days, oldest first."""
+    return client.execute(f"""
+        SELECT bucket AS date, uniqMerge(articles_uniq) AS count, sum(sentiment_sum) / sum(articles) AS sentiment
+        FROM {DAILY}
+        WHERE bucket >= today() - {int(days)}
+        GROUP BY date
+        ORDER BY date
+    """)
+
+
+def entity_network(client, limit=150):
+    """(nodes, edges) of the newest entity graph, or two empty lists before the pipeline has built one.
+
+    Nodes are (node_id, kind, name, articles, pagerank, community, x, y) rows for
+    the ``limit`` highest-ranked laid-out entities; edges are (source, target,
+    weight) rows between them.
+    """
+    try:
+        nodes = client.execute(f"""
+            SELECT node_id, kind, name, articles, pagerank, community, x, y
+            FROM {GRAPH_NODES}
+            WHERE {_LATEST_GRAPH} AND x IS NOT NULL
+            ORDER BY pagerank DESC
+            LIMIT {int(limit)}
+        """)
+        edges = client.execute(f"""
+            SELECT source, target, weight
+            FROM {GRAPH_EDGES}
+            WHERE {_LATEST_GRAPH}
+        """)
+    except ServerException:
+        return [], []
+    shown = {row[0] for row in nodes}
+    return nodes, [edge for edge in edges if edge[0] in shown and edge[1] in shown]
+
+
+def top_entities(client, kind, limit=8):
+    """(name, articles, degree, pagerank) rows for the most mentioned entities of one kind."""
+    try:
+        return client.execute(f"""
+            SELECT name, articles, degree, pagerank
+            FROM {GRAPH_NODES}
+            WHERE {_LATEST_GRAPH} AND kind = %(kind)s
+            ORDER BY articles DESC
+            LIMIT {int(limit)}
+        """, {"kind": kind})
+    except ServerException:
+        return []
+
+
+# Burst kind -> condition selecting its articles, by the key in %(key)s.
+_BURST_MATCH = {
+    "category": "category = %(key)s",
+    "topic": "topic_label = %(key)s",
+    "location": "has(locations, %(key)s)",
+}
+
+
+def bursts(client, hours=24, limit=20):
+    """(bucket, bucket_end, kind, key, signal, articles, sentiment, expected, score) rows, strongest first.
+
+    Empty before the pipeline has detected anything.
+    """
+    try:
+        return client.execute(f"""
+            SELECT bucket, bucket_end, kind, key, signal, articles, sentiment, expected, score
+            FROM {BURSTS} FINAL
+            WHERE bucket_end >= now() - INTERVAL {int(hours)} HOUR
+            ORDER BY abs(score) DESC
+            LIMIT {int(limit)}
+        """)
+    except ServerException:
+        return []
+
+
+def burst_articles(client, kind, key, start, end, limit=5):
+    """(title, publisher, sentiment, published_at, url) rows of the articles in one burst, newest first."""
+    return client.execute(f"""
+        SELECT title, publisher, sentiment, published_at, url
+        FROM news_articles FINAL
+        WHERE published_at >= %(start)s AND published_at < %(end)s AND {_BURST_MATCH[kind]}
+        ORDER BY published_at DESC
+        LIMIT {int(limit)}
+    """, {"key": key, "start": start, "end": end})
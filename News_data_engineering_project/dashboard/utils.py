@@ -1,5 +1,5 @@
 import streamlit as st
-from clickhouse_driver import Client
+from data_access import cache_from_env, pool_from_env
 from neo4j import GraphDatabase
 import os
 
@@ -56,8 +56,15 @@ def apply_style():
     </style>
     """, unsafe_allow_html=True)
 
+@st.cache_resource
 def get_clickhouse_client():
-    return Client(host='clickhouse')
+    """Connection pool shared by every session and page; use it like a Client."""
+    return pool_from_env()
+
+@st.cache_resource
+def get_cached_clickhouse_client():
+    """Like get_clickhouse_client, but reads are served from a result cache shared by every session."""
+    return cache_from_env(get_clickhouse_client())
 
 def get_neo4j_driver():
     return GraphDatabase.driver("bolt://neo4j:7687", auth=("neo4j", "password"))
@@ -1,37 +1,36 @@
 from dagster import asset, Output, MetadataValue
 import pandas as pd
-from gnews import GNews
-from textblob import TextBlob
 from datetime import datetime
 from clickhouse_driver import Client
 from neo4j import GraphDatabase
 import logging
-try:
-    from bertopic import BERTopic
-except ImportError:
-    class BERTopic:
-        def __init__(self, *args, **kwargs): pass
-        def fit_transform(self, docs): return [0]*len(docs), [0.5]*len(docs)
-        def get_topic_info(self): return pd.DataFrame({'Topic': [0, 1], 'Count': [10, 5], 'Name': ['Mock Topic 1', 'Mock Topic 2']})
-
-import spacy
-from geopy.geocoders import Nominatim
 import json
 import os
+import time
+from .fetching import fetch_concurrently
+from .geocoding import GeocodeCache, Geocoder
+from .ner import LOCATION_LABELS, OPTIONAL_LABELS, extract_entities
+from .nlp_cache import NLPCache, version_of
+from .resources import NLPModels
+from .seen_index import SeenIndex
+from .topic_model import assign_topics
+from .warehouse import (aligned_locations, apply_ttl, bump_data_version, duplicate_urls, insert_columnar, loaded_versions,
+                        migrate, row_versions)
+from newsops_common.gazetteer import get_gazetteer
+from newsops_common.graph import UPSERT_ARTICLES, article_rows, ensure_constraints, write_batches
+from newsops_common.locations import LocationIndex
+from newsops_common.sources import make_source
+from newsops_common.topics import TopicClassifier, load_taxonomy
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    logger.info("Downloading spaCy model...")
-    import subprocess
-    subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
-    nlp = spacy.load("en_core_web_sm")
-
 CONFIG_PATH = "/opt/dagster/app/shared_config/settings.json"
 
+STATE_DIR = os.path.join(os.environ.get("DAGSTER_HOME", "."), "newsops_state")
+
+ARTICLE_COLUMNS = ["title", "description", "published_at", "url", "publisher", "category"]
+
 def load_settings():
     try:
         if os.path.exists(CONFIG_PATH):
@@ -41,165 +40,271 @@ def load_settings():
         logger.warning(f"Failed to load settings: {e}")
     return {}
 
+def get_seen_index(settings):
+    """Returns the persistent seen-article index, or None if it is disabled."""
+    cfg = settings.get("seen_index", {})
+    if not cfg.get("enabled", True):
+        return None
+    return SeenIndex(
+        cfg.get("path", os.path.join(STATE_DIR, "seen_index")),
+        expected_items=cfg.get("expected_items", 1_000_000),
+        fp_rate=cfg.get("fp_rate", 0.01),
+    )
+
+def get_nlp_cache(settings):
+    """Returns the persistent NLP result cache, or None if it is disabled."""
+    cfg = settings.get("nlp_cache", {})
+    if not cfg.get("enabled", True):
+        return None
+    return NLPCache(
+        cfg.get("path", os.path.join(STATE_DIR, "nlp_cache.sqlite")),
+        max_entries=cfg.get("max_entries", 500_000),
+        max_bytes=int(cfg.get("max_mb", 256) * 1024 * 1024),
+    )
+
+def get_location_index(settings):
+    cfg = settings.get("geocoding", {})
+    return LocationIndex(get_gazetteer(cfg.get("gazetteer_path"), cfg.get("geonames_path")))
+
+def get_geocoder(settings, nlp_models):
+    """Cache -> gazetteer -> Nominatim geocoder configured by the ``geocoding`` settings block."""
+    cfg = settings.get("geocoding", {})
+    return Geocoder(
+        GeocodeCache(cfg.get("cache_path", os.path.join(STATE_DIR, "geocode_cache.sqlite"))),
+        get_gazetteer(cfg.get("gazetteer_path"), cfg.get("geonames_path")),
+        remote_factory=nlp_models.geocoder if cfg.get("remote", True) else None,
+        max_remote=cfg.get("max_remote_lookups", 100),
+        min_delay_s=cfg.get("min_delay_s", 1.0),
+        negative_ttl_days=cfg.get("negative_ttl_days", 30),
+    )
+
+def cached_nlp(cache, kind, version, texts, compute):
+    """Runs ``compute`` over ``texts`` through the NLP cache when it is enabled."""
+    if cache is None:
+        texts = list(texts)
+        return list(compute(texts)), {"cache_hits": 0, "cache_misses": len(texts), "computed": len(texts)}
+    return cache.map(kind, version, texts, compute)
+
 @asset
 def ingest_news():
     """Fetches news from configured categories."""
     settings = load_settings()
     max_results = settings.get("max_articles", 20)
     categories = settings.get("active_categories", ['Technology', 'Business', 'Sports', 'Health', 'Politics'])
+    ingest_cfg = settings.get("ingest", {})
+    countries = ingest_cfg.get("countries", ['US'])
+
+    source = make_source(settings.get("source"), max_results=max_results, period='1d')
+
+    logger.info(f"Fetching news from {source.name} with max_results={max_results} for categories={categories} countries={countries}...")
+
+    fetch_started = time.perf_counter()
+    results = fetch_concurrently(
+        lambda country, category: source.get_news(category, country=country),
+        [(country, category) for country in countries for category in categories],
+        max_workers=ingest_cfg.get("max_workers", 4),
+        timeout=ingest_cfg.get("timeout_s", 30),
+        retries=ingest_cfg.get("retries", 2),
+        backoff=ingest_cfg.get("backoff_s", 1.0),
+        total_timeout=ingest_cfg.get("total_timeout_s"),
+    )
+
+    fetch_seconds = time.perf_counter() - fetch_started
 
-    logger.info(f"Fetching news from GNews with max_results={max_results} for categories={categories}...")
-    google_news = GNews(language='en', country='US', period='1d', max_results=max_results)
-    
     all_data = []
-    
-    for category in categories:
-        try:
-            news = google_news.get_news(category)
-            for article in news:
-                all_data.append({
-                    "title": article.get('title', 'No Title'),
-                    "description": article.get('description', ''),
-                    "published_at": article.get('published date'),
-                    "url": article.get('url', ''),
-                    "publisher": article.get('publisher', {}).get('title', 'Unknown'),
-                    "category": category
-                })
-        except Exception as e:
-            logger.warning(f"Failed to fetch {category}: {e}")
-    
-    df = pd.DataFrame(all_data)
+
+    for result in results:
+        if not result.ok:
+            logger.warning(f"Failed to fetch {result.category} ({result.country}): {result.error}")
+            continue
+        for article in result.articles:
+            all_data.append({
+                "title": article.get('title', 'No Title'),
+                "description": article.get('description', ''),
+                "published_at": article.get('published date'),
+                "url": article.get('url', ''),
+                "publisher": article.get('publisher', {}).get('title', 'Unknown'),
+                "category": result.category
+            })
+
+    df = pd.DataFrame(all_data, columns=ARTICLE_COLUMNS)
+    # The same story is often listed under several countries.
+    df = df.drop_duplicates(subset=['url', 'category']).reset_index(drop=True)
     df['published_at'] = pd.to_datetime(df['published_at'], errors='coerce').fillna(datetime.now())
-    
-    logger.info(f"Fetched {len(df)} articles across {len(categories)} categories.")
-    return Output(df, metadata={"num_records": len(df), "categories": len(categories)})
+
+    failed = [r for r in results if not r.ok]
+    logger.info(f"Fetched {len(df)} articles across {len(categories)} categories ({len(failed)} of {len(results)} fetches failed).")
+
+    # Only articles no earlier run has loaded flow downstream; they are marked seen in load_to_clickhouse.
+    seen_stats = {}
+    seen_index = get_seen_index(settings)
+    if seen_index is not None and not df.empty:
+        unseen, seen_stats = seen_index.split(df)
+        df = df[unseen].reset_index(drop=True)
+        logger.info(f"Seen index: {seen_stats['seen_hits']} already processed, {seen_stats['seen_misses']} new.")
+
+    return Output(df, metadata={
+        **seen_stats,
+        "num_records": len(df),
+        "source": source.name,
+        "categories": len(categories),
+        "countries": len(countries),
+        "failed_fetches": len(failed),
+        "fetch_seconds": round(fetch_seconds, 3),
+        "fetches": MetadataValue.json([r.summary() for r in results]),
+    })
 
 @asset
-def process_news(ingest_news: pd.DataFrame):
-    """Analyzes sentiment using TextBlob."""
+def process_news(ingest_news: pd.DataFrame, nlp_models: NLPModels):
+    """Analyzes sentiment with the batch TextBlob-compatible engine."""
     df = ingest_news.copy()
-    
-    def get_sentiment(text):
-        if not text: return 0.0
-        return TextBlob(str(text)).sentiment.polarity
 
-    df['sentiment'] = df['title'].apply(get_sentiment)
+    start = time.perf_counter()
+    sentiments, cache_stats = cached_nlp(
+        get_nlp_cache(load_settings()), "sentiment", nlp_models.sentiment_version(), df['title'],
+        lambda texts: nlp_models.sentiment().polarity_of(texts).tolist(),
+    )
+    elapsed = time.perf_counter() - start
+
+    df['sentiment'] = pd.Series(sentiments, index=df.index, dtype=float)
     df['processed_at'] = datetime.now()
     
-    logger.info(f"Processed sentiment for {len(df)} articles.")
-    return Output(df, metadata={"avg_sentiment": float(df['sentiment'].mean())})
+    logger.info(f"Processed sentiment for {len(df)} articles in {elapsed:.3f}s "
+                f"({cache_stats['cache_hits']} from cache).")
+    return Output(df, metadata={
+        "avg_sentiment": float(df['sentiment'].mean()) if not df.empty else 0.0,
+        "sentiment_seconds": round(elapsed, 3),
+        "titles_per_second": round(len(df) / elapsed, 1) if elapsed > 0 else 0.0,
+        **cache_stats,
+        "model_load_seconds": MetadataValue.json(nlp_models.load_seconds()),
+    })
 
 @asset
 def extract_topics(process_news: pd.DataFrame):
-    """Extracts topics using BERTopic."""
+    """Assigns keyword topics with the shared compiled topic classifier, or BERTopic topics if enabled."""
     df = process_news.copy()
+    settings = load_settings()
+    topics_cfg = settings.get("topics", {})
     
-    # Use simple keyword-based topic extraction for speed
-    documents = df['title'].tolist()  # Only use titles for speed
-    
-    # Simple topic assignment based on keywords
-    def assign_topic(title):
-        title_lower = str(title).lower()
-        if any(word in title_lower for word in ['tech', 'ai', 'digital', 'cyber']):
-            return 0, 'Technology'
-        elif any(word in title_lower for word in ['business', 'market', 'economy', 'finance']):
-            return 1, 'Business'
-        elif any(word in title_lower for word in ['sport', 'game', 'player', 'team']):
-            return 2, 'Sports'
-        elif any(word in title_lower for word in ['health', 'medical', 'hospital', 'doctor']):
-            return 3, 'Health'
-        elif any(word in title_lower for word in ['politic', 'government', 'election', 'policy']):
-            return 4, 'Politics'
-        else:
-            return -1, 'General'
-    
-    topics_labels = [assign_topic(title) for title in documents]
-    topics = [t[0] for t in topics_labels]
-    topic_labels = {t[0]: t[1] for t in topics_labels}
-    
-    df['topic_id'] = topics
-    
-    df['topic_label'] = df['topic_id'].map(topic_labels)
-    
-    unique_topics = len(set(topics))
-    logger.info(f"Extracted {unique_topics} topics using fast keyword matching.")
-    return Output(df, metadata={"num_topics": unique_topics})
+    if topics_cfg.get("mode") == "bertopic":
+        try:
+            ids, labels, stats = assign_topics(
+                df['title'].tolist(), topics_cfg.get("bertopic", {}), os.path.join(STATE_DIR, "topic_model"),
+            )
+        except ImportError as e:
+            logger.warning(f"BERTopic mode unavailable ({e}), using keyword topics.")
+            ids, stats = None, {}
+        if ids is not None:
+            df['topic_id'] = ids
+            df['topic_label'] = labels
+            df['topic_scores'] = [{label: 1.0} for label in labels]
+            unique_topics = df['topic_id'].nunique()
+            logger.info(f"Assigned {unique_topics} BERTopic topics, timings: {stats['timings']}")
+            return Output(df, metadata={
+                "num_topics": unique_topics,
+                "topic_mode": "bertopic",
+                **{k: v for k, v in stats.items() if k != "timings"},
+                "timings": MetadataValue.json(stats["timings"]),
+            })
+        if stats:
+            logger.info(f"BERTopic model not fitted yet ({stats['pending_articles']} articles buffered), "
+                        f"using keyword topics.")
+    
+    # Keyword classification of titles only, for speed
+    classifier = TopicClassifier(load_taxonomy(settings))
+    results, cache_stats = cached_nlp(
+        get_nlp_cache(settings), "topic", classifier.version, df['title'], classifier.classify,
+    )
+    
+    df['topic_id'] = [r[0] for r in results]
+    df['topic_label'] = [r[1] for r in results]
+    df['topic_scores'] = [r[2] for r in results]
+    
+    unique_topics = df['topic_id'].nunique()
+    multi_label = int(sum(len(r[2]) > 1 for r in results))
+    logger.info(f"Extracted {unique_topics} topics with {len(classifier.keywords)} keywords "
+                f"({multi_label} multi-label articles).")
+    return Output(df, metadata={"num_topics": unique_topics, "topic_mode": "keywords",
+                                "multi_label_articles": multi_label, **cache_stats})
 
 @asset
-def extract_locations(extract_topics: pd.DataFrame):
-    """Extracts locations using spaCy NER."""
+def extract_locations(extract_topics: pd.DataFrame, nlp_models: NLPModels):
+    """Extracts locations (and optionally organizations/people) with batched spaCy NER."""
     df = extract_topics.copy()
-    
-    def get_locations(text):
-        if not text: return []
-        doc = nlp(str(text))
-        return [ent.text for ent in doc.ents if ent.label_ in ['GPE', 'LOC']]
-    
-    df['locations'] = (df['title'] + ' ' + df['description']).apply(get_locations)
-    
-    geolocator = Nominatim(user_agent="news_intelligence_platform")
-    
-    def geocode_location(locations):
-        if not locations: return []
-        coords = []
-        for loc in locations[:2]:
-            try:
-                location = geolocator.geocode(loc, timeout=5)
-                if location:
-                    coords.append((location.latitude, location.longitude))
-            except Exception as e:
-                logger.warning(f"Geocoding failed for {loc}: {e}")
-        return coords
-    
-    df['coordinates'] = df['locations'].apply(geocode_location)
-    
-    logger.info(f"Extracted locations for {len(df)} articles.")
-    return Output(df, metadata={"articles_with_locations": int((df['locations'].str.len() > 0).sum())})
+    settings = load_settings()
+    ner_cfg = settings.get("ner", {})
+    labels = list(LOCATION_LABELS) + [l for l in OPTIONAL_LABELS if l in ner_cfg.get("extra_labels", [])]
+    
+    start = time.perf_counter()
+    entities, cache_stats = cached_nlp(
+        get_nlp_cache(settings), "ner",
+        version_of("spacy", nlp_models.spacy_version(), labels, "entity-pairs"),
+        df['title'] + ' ' + df['description'],
+        lambda texts: extract_entities(nlp_models.spacy(), texts, labels, batch_size=ner_cfg.get("batch_size", 256),
+                                       n_process=ner_cfg.get("n_process", 1)),
+    )
+    ner_seconds = time.perf_counter() - start
+    
+    def entities_with(wanted):
+        return pd.Series([[text for text, label in ents if label in wanted] for ents in entities],
+                         index=df.index, dtype=object)
+    
+    # One canonical name per place ("US", "U.S." and "USA" all become "United States").
+    canonical = get_location_index(settings).canonicalize(entities_with(LOCATION_LABELS))
+    df['locations'] = pd.Series(canonical.names, index=df.index, dtype=object)
+    df['location_ids'] = pd.Series(canonical.ids, index=df.index, dtype=object)
+    df['location_countries'] = pd.Series(canonical.country_codes, index=df.index, dtype=object)
+    if 'ORG' in labels:
+        df['organizations'] = entities_with({'ORG'})
+    if 'PERSON' in labels:
+        df['people'] = entities_with({'PERSON'})
+    
+    # Geocode the first two locations of each article, looking every distinct name up once.
+    start = time.perf_counter()
+    geocoder = get_geocoder(settings, nlp_models)
+    coordinates, geo_stats = geocoder.resolve_many(loc for locs in df['locations'] for loc in locs[:2])
+    geocoded = [[loc for loc in locs[:2] if coordinates.get(loc)] for locs in df['locations']]
+    df['geocoded_locations'] = pd.Series(geocoded, index=df.index, dtype=object)
+    df['coordinates'] = [[coordinates[loc] for loc in locs] for locs in geocoded]
+    geocode_seconds = time.perf_counter() - start
+    
+    logger.info(f"Extracted locations for {len(df)} articles (NER {ner_seconds:.3f}s, "
+                f"geocoding {geocode_seconds:.3f}s: {geo_stats}).")
+    return Output(df, metadata={
+        "articles_with_locations": int((df['locations'].str.len() > 0).sum()),
+        "ner_seconds": round(ner_seconds, 3),
+        "geocode_seconds": round(geocode_seconds, 3),
+        **cache_stats,
+        **canonical.stats,
+        **geo_stats,
+        "model_load_seconds": MetadataValue.json(nlp_models.load_seconds()),
+    })
 
 @asset
 def load_to_clickhouse(extract_locations: pd.DataFrame):
-    """Loads data into ClickHouse."""
+    """Upserts articles into ClickHouse, keyed by URL."""
     client = Client(host='clickhouse')
     
-    client.execute('DROP TABLE IF EXISTS news_articles')
-    client.execute('''
-        CREATE TABLE news_articles (
-            title String,
-            description String,
-            content String DEFAULT description,
-            published_at DateTime,
-            url String,
-            publisher String,
-            category String,
-            sentiment Float32,
-            processed_at DateTime,
-            topic_id Int32,
-            topic_label String,
-            locations Array(String),
-            coordinates Array(Tuple(Float64, Float64))
-        ) ENGINE = MergeTree()
-        ORDER BY published_at
-    ''')
-    
-    # Ensure coordinates are properly formatted as list of tuples
-    df = extract_locations.copy()
-    df['coordinates'] = df['coordinates'].apply(lambda x: [tuple(c) for c in x] if isinstance(x, list) else [])
-    
-    # Ensure locations and coordinates have the same length to prevent ClickHouse ARRAY JOIN errors
-    def sync_arrays(row):
-        locs = row['locations'] if isinstance(row['locations'], list) else []
-        coords = row['coordinates']
-        min_len = min(len(locs), len(coords))
-        return locs[:min_len], coords[:min_len]
-
-    # Apply the sync function
-    synced = df.apply(sync_arrays, axis=1, result_type='expand')
-    df['locations'] = synced[0]
-    df['coordinates'] = synced[1]
+    settings = load_settings()
+    cfg = settings.get("clickhouse", {})
+    
+    # Schema changes are applied as migrations; the table is never dropped.
+    migrations = migrate(client)
+    ttl = apply_ttl(client, cfg.get("ttl", {}))
+    if ttl is not None:
+        migrations.append(f"ttl: {ttl or 'removed'}")
+    
+    if extract_locations.empty:
+        logger.info("No new articles to load into ClickHouse.")
+        if migrations:
+            bump_data_version(client)
+        return Output(None, metadata={"inserted_records": 0, "migrations_applied": MetadataValue.json(migrations)})
+
+    df = extract_locations.reset_index(drop=True)
     
     # Ensure content column exists
     if 'content' not in df.columns:
-        df['content'] = df['description']
+        df = df.assign(content=df['description'])
     
     # Fill NaN values to avoid ClickHouse errors
     df = df.fillna({
@@ -207,83 +312,76 @@ def load_to_clickhouse(extract_locations: pd.DataFrame):
         'publisher': 'Unknown', 'category': 'General', 'topic_label': 'General'
     })
     
-    records = df.to_dict('records')
-    
-    # Explicitly map columns to ensure order matches
-    insert_query = '''
-        INSERT INTO news_articles (
-            title, description, content, published_at, url, publisher, category, 
-            sentiment, processed_at, topic_id, topic_label, locations, coordinates
-        ) VALUES
-    '''
-    
-    client.execute(insert_query, records)
-    
-    logger.info(f"Inserted {len(records)} records into ClickHouse.")
-    return Output(None, metadata={"inserted_records": len(records)})
+    # One row per URL; rows already loaded with the same or a newer version are skipped, so
+    # re-materializing a batch inserts nothing and only the batch's own keys are looked up.
+    df = df.drop_duplicates(subset=['url'], keep='last').reset_index(drop=True)
+    df['version'] = row_versions(df['processed_at'])
+    loaded = pd.DataFrame.from_dict(loaded_versions(client, df['url']), orient='index',
+                                    columns=['version', 'category', 'published_at'])
+    stored = loaded.reindex(df['url']).set_axis(df.index)
+    to_insert = df[df['version'] > stored['version'].fillna(-1)]
+    
+    # Versions only collapse when the whole sort key matches, so a reloaded article keeps the
+    # category and published_at it was first stored with.
+    reloaded = stored.loc[to_insert.index].dropna(subset=['version'])
+    to_insert = to_insert.assign(
+        category=reloaded['category'].combine_first(to_insert['category']),
+        published_at=pd.to_datetime(reloaded['published_at'], unit='s').combine_first(pd.to_datetime(to_insert['published_at'])),
+    )
+    
+    # locations and coordinates must pair up one to one for the dashboards' ARRAY JOIN.
+    names = to_insert['geocoded_locations'] if 'geocoded_locations' in to_insert.columns else to_insert['locations']
+    locations, coordinates = aligned_locations(names, to_insert['coordinates'])
+    to_insert = to_insert.assign(locations=locations, coordinates=coordinates)
+    
+    inserted, slices = insert_columnar(client, to_insert, max_bytes=int(cfg.get("insert_chunk_mb", 64) * 1024 * 1024))
+    uncollapsed = duplicate_urls(client, to_insert.loc[reloaded.index, 'url']) if inserted else []
+    if uncollapsed:
+        logger.warning(f"{len(uncollapsed)} reloaded URLs still have several rows after FINAL, e.g. {uncollapsed[0]}.")
 
-@asset
-def detect_breaking_news(process_news: pd.DataFrame):
-    """Detects breaking news based on sentiment spikes and keyword analysis."""
-    df = process_news.copy()
-    
-    # Breaking news keywords
-    breaking_keywords = ['breaking', 'urgent', 'alert', 'emergency', 'crisis', 'developing']
-    
-    # Detect breaking news
-    def is_breaking(title, sentiment):
-        try:
-            title_lower = str(title).lower()
-            has_keywords = any(keyword in title_lower for keyword in breaking_keywords)
-            # Handle potential None/NaN sentiment
-            sent_val = float(sentiment) if pd.notnull(sentiment) else 0.0
-            extreme_sentiment = abs(sent_val) > 0.5
-            return has_keywords or extreme_sentiment
-        except Exception:
-            return False
-    
-    df['is_breaking'] = df.apply(lambda row: is_breaking(row['title'], row['sentiment']), axis=1)
-    
-    breaking_count = df['is_breaking'].sum()
-    logger.info(f"Detected {breaking_count} breaking news articles.")
+    seen_index = get_seen_index(settings)
+    if seen_index is not None:
+        seen_index.mark(df)
     
-    return Output(df, metadata={"breaking_news_count": int(breaking_count)})
+    # Refreshes the KPI snapshot; dashboards keep serving cached results until the data version changes.
+    data_version = bump_data_version(client) if inserted or migrations else None
+
+    skipped = len(df) - inserted
+    logger.info(f"Inserted {inserted} records into ClickHouse in {slices} slices ({skipped} already loaded).")
+    return Output(None, metadata={
+        "inserted_records": inserted,
+        "insert_slices": slices,
+        "skipped_already_loaded": skipped,
+        "reloaded_records": len(reloaded),
+        "uncollapsed_urls": len(uncollapsed),
+        "data_version": data_version or "unchanged",
+        "migrations_applied": MetadataValue.json(migrations),
+    })
 
 @asset
 def load_to_neo4j(extract_locations: pd.DataFrame):
-    """Loads entities into Neo4j."""
-    driver = GraphDatabase.driver("bolt://neo4j:7687", auth=("neo4j", "password"))
+    """Upserts articles and their publisher, topic and locations into Neo4j in UNWIND batches."""
+    cfg = load_settings().get("neo4j", {})
+    rows = article_rows(extract_locations)
     
-    def add_article(tx, article):
-        tx.run("""
-            MERGE (p:Publisher {name: $publisher})
-            MERGE (a:Article {url: $url})
-            SET a.title = $title, 
-                a.sentiment = $sentiment, 
-                a.published_at = toString($published_at),
-                a.topic_label = $topic_label
-            MERGE (p)-[:PUBLISHED]->(a)
-            
-            MERGE (t:Topic {label: $topic_label})
-            MERGE (a)-[:BELONGS_TO]->(t)
-            
-            FOREACH (loc IN $locations |
-                MERGE (l:Location {name: loc})
-                MERGE (a)-[:MENTIONS]->(l)
-            )
-        """, **article)
-
-    with driver.session() as session:
-        for _, row in extract_locations.iterrows():
-            try:
-                article_data = row.to_dict()
-                # Convert complex types for Neo4j
-                article_data['published_at'] = str(article_data['published_at'])
-                session.write_transaction(add_article, article_data)
-            except Exception as e:
-                logger.error(f"Failed to load article to Neo4j: {e}")
-
-    driver.close()
-    logger.info(f"Loaded {len(extract_locations)} articles into Neo4j.")
-    return Output(None, metadata={"loaded_records": len(extract_locations)})
+    driver = GraphDatabase.driver("bolt://neo4j:7687", auth=("neo4j", "password"))
+    try:
+        ensure_constraints(driver)
+        report = write_batches(driver, UPSERT_ARTICLES, rows,
+                               batch_size=cfg.get("batch_size", 2000),
+                               retries=cfg.get("max_retries", 3),
+                               backoff=cfg.get("backoff_s", 1.0))
+    finally:
+        driver.close()
+    
+    loaded = report["rows"] - report["failed_rows"]
+    logger.info(f"Loaded {loaded} articles into Neo4j in {report['batches']} batches "
+                f"({report['rows_per_sec']} rows/s, {report['failed_rows']} failed, {report['retries']} retries).")
+    return Output(None, metadata={
+        "loaded_records": loaded,
+        "failed_records": report["failed_rows"],
+        "batches": report["batches"],
+        "retries": report["retries"],
+        "rows_per_sec": report["rows_per_sec"],
+    })
 
@@ -1,44 +1,57 @@
-from dagster import asset, Output
+from dagster import asset, Output, MetadataValue
 import pandas as pd
+from datetime import datetime, timezone
 from clickhouse_driver import Client
 import logging
+import os
+from .assets import STATE_DIR, load_settings
+from .bursts import BurstDetector
+from .warehouse import aligned_locations, bump_data_version, store_bursts
 
 logger = logging.getLogger(__name__)
 
+
+def get_burst_detector(settings):
+    """Returns the burst detector with its persistent baselines."""
+    cfg = settings.get("breaking_news", {})
+    return BurstDetector(
+        cfg.get("path", os.path.join(STATE_DIR, "breaking_news.sqlite")),
+        bucket_minutes=cfg.get("bucket_minutes", 60),
+        half_life_buckets=cfg.get("half_life_buckets", 24),
+        z_threshold=cfg.get("z_threshold", 3.0),
+        min_articles=cfg.get("min_articles", 3),
+        warmup_buckets=cfg.get("warmup_buckets", 24),
+        sentiment_warmup=cfg.get("sentiment_warmup", 20),
+        retention_days=cfg.get("retention_days", 7),
+    )
+
+
 @asset
-def detect_breaking_news(load_to_clickhouse):
-    """Detects breaking news based on sentiment spikes and keyword analysis."""
-    client = Client(host='clickhouse')
-    
-    # Get recent articles with high impact indicators
-    breaking_news = client.execute("""
-        SELECT title, publisher, category, sentiment, published_at
-        FROM news_articles 
-        WHERE (
-            sentiment < -0.7 OR sentiment > 0.7 OR
-            title LIKE '%BREAKING%' OR 
-            title LIKE '%URGENT%' OR
-            title LIKE '%ALERT%'
-        )
-        AND published_at >= now() - INTERVAL 1 HOUR
-        ORDER BY published_at DESC
-        LIMIT 10
-    """)
-    
-    if breaking_news:
-        df_breaking = pd.DataFrame(breaking_news, columns=[
-            'Title', 'Publisher', 'Category', 'Sentiment', 'Published'
-        ])
-        
-        logger.info(f"Detected {len(df_breaking)} breaking news items")
-        
-        return Output(
-            df_breaking,
-            metadata={
-                "breaking_count": len(df_breaking),
-                "high_sentiment_count": len(df_breaking[abs(df_breaking['Sentiment']) > 0.7])
-            }
-        )
-    
-    logger.info("No breaking news detected")
-    return Output(pd.DataFrame(), metadata={"breaking_count": 0})
\ No newline at end of file
+def detect_breaking_news(extract_locations: pd.DataFrame, load_to_clickhouse):
+    """Flags categories, topics and locations whose article volume or sentiment breaks from their rolling baseline."""
+    df = extract_locations
+    if not df.empty:
+        # Same location names as load_to_clickhouse stores, so the dashboard can find a burst's articles.
+        names = df['geocoded_locations'] if 'geocoded_locations' in df.columns else df['locations']
+        df = df.assign(locations=aligned_locations(names, df['coordinates'])[0])
+
+    alerts, stats = get_burst_detector(load_settings()).update(df)
+
+    if not alerts.empty:
+        client = Client(host='clickhouse')
+        store_bursts(client, alerts, datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0))
+        # load_to_clickhouse bumped the version before these alerts existed; a page that cached
+        # the old alerts under that version would keep serving them until its TTL ran out.
+        bump_data_version(client, kpis=False)
+
+    by_signal = alerts['signal'].value_counts().to_dict() if not alerts.empty else {}
+    logger.info(f"Scored {stats['articles']} new articles over {stats['keys']} keys: {len(alerts)} alerts "
+                f"({stats['already_counted']} already counted, {stats['late']} late mentions).")
+    return Output(alerts, metadata={
+        "breaking_count": len(alerts),
+        "alerts_by_signal": MetadataValue.json({k: int(v) for k, v in by_signal.items()}),
+        "new_articles": stats['articles'],
+        "already_counted": stats['already_counted'],
+        "late_mentions": stats['late'],
+        "keys_updated": stats['keys'],
+    })
@@ -0,0 +1,240 @@
+"""Streaming burst detection for breaking news.
+
+Every category, topic and location keeps a rolling baseline, and a bucket that
+sits far above its baseline is flagged. Articles are counted per time bucket
+(``bucket_minutes``, by ``published_at``). When a bucket closes it is folded
+into the baseline with exponential weights (``half_life_buckets``):
+- Article volume: EW mean and variance of the per-bucket count, with empty
+  buckets counted as zero.
+- Sentiment: EW sums of article count, sentiment and squared sentiment, so
+  the per-article mean and variance weigh each article equally within a
+  bucket and decay across buckets.
+
+A bucket is scored against the baseline as it stood before the bucket.
+- Volume: z = (count - mean) / sd. The sd is at least sqrt(mean), the Poisson
+  spread, so quiet keys don't alert on a couple of articles.
+- Sentiment: the bucket mean's z-score against the baseline, with standard
+  error sd / sqrt(count).
+``z_threshold`` applies to both. No key alerts on volume before
+``warmup_buckets`` closed buckets, or on sentiment before its baseline weighs
+``sentiment_warmup`` articles. A bucket with fewer than ``min_articles``
+never alerts.
+
+State lives in SQLite: one row per key, plus the ids of recently counted
+articles. A run reads and writes only the keys its new articles touch, so it
+costs O(new articles), and re-running a batch counts nothing twice. Articles
+published before a key's open bucket arrive too late to count towards volume.
+They are skipped and reported.
+"""
+import hashlib
+import math
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import astuple, dataclass, fields
+from datetime import datetime, timezone
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ALERT_COLUMNS = ["bucket", "bucket_end", "kind", "key", "signal", "articles", "sentiment", "expected", "score"]
+
+# Floor on the per-article sentiment variance, so a key whose articles all scored the same doesn't alert on noise.
+_MIN_SENTIMENT_VAR = 0.01
+
+
+@dataclass
+class Baseline:
+    """Rolling state of one key; ``bucket`` is the open bucket's start, in epoch seconds."""
+    bucket: int
+    count: int = 0
+    sentiment_sum: float = 0.0
+    sentiment_sumsq: float = 0.0
+    volume_mean: float = 0.0
+    volume_var: float = 0.0
+    buckets: int = 0
+    sentiment_weight: float = 0.0
+    sentiment_wsum: float = 0.0
+    sentiment_wsumsq: float = 0.0
+
+
+_FIELDS = [f.name for f in fields(Baseline)]
+
+
+def article_id(url):
+    return hashlib.blake2b(str(url).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def entity_mentions(df):
+    """(article, kind, key, published_at, sentiment) rows: each article's category, topic and locations."""
+    base = df[["article", "published_at", "sentiment"]]
+    parts = [base.assign(kind="category", key=df["category"]), base.assign(kind="topic", key=df["topic_label"])]
+    if "locations" in df.columns:
+        locations = base.assign(kind="location", key=df["locations"]).explode("key")
+        parts.append(locations.dropna(subset=["key"]).drop_duplicates(subset=["article", "key"]))
+    mentions = pd.concat(parts, ignore_index=True)
+    mentions["key"] = mentions["key"].astype(str)
+    return mentions[mentions["key"] != ""]
+
+
+class BurstDetector:
+    """Rolling per-key baselines in SQLite, updated with each batch of new articles."""
+
+    def __init__(self, path, bucket_minutes=60, half_life_buckets=24, z_threshold=3.0, min_articles=3,
+                 warmup_buckets=24, sentiment_warmup=20, retention_days=7):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.width = int(bucket_minutes * 60)
+        self.alpha = 1 - 0.5 ** (1 / half_life_buckets)
+        # Past this many empty buckets the baseline has decayed to nothing; the rest are skipped.
+        self.max_gap = int(10 * half_life_buckets)
+        self.z_threshold = z_threshold
+        self.min_articles = min_articles
+        self.warmup_buckets = warmup_buckets
+        self.sentiment_warmup = sentiment_warmup
+        self.retention_s = int(retention_days * 86400)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS baselines (kind TEXT, key TEXT, "
+                + ", ".join(f"{name} {'INTEGER' if name in ('bucket', 'count', 'buckets') else 'REAL'}"
+                            for name in _FIELDS)
+                + ", PRIMARY KEY (kind, key))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS counted (article TEXT PRIMARY KEY, counted_at INTEGER)")
+            conn.execute("CREATE INDEX IF NOT EXISTS counted_at ON counted (counted_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _fold(self, mean, var, x):
+        diff = x - mean
+        increment = self.alpha * diff
+        return mean + increment, (1 - self.alpha) * (var + diff * increment)
+
+    def _close(self, state, bucket):
+        """Folds the open bucket and any empty ones after it into the baseline, then opens ``bucket``."""
+        if state.buckets:
+            state.volume_mean, state.volume_var = self._fold(state.volume_mean, state.volume_var, state.count)
+        else:
+            state.volume_mean, state.volume_var = float(state.count), 0.0
+        state.buckets += 1
+        gap = (bucket - state.bucket) // self.width - 1
+        decay = (1 - self.alpha) ** (gap + 1)
+        state.sentiment_weight = state.sentiment_weight * decay + state.count
+        state.sentiment_wsum = state.sentiment_wsum * decay + state.sentiment_sum
+        state.sentiment_wsumsq = state.sentiment_wsumsq * decay + state.sentiment_sumsq
+        for _ in range(min(gap, self.max_gap)):
+            state.volume_mean, state.volume_var = self._fold(state.volume_mean, state.volume_var, 0.0)
+        state.buckets += gap
+        state.bucket = bucket
+        state.count = 0
+        state.sentiment_sum = state.sentiment_sumsq = 0.0
+
+    def score(self, state):
+        """[(signal, expected, z)] for the open bucket of ``state`` that cross ``z_threshold``."""
+        if state.count < self.min_articles:
+            return []
+        flagged = []
+        if state.buckets >= self.warmup_buckets:
+            sd = math.sqrt(max(state.volume_var, state.volume_mean, 1.0))
+            z = (state.count - state.volume_mean) / sd
+            if z >= self.z_threshold:
+                flagged.append(("volume", state.volume_mean, z))
+        weight = state.sentiment_weight
+        if weight >= max(self.sentiment_warmup, 2):
+            mean = state.sentiment_wsum / weight
+            # Sample variance, corrected for the baseline's effective number of articles.
+            var = max((state.sentiment_wsumsq / weight - mean ** 2) * weight / (weight - 1), _MIN_SENTIMENT_VAR)
+            z = (state.sentiment_sum / state.count - mean) / math.sqrt(var / state.count)
+            if abs(z) >= self.z_threshold:
+                flagged.append(("sentiment", mean, z))
+        return flagged
+
+    def _alerts(self, kind, key, state):
+        start = datetime.fromtimestamp(state.bucket, timezone.utc).replace(tzinfo=None)
+        end = datetime.fromtimestamp(state.bucket + self.width, timezone.utc).replace(tzinfo=None)
+        return [(start, end, kind, key, signal, state.count, state.sentiment_sum / state.count, expected, z)
+                for signal, expected, z in self.score(state)]
+
+    def update(self, df):
+        """Counts new articles of ``df`` and returns (alerts DataFrame, stats dict).
+
+        ``df`` needs url, published_at, sentiment, category and topic_label, plus
+        optionally a list column of locations. Alerts cover every bucket that got
+        new mentions from this batch, including the still-open one, with
+        ``ALERT_COLUMNS``.
+        """
+        stats = {"articles": 0, "already_counted": 0, "late": 0, "keys": 0, "alerts": 0}
+        if df is None or df.empty:
+            return pd.DataFrame(columns=ALERT_COLUMNS), stats
+        df = df.assign(article=df["url"].map(article_id)).drop_duplicates(subset=["article"], keep="last")
+        published = pd.to_datetime(df["published_at"], utc=True, errors="coerce")
+        epoch = published.dt.tz_convert(None).astype("datetime64[ns]").astype("int64") // 1_000_000_000
+        df = df.assign(published_at=epoch,
+                       sentiment=pd.to_numeric(df["sentiment"], errors="coerce").fillna(0.0))[published.notna()]
+
+        now = int(time.time())
+        alerts = []
+        with self._connect() as conn:
+            ids = df["article"].tolist()
+            counted = set()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = conn.execute(f"SELECT article FROM counted WHERE article IN ({','.join('?' * len(chunk))})", chunk)
+                counted.update(article for article, in rows)
+            stats["already_counted"] = len(counted)
+            df = df[~df["article"].isin(counted)]
+            stats["articles"] = len(df)
+
+            mentions = entity_mentions(df)
+            mentions["bucket"] = mentions["published_at"] // self.width * self.width
+            mentions["sentiment_sq"] = mentions["sentiment"] ** 2
+            groups = (mentions.groupby(["kind", "key", "bucket"], sort=True)
+                      .agg(count=("article", "size"), sentiment_sum=("sentiment", "sum"),
+                           sentiment_sumsq=("sentiment_sq", "sum")))
+
+            updated = []
+            for (kind, key), buckets in groups.groupby(level=["kind", "key"], sort=False):
+                row = conn.execute(f"SELECT {', '.join(_FIELDS)} FROM baselines WHERE kind = ? AND key = ?",
+                                   (kind, key)).fetchone()
+                state = Baseline(*row) if row else None
+                # Only buckets that got new mentions in this run are scored; the rest were scored before.
+                touched = False
+                for (_, _, bucket), count, total, total_sq in zip(buckets.index, buckets["count"],
+                                                                  buckets["sentiment_sum"], buckets["sentiment_sumsq"]):
+                    bucket = int(bucket)
+                    if state is None:
+                        state = Baseline(bucket)
+                    elif bucket < state.bucket:
+                        stats["late"] += int(count)
+                        continue
+                    elif bucket > state.bucket:
+                        # The open bucket is complete: score it with everything it got, then fold it in.
+                        alerts.extend(self._alerts(kind, key, state) if touched else [])
+                        self._close(state, bucket)
+                    state.count += int(count)
+                    state.sentiment_sum += float(total)
+                    state.sentiment_sumsq += float(total_sq)
+                    touched = True
+                alerts.extend(self._alerts(kind, key, state) if touched else [])
+                updated.append((kind, key, *astuple(state)))
+            stats["keys"] = len(updated)
+
+            conn.executemany(f"INSERT OR REPLACE INTO baselines (kind, key, {', '.join(_FIELDS)}) "
+                             f"VALUES ({', '.join('?' * (len(_FIELDS) + 2))})", updated)
+            conn.executemany("INSERT OR REPLACE INTO counted (article, counted_at) VALUES (?, ?)",
+                             [(article, now) for article in df["article"]])
+            conn.execute("DELETE FROM counted WHERE counted_at < ?", (now - self.retention_s,))
+
+        stats["alerts"] = len(alerts)
+        return pd.DataFrame(alerts, columns=ALERT_COLUMNS), stats
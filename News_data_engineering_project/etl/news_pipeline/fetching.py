@@ -0,0 +1,139 @@
+"""Concurrent fetch engine for news ingestion.
+
+GNews only exposes a blocking, one-category-at-a-time API, so ``ingest_news``
+fans the (country, category) pairs out over a bounded thread pool. Each task
+gets retries with jittered exponential backoff and an overall timeout, and
+every task ends up in the report whether it succeeded or not.
+"""
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import logging
+
+from newsops_common.graph import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FetchResult:
+    """Outcome of fetching one (country, category) task."""
+    country: str
+    category: str
+    status: str = "pending"
+    articles: list = field(default_factory=list)
+    attempts: int = 0
+    elapsed_s: float = 0.0
+    error: str = ""
+
+    @property
+    def ok(self):
+        return self.status == "ok"
+
+    def summary(self):
+        return {
+            "country": self.country,
+            "category": self.category,
+            "status": self.status,
+            "articles": len(self.articles),
+            "attempts": self.attempts,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "error": self.error,
+        }
+
+
+def _run_task(fetch, result, retries, backoff, deadline, cancelled):
+    start = time.monotonic()
+    for attempt in range(retries + 1):
+        if cancelled.is_set():
+            break
+        result.attempts = attempt + 1
+        try:
+            result.articles = list(fetch(result.country, result.category) or [])
+            result.status = "ok"
+            result.error = ""
+            break
+        except Exception as e:
+            result.status = "failed"
+            result.error = f"{type(e).__name__}: {e}"
+            if attempt == retries:
+                break
+            delay = backoff_delay(attempt, base=backoff)
+            # Don't sleep past the task's deadline, the caller has already given up by then.
+            if time.monotonic() + delay >= deadline():
+                break
+            logger.info(f"Retrying {result.country}/{result.category} in {delay:.2f}s after: {result.error}")
+            cancelled.wait(delay)
+    result.elapsed_s = time.monotonic() - start
+    return result
+
+
+def fetch_concurrently(fetch, tasks, max_workers=4, timeout=30.0, retries=2, backoff=1.0, total_timeout=None):
+    """Runs ``fetch(country, category)`` for every (country, category) in ``tasks``.
+
+    At most ``max_workers`` requests are in flight at once. ``timeout`` bounds
+    each task (all of its attempts) from the moment it starts running; a task
+    that overruns is reported as ``timeout`` and its result is discarded.
+    A hung request keeps its worker busy, so queued tasks might never start;
+    ``total_timeout`` (by default, enough for every task to run its full
+    ``timeout`` in turn) bounds the whole call, and any task unfinished by then,
+    started or not, is reported as ``timeout``.
+    Returns a list of FetchResult in the same order as ``tasks``.
+    """
+    results = [FetchResult(country=country, category=category) for country, category in tasks]
+    if not results:
+        return results
+    if total_timeout is None:
+        total_timeout = math.ceil(len(results) / max(1, max_workers)) * timeout
+    deadline = time.monotonic() + total_timeout
+
+    started = {}
+    cancelled = threading.Event()
+
+    def make_worker(idx):
+        def worker():
+            started[idx] = time.monotonic()
+            # Work on a private copy so a task that finishes after its timeout can't
+            # change a result that has already been reported.
+            result = FetchResult(country=results[idx].country, category=results[idx].category)
+            return _run_task(fetch, result, retries, backoff,
+                             lambda: started[idx] + timeout, cancelled)
+        return worker
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="gnews")
+    try:
+        pending = {executor.submit(make_worker(idx)): idx for idx in range(len(results))}
+        while pending:
+            done, _ = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = pending.pop(future)
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    results[idx].status = "failed"
+                    results[idx].error = f"{type(e).__name__}: {e}"
+            now = time.monotonic()
+            for future, idx in list(pending.items()):
+                if idx in started and now - started[idx] > timeout:
+                    pending.pop(future)
+                    result = results[idx]
+                    result.status = "timeout"
+                    result.error = f"no response after {timeout:.0f}s"
+                    result.elapsed_s = now - started[idx]
+                    logger.warning(f"Timed out fetching {result.country}/{result.category}")
+            if pending and now > deadline:
+                for future, idx in pending.items():
+                    result = results[idx]
+                    result.status = "timeout"
+                    result.error = (f"unfinished after the {total_timeout:.0f}s limit for all fetches"
+                                    if idx in started else f"not started within {total_timeout:.0f}s")
+                    result.elapsed_s = now - started[idx] if idx in started else 0.0
+                    logger.warning(f"Timed out fetching {result.country}/{result.category}: {result.error}")
+                pending = {}
+    finally:
+        cancelled.set()
+        # Hung requests can't be interrupted; don't block the run on them.
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
@@ -0,0 +1,138 @@
+"""Location geocoding for ``extract_locations``.
+
+Each batch is reduced to its distinct location strings. These are resolved
+first from a persistent SQLite cache, then from the offline gazetteer, and only
+the remaining misses go to the remote geocoder (Nominatim). Remote calls are
+spaced at least ``min_delay_s`` apart, per Nominatim's usage policy, and capped
+at ``max_remote`` per run. Misses beyond that cap stay unresolved and are tried
+again next run. Remote answers are cached; "not found" answers expire after
+``negative_ttl_days`` so places that get added to OSM are picked up later.
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import logging
+
+from newsops_common.gazetteer import normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodeCache:
+    """Remote geocoder answers by normalized query; lat/lon are NULL for "not found"."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS geocode (query TEXT PRIMARY KEY, lat REAL, lon REAL, resolved_at TEXT)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, queries, negative_ttl_days=30):
+        """Returns {query: (lat, lon) or None}; expired "not found" entries are left out."""
+        found = {}
+        queries = list(queries)
+        cutoff = (datetime.now() - timedelta(days=negative_ttl_days)).isoformat(timespec="seconds")
+        with self._connect() as conn:
+            for start in range(0, len(queries), 500):
+                chunk = queries[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT query, lat, lon, resolved_at FROM geocode WHERE query IN ({placeholders})", chunk)
+                for query, lat, lon, resolved_at in rows:
+                    if lat is not None:
+                        found[query] = (lat, lon)
+                    elif resolved_at >= cutoff:
+                        found[query] = None
+        return found
+
+    def put_many(self, results):
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [(q, c[0] if c else None, c[1] if c else None, now) for q, c in results.items()]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO geocode (query, lat, lon, resolved_at) VALUES (?, ?, ?, ?)", rows)
+
+
+class Geocoder:
+    """Cache -> gazetteer -> rate-limited remote resolution of location names."""
+
+    def __init__(self, cache, gazetteer, remote_factory=None, max_remote=100, min_delay_s=1.0,
+                 negative_ttl_days=30, timeout_s=5):
+        self.cache = cache
+        self.gazetteer = gazetteer
+        # Called only if some name reaches the remote step, so the client is never built otherwise.
+        self.remote_factory = remote_factory
+        self.max_remote = max_remote
+        self.min_delay_s = min_delay_s
+        self.negative_ttl_days = negative_ttl_days
+        self.timeout_s = timeout_s
+
+    def _remote(self, queries, stats):
+        results = {}
+        if not queries or self.remote_factory is None or self.max_remote <= 0:
+            stats["skipped_remote"] = len(queries)
+            return results
+        remote = self.remote_factory()
+        last_call = None
+        for i, query in enumerate(queries):
+            if i >= self.max_remote:
+                stats["skipped_remote"] = len(queries) - i
+                break
+            if last_call is not None:
+                wait = self.min_delay_s - (time.monotonic() - last_call)
+                if wait > 0:
+                    time.sleep(wait)
+            last_call = time.monotonic()
+            stats["remote_lookups"] += 1
+            try:
+                location = remote.geocode(query, timeout=self.timeout_s)
+            except Exception as e:
+                # Not cached: transient failures are retried next run.
+                stats["remote_failures"] += 1
+                logger.warning(f"Geocoding failed for {query}: {e}")
+                continue
+            results[query] = (location.latitude, location.longitude) if location else None
+        return results
+
+    def resolve_many(self, names):
+        """Returns ({name: (lat, lon) or None}, stats) for the distinct names given."""
+        by_query = {}
+        for name in dict.fromkeys(n for n in names if n):
+            query = normalize_name(name)
+            if query:
+                by_query.setdefault(query, []).append(name)
+
+        stats = {"unique_locations": len(by_query), "geocode_cache_hits": 0, "gazetteer_hits": 0,
+                 "remote_lookups": 0, "remote_failures": 0, "skipped_remote": 0}
+        resolved = self.cache.get_many(by_query, self.negative_ttl_days)
+        stats["geocode_cache_hits"] = len(resolved)
+
+        misses = []
+        for query in by_query:
+            if query in resolved:
+                continue
+            place = self.gazetteer.lookup(query) if self.gazetteer is not None else None
+            if place is not None:
+                resolved[query] = (place.lat, place.lon)
+                stats["gazetteer_hits"] += 1
+            else:
+                misses.append(query)
+
+        remote = self._remote(misses, stats)
+        if remote:
+            self.cache.put_many(remote)
+        resolved.update(remote)
+
+        coordinates = {name: resolved.get(query) for query, names in by_query.items() for name in names}
+        stats["unresolved"] = sum(1 for query in by_query if resolved.get(query) is None)
+        return coordinates, stats
@@ -0,0 +1,36 @@
+"""Batched named-entity extraction with spaCy.
+
+Texts go through ``nlp.pipe`` in batches (optionally across worker processes)
+with every component except NER and whatever it depends on switched off, so
+the tagger, parser, lemmatizer and attribute ruler don't run at all.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOCATION_LABELS = ("GPE", "LOC")
+OPTIONAL_LABELS = ("ORG", "PERSON")
+
+
+def ner_disabled_pipes(nlp):
+    """Pipeline components NER doesn't need."""
+    keep = {"ner"}
+    # A shared tok2vec/transformer only matters if NER listens to it (en_core_web_sm's NER has its own).
+    for name in ("tok2vec", "transformer"):
+        if name in nlp.pipe_names and "ner" in getattr(nlp.get_pipe(name), "listening_components", []):
+            keep.add(name)
+    return [name for name in nlp.pipe_names if name not in keep]
+
+
+def extract_entities(nlp, texts, labels=LOCATION_LABELS, batch_size=256, n_process=1):
+    """Returns one list of ``[text, label]`` entities with a label in ``labels`` per input text."""
+    texts = ["" if t is None or (isinstance(t, float) and t != t) else str(t) for t in texts]
+    # Worker processes cost more to start than they save on small batches.
+    if len(texts) < 2 * batch_size:
+        n_process = 1
+    labels = set(labels)
+    with nlp.select_pipes(disable=ner_disabled_pipes(nlp)):
+        return [
+            [[ent.text, ent.label_] for ent in doc.ents if ent.label_ in labels]
+            for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        ]
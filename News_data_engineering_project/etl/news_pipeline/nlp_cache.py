@@ -0,0 +1,137 @@
+"""Persistent cache of NLP results, shared across pipeline runs.
+
+Syndicated headlines recur across publishers and runs, so sentiment scores,
+topic assignments and NER entities are stored in SQLite under a hash of the
+normalized text plus the version of the model that produced them. Changing a
+model (or its configuration) changes the version, so stale results are simply
+never looked up again and age out. Entries are evicted least-recently-used
+once the cache grows past ``max_entries`` rows or ``max_bytes`` of payload.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from contextlib import contextmanager
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Canonical form used for keys: NFC, collapsed whitespace. Case is kept, NER depends on it."""
+    if text is None or (isinstance(text, float) and text != text):
+        return ""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", str(text))).strip()
+
+
+def cache_key(kind, version, text):
+    payload = f"{kind}\x00{version}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def version_of(*parts):
+    """Short stable version string for a model plus the configuration it runs with."""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+class NLPCache:
+    """Content-addressed SQLite store of JSON results with LRU eviction."""
+
+    def __init__(self, path, max_entries=500_000, max_bytes=256 * 1024 * 1024):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, kind TEXT, value TEXT, size INTEGER, last_used REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys):
+        """Returns {key: value} for the keys that are cached and marks them as recently used."""
+        found = {}
+        keys = list(keys)
+        now = time.time()
+        with self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, value FROM results WHERE key IN ({placeholders})", chunk)
+                found.update((k, json.loads(v)) for k, v in rows)
+            conn.executemany("UPDATE results SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+        return found
+
+    def put_many(self, kind, items):
+        """Stores {key: value} results of ``kind``, then evicts if over budget."""
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            blob = json.dumps(value)
+            rows.append((key, kind, blob, len(blob), now))
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO results (key, kind, value, size, last_used) VALUES (?, ?, ?, ?, ?)", rows)
+        self.evict()
+
+    def evict(self):
+        """Drops least-recently-used entries until both the row and byte budgets hold."""
+        evicted = 0
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            if self.max_entries and count > self.max_entries:
+                evicted += conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+            if self.max_bytes and total > self.max_bytes:
+                # Keep the newest entries whose cumulative size fits in the budget.
+                evicted += conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running FROM results)"
+                    " WHERE running > ?)",
+                    (self.max_bytes,),
+                ).rowcount
+        if evicted:
+            logger.info(f"Evicted {evicted} NLP cache entries")
+        return evicted
+
+    def map(self, kind, version, texts, compute):
+        """Returns one result per text, calling ``compute(unique_missed_texts)`` only for cache misses.
+
+        ``compute`` takes a list of texts and returns a list of JSON-serializable
+        results in the same order. Repeats within ``texts`` are computed once.
+        """
+        texts = list(texts)
+        keys = [cache_key(kind, version, t) for t in texts]
+        cached = self.get_many(set(keys))
+
+        missed = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missed:
+                missed[key] = text
+        computed = dict(zip(missed, compute(list(missed.values())))) if missed else {}
+        self.put_many(kind, computed)
+
+        results = {**cached, **computed}
+        hits = sum(1 for k in keys if k in cached)
+        stats = {"cache_hits": hits, "cache_misses": len(keys) - hits, "computed": len(computed)}
+        return [results[k] for k in keys], stats
@@ -0,0 +1,87 @@
+"""Lazily loaded, process-wide model resources.
+
+Listing assets (webserver, daemon, every run worker loading the code location)
+must not pay for spaCy, TextBlob or geopy. Each model is only loaded the first
+time an asset actually needs it (not when every result came from the NLP
+cache), and at most once per process, so every asset executed in the same
+worker reuses it. How long each load took is recorded in ``LOAD_SECONDS`` so
+assets can report it.
+"""
+import threading
+import time
+from functools import lru_cache
+import logging
+
+from dagster import ConfigurableResource
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent loading each model in this process; missing means not loaded yet.
+LOAD_SECONDS = {}
+_lock = threading.Lock()
+
+
+def _timed(name, load):
+    with _lock:
+        start = time.perf_counter()
+        model = load()
+        LOAD_SECONDS[name] = round(time.perf_counter() - start, 3)
+    logger.info(f"Loaded {name} in {LOAD_SECONDS[name]:.2f}s")
+    return model
+
+
+@lru_cache(maxsize=None)
+def _spacy(model_name):
+    def load():
+        import spacy
+        try:
+            return spacy.load(model_name)
+        except OSError as e:
+            # Installed at image build time; downloading from a run worker is slow and flaky.
+            raise RuntimeError(f"spaCy model {model_name!r} is not installed, "
+                               f"run `python -m spacy download {model_name}` in the image") from e
+    return _timed(f"spacy:{model_name}", load)
+
+
+@lru_cache(maxsize=None)
+def _sentiment():
+    def load():
+        from newsops_common.sentiment import get_engine
+        return get_engine()
+    return _timed("sentiment", load)
+
+
+@lru_cache(maxsize=None)
+def _geocoder(user_agent):
+    def load():
+        from geopy.geocoders import Nominatim
+        return Nominatim(user_agent=user_agent)
+    return _timed("geocoder", load)
+
+
+class NLPModels(ConfigurableResource):
+    """Models shared by the NLP assets; each is loaded on first use and kept for the process."""
+
+    spacy_model: str = "en_core_web_sm"
+    geocoder_user_agent: str = "news_intelligence_platform"
+
+    def spacy(self):
+        return _spacy(self.spacy_model)
+
+    def spacy_version(self):
+        """Name and installed version of the spaCy model, without loading it."""
+        from spacy.util import get_package_version
+        return f"{self.spacy_model}-{get_package_version(self.spacy_model)}"
+
+    def sentiment(self):
+        return _sentiment()
+
+    def sentiment_version(self):
+        from newsops_common.sentiment import engine_version
+        return engine_version()
+
+    def geocoder(self):
+        return _geocoder(self.geocoder_user_agent)
+
+    def load_seconds(self):
+        return dict(LOAD_SECONDS)
@@ -0,0 +1,186 @@
+"""Persistent index of articles the pipeline has already processed.
+
+Lookups go through an on-disk Bloom filter first: a negative answer means the
+article is definitely new and costs no I/O. Positive answers are confirmed
+against an exact SQLite set, so Bloom false positives never drop an article.
+Articles are keyed both by normalized URL and by a hash of their content, so
+the same story syndicated under a different URL is also recognised.
+"""
+import hashlib
+import math
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only describe how the link was served (Google News
+# locale, campaign tracking), not which article it points at.
+_IGNORED_PARAMS = {"oc", "hl", "gl", "ceid"}
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_url(url):
+    if not url:
+        return ""
+    parts = urlsplit(str(url).strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k not in _IGNORED_PARAMS and not k.startswith("utm_")]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"),
+                       urlencode(query), ""))
+
+
+def content_key(title, publisher):
+    """Stable key for an article's content, independent of the URL it was found at."""
+    title = _NON_WORD.sub(" ", str(title or "").lower()).strip()
+    publisher = _NON_WORD.sub(" ", str(publisher or "").lower()).strip()
+    if not title:
+        return ""
+    return hashlib.blake2b(f"{title}|{publisher}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def article_keys(url, title, publisher):
+    keys = []
+    url = normalize_url(url)
+    if url:
+        keys.append("u:" + hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest())
+    content = content_key(title, publisher)
+    if content:
+        keys.append("c:" + content)
+    return keys
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a bytearray, using double hashing."""
+
+    def __init__(self, num_bits, num_hashes, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, expected_items, fp_rate):
+        expected_items = max(1, int(expected_items))
+        num_bits = int(math.ceil(-expected_items * math.log(fp_rate) / (math.log(2) ** 2)))
+        num_hashes = max(1, int(round(num_bits / expected_items * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.num_bits.to_bytes(8, "little"))
+            f.write(self.num_hashes.to_bytes(4, "little"))
+            f.write(self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            num_bits = int.from_bytes(f.read(8), "little")
+            num_hashes = int.from_bytes(f.read(4), "little")
+            bits = bytearray(f.read())
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError(f"Corrupt Bloom filter file: {path}")
+        return cls(num_bits, num_hashes, bits)
+
+
+class SeenIndex:
+    """Bloom filter + exact SQLite set of article keys, stored under ``directory``."""
+
+    def __init__(self, directory, expected_items=1_000_000, fp_rate=0.01):
+        os.makedirs(directory, exist_ok=True)
+        self.bloom_path = os.path.join(directory, "seen.bloom")
+        self.db_path = os.path.join(directory, "seen.sqlite")
+        self.expected_items = expected_items
+        self.fp_rate = fp_rate
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, first_seen TEXT)")
+        self.bloom = self._load_bloom()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _load_bloom(self):
+        if os.path.exists(self.bloom_path):
+            try:
+                return BloomFilter.load(self.bloom_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Rebuilding seen-index Bloom filter: {e}")
+        # Missing or unreadable: rebuild from the exact set, which is the source of truth.
+        bloom = BloomFilter.for_capacity(self.expected_items, self.fp_rate)
+        with self._connect() as conn:
+            for (key,) in conn.execute("SELECT key FROM seen"):
+                bloom.add(key)
+        bloom.save(self.bloom_path)
+        return bloom
+
+    def _exact_lookup(self, keys):
+        found = set()
+        keys = list(keys)
+        with self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(k for (k,) in conn.execute(f"SELECT key FROM seen WHERE key IN ({placeholders})", chunk))
+        return found
+
+    def split(self, df):
+        """Returns (mask of unseen rows, stats) for a DataFrame with url/title/publisher columns."""
+        row_keys = [article_keys(u, t, p) for u, t, p in zip(df["url"], df["title"], df["publisher"])]
+        candidates = {k for keys in row_keys for k in keys if k in self.bloom}
+        confirmed = self._exact_lookup(candidates) if candidates else set()
+
+        unseen = [not any(k in confirmed for k in keys) for keys in row_keys]
+        hits = unseen.count(False)
+        stats = {
+            "seen_hits": hits,
+            "seen_misses": len(unseen) - hits,
+            "bloom_candidates": len(candidates),
+            "bloom_false_positives": len(candidates - confirmed),
+        }
+        return unseen, stats
+
+    def mark(self, df):
+        """Records every article in ``df`` as seen."""
+        keys = {k for u, t, p in zip(df["url"], df["title"], df["publisher"]) for k in article_keys(u, t, p)}
+        if not keys:
+            return 0
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._connect() as conn:
+            conn.executemany("INSERT OR IGNORE INTO seen (key, first_seen) VALUES (?, ?)", [(k, now) for k in keys])
+        # Merge into whatever is on disk so concurrent runs don't lose each other's bits.
+        if os.path.exists(self.bloom_path):
+            try:
+                on_disk = BloomFilter.load(self.bloom_path)
+                if (on_disk.num_bits, on_disk.num_hashes) == (self.bloom.num_bits, self.bloom.num_hashes):
+                    merged = int.from_bytes(self.bloom.bits, "little") | int.from_bytes(on_disk.bits, "little")
+                    self.bloom.bits = bytearray(merged.to_bytes(len(self.bloom.bits), "little"))
+            except (OSError, ValueError):
+                pass
+        for key in keys:
+            self.bloom.add(key)
+        self.bloom.save(self.bloom_path)
+        return len(keys)
@@ -0,0 +1,234 @@
+"""Incremental BERTopic topic modeling for ``extract_topics``.
+
+Opt-in with ``"topics": {"mode": "bertopic"}``. Titles are embedded on CPU with
+a sentence-transformers model and the vectors are stored in SQLite, so no
+article is embedded twice. The topic model is BERTopic built from online
+components (IncrementalPCA, MiniBatchKMeans, OnlineCountVectorizer): each run
+``partial_fit``s only the articles collected since the last update, so the cost
+of an update does not grow with the corpus. Articles are assigned to the
+nearest topic centroid in embedding space, which is a single matrix product.
+The centroids are running means of the embeddings assigned by each partial fit.
+"""
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+import logging
+
+import numpy as np
+
+from .nlp_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """Sentence embeddings in SQLite, keyed by normalized text and model name."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        with self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk)
+                found.update((k, np.frombuffer(v, dtype=np.float32)) for k, v in rows)
+        return found
+
+    def put_many(self, items):
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                             [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items.items()])
+
+
+class Embedder:
+    """Embeds texts with sentence-transformers on CPU, computing each text at most once."""
+
+    def __init__(self, model_name, store, batch_size=64):
+        self.model_name = model_name
+        self.store = store
+        self.batch_size = batch_size
+        self._model = None
+
+    def _encode(self, texts):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                  show_progress_bar=False, convert_to_numpy=True)
+
+    def embed(self, texts):
+        """Returns (unit-length float32 matrix, stats)."""
+        texts = [str(t) for t in texts]
+        keys = [cache_key("embedding", self.model_name, t) for t in texts]
+        found = self.store.get_many(set(keys))
+        missed = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missed:
+                missed[key] = text
+        if missed:
+            vectors = self._encode(list(missed.values()))
+            computed = dict(zip(missed, vectors))
+            self.store.put_many(computed)
+            found.update(computed)
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32), {"embedded": 0, "embedding_cache_hits": 0}
+        matrix = np.vstack([found[k] for k in keys]).astype(np.float32)
+        return matrix, {"embedded": len(missed), "embedding_cache_hits": len(keys) - sum(k in missed for k in keys)}
+
+
+class IncrementalTopicModel:
+    """Persisted online BERTopic model plus per-topic embedding centroids."""
+
+    def __init__(self, directory, n_topics=20, min_similarity=0.0):
+        os.makedirs(directory, exist_ok=True)
+        self.model_path = os.path.join(directory, "bertopic.pkl")
+        self.state_path = os.path.join(directory, "centroids.npz")
+        self.pending_path = os.path.join(directory, "pending.json")
+        self.n_topics = n_topics
+        self.min_similarity = min_similarity
+        self._model = None
+        self.sums = None
+        self.counts = None
+        self.labels = []
+        if os.path.exists(self.state_path):
+            state = np.load(self.state_path)
+            self.sums, self.counts = state["sums"], state["counts"]
+            self.labels = [str(label) for label in state["labels"]]
+        self.pending = []
+        if os.path.exists(self.pending_path):
+            with open(self.pending_path) as f:
+                self.pending = json.load(f)
+
+    @property
+    def fitted(self):
+        return self.counts is not None and bool((self.counts > 0).any())
+
+    def _build(self):
+        from bertopic import BERTopic
+        from bertopic.vectorizers import OnlineCountVectorizer
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.decomposition import IncrementalPCA
+
+        return BERTopic(
+            umap_model=IncrementalPCA(n_components=5),
+            hdbscan_model=MiniBatchKMeans(n_clusters=self.n_topics, random_state=0, n_init=3),
+            vectorizer_model=OnlineCountVectorizer(stop_words="english", decay=0.01),
+        )
+
+    @property
+    def model(self):
+        if self._model is None:
+            if os.path.exists(self.model_path):
+                from bertopic import BERTopic
+                self._model = BERTopic.load(self.model_path)
+            else:
+                self._model = self._build()
+        return self._model
+
+    def partial_fit(self, docs, embeddings):
+        """Refines the model with one batch of new articles and folds them into the centroids."""
+        self.model.partial_fit(docs, embeddings=embeddings)
+        topics = np.asarray(self.model.topics_, dtype=np.int64)
+        if self.sums is None:
+            self.sums = np.zeros((self.n_topics, embeddings.shape[1]), dtype=np.float64)
+            self.counts = np.zeros(self.n_topics, dtype=np.int64)
+        valid = (topics >= 0) & (topics < self.n_topics)
+        np.add.at(self.sums, topics[valid], embeddings[valid])
+        self.counts += np.bincount(topics[valid], minlength=self.n_topics)
+        self.labels = []
+        for topic_id in range(self.n_topics):
+            words = self.model.get_topic(topic_id) or []
+            self.labels.append("_".join(w for w, _ in words[:3]) or f"Topic {topic_id}")
+
+    def assign(self, embeddings):
+        """Nearest-centroid topic per row: (topic ids, labels, cosine similarities)."""
+        centroids = self.sums / np.maximum(self.counts, 1)[:, None]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        similarity = embeddings @ centroids.T.astype(np.float32)
+        similarity[:, self.counts == 0] = -np.inf
+        best = similarity.argmax(axis=1)
+        score = similarity[np.arange(len(best)), best]
+        ids = np.where(score >= self.min_similarity, best, -1)
+        labels = [self.labels[i] if i >= 0 else "General" for i in ids]
+        return ids.tolist(), labels, score.tolist()
+
+    def save(self):
+        if self._model is not None:
+            tmp = f"{self.model_path}.tmp"
+            self._model.save(tmp, serialization="pickle")
+            os.replace(tmp, self.model_path)
+        if self.sums is not None:
+            tmp = os.path.join(os.path.dirname(self.state_path), "centroids.tmp.npz")
+            np.savez(tmp, sums=self.sums, counts=self.counts, labels=np.asarray(self.labels))
+            os.replace(tmp, self.state_path)
+        tmp = f"{self.pending_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.pending, f)
+        os.replace(tmp, self.pending_path)
+
+
+def assign_topics(texts, cfg, directory):
+    """Assigns BERTopic topics to ``texts``, updating the persisted model with new articles.
+
+    Returns (topic ids, labels, stats), or (None, None, stats) while the model
+    hasn't seen enough articles for its first fit.
+    """
+    timings = {}
+    start = time.perf_counter()
+    embedder = Embedder(cfg.get("embedding_model", "all-MiniLM-L6-v2"),
+                        EmbeddingStore(os.path.join(directory, "embeddings.sqlite")),
+                        batch_size=cfg.get("batch_size", 64))
+    embeddings, embed_stats = embedder.embed(texts)
+    timings["embed_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = IncrementalTopicModel(directory, n_topics=cfg.get("n_topics", 20),
+                                  min_similarity=cfg.get("min_similarity", 0.0))
+    timings["load_s"] = time.perf_counter() - start
+
+    # New articles are buffered and folded into the model in batches; the first fit
+    # needs at least n_topics articles for the clustering to be defined.
+    seen = set(model.pending)
+    model.pending.extend(t for t in dict.fromkeys(str(t) for t in texts) if t not in seen)
+    update_every = max(cfg.get("update_every", 200), model.n_topics)
+    updated = 0
+    start = time.perf_counter()
+    if len(model.pending) >= update_every or (not model.fitted and len(model.pending) >= model.n_topics):
+        pending_embeddings, _ = embedder.embed(model.pending)
+        model.partial_fit(model.pending, pending_embeddings)
+        updated, model.pending = len(model.pending), []
+    timings["update_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.save()
+    timings["save_s"] = time.perf_counter() - start
+
+    stats = {**embed_stats, "model_updated_with": updated, "pending_articles": len(model.pending)}
+    if not model.fitted or len(texts) == 0:
+        stats["timings"] = {k: round(v, 3) for k, v in timings.items()}
+        return None, None, stats
+
+    start = time.perf_counter()
+    ids, labels, _ = model.assign(embeddings)
+    timings["assign_s"] = time.perf_counter() - start
+    stats["timings"] = {k: round(v, 3) for k, v in timings.items()}
+    return ids, labels, stats
@@ -0,0 +1,705 @@
+"""ClickHouse schema for ``news_articles`` and the migrations that maintain it.
+
+``news_articles`` is a ReplacingMergeTree with a ``version`` column derived
+from ``processed_at``. Rows with the same URL collapse to the newest version
+when parts merge, and ``FINAL`` (or ``argMax(..., version)``) gives the
+collapsed view before that.
+
+The layout is tuned for the dashboards' filters:
+- Rows are sorted by (category, published_at, url_hash), where ``url_hash`` is
+  the cityHash64 of the URL.
+- Rows are partitioned by month of ``published_at``.
+- publisher, category and topic_label are LowCardinality.
+- The text columns are compressed with ZSTD.
+- A bloom filter on ``url_hash`` keeps the loader's URL lookups from scanning
+  the table.
+- A minmax index on ``version`` lets populate_neo4j.py's incremental sync skip
+  granules loaded before its watermark.
+
+Rows only collapse when their whole sort key matches, not just the URL. So
+a reload keeps the category and ``published_at`` its article was first
+stored with: ``loaded_versions`` returns them and the loader reuses them for
+the new version. ``duplicate_urls`` checks that reloaded URLs did collapse.
+An optional TTL (``ttl_clause``) recompresses, moves or deletes
+articles past a given age.
+
+``migrate`` brings the table to the current layout. Each migration runs once, in
+order, and is recorded in ``schema_migrations``. Existing data is copied into
+the new layout rather than dropped. The previous table is kept under a suffix
+(``news_articles_legacy``, ``news_articles_pre_layout``) until someone removes
+it by hand.
+
+Dashboards read aggregates from ``news_rollup_hourly`` and ``news_rollup_daily``
+(see ``ROLLUPS``) instead of scanning ``news_articles``. Materialized views keep
+these AggregatingMergeTree tables up to date on every insert. Each row holds
+one (bucket, category, topic, publisher) group: its article count, sentiment
+sum and uniq states. ``count`` and ``sum`` count every loaded row, so an
+article that was reloaded with a newer version is counted again. The
+``articles_uniq`` state counts each URL once.
+
+``insert_columnar`` sends rows as one array per column, in slices of at most
+``max_bytes`` of estimated row payload, so a large backfill never holds more
+than one slice as Python objects. clickhouse-driver's NumPy insert mode can't
+encode ``Array`` columns, so the plain columnar protocol is used: scalar
+columns go as ``tolist()`` of typed arrays, and datetimes as epoch seconds
+(taken as UTC) to skip per-value timezone conversion.
+
+``bump_data_version`` runs after a load changes the table. It writes the
+headline metrics (articles, average sentiment, publishers, topics) to
+``news_kpi_snapshot``, then stamps a new ``data_version`` in ``table_options``.
+The dashboard reads its KPIs from the newest snapshot row, and its result cache
+drops its entries when the stamp changes.
+
+``entity_graph_nodes`` and ``entity_graph_edges`` hold the co-mention graph
+analytics (see newsops_common/entity_graph.py). Each run adds a snapshot
+stamped with ``computed_at``, and readers take the newest one.
+
+``news_bursts`` holds the breaking-news alerts of ``detect_breaking_news``.
+"""
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TABLE = "news_articles"
+
+INSERT_COLUMNS = [
+    "title", "description", "content", "published_at", "url", "publisher", "category",
+    "sentiment", "processed_at", "topic_id", "topic_label", "locations", "coordinates", "version",
+]
+
+
+SORTING_KEY = "category, published_at, url_hash"
+
+
+def news_articles_ddl(name):
+    return f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            url_hash UInt64 DEFAULT cityHash64(url),
+            title String CODEC(ZSTD(3)),
+            description String CODEC(ZSTD(3)),
+            content String DEFAULT description CODEC(ZSTD(3)),
+            published_at DateTime,
+            url String,
+            publisher LowCardinality(String),
+            category LowCardinality(String),
+            sentiment Float32,
+            processed_at DateTime,
+            topic_id Int32,
+            topic_label LowCardinality(String),
+            locations Array(String),
+            coordinates Array(Tuple(Float64, Float64)),
+            version UInt64,
+            INDEX url_hash_idx url_hash TYPE bloom_filter GRANULARITY 1,
+            INDEX version_idx version TYPE minmax GRANULARITY 1
+        ) ENGINE = ReplacingMergeTree(version)
+        PARTITION BY toYYYYMM(published_at)
+        ORDER BY ({SORTING_KEY})
+        SETTINGS non_replicated_deduplication_window = 100
+    '''
+
+
+def _table_info(client, table, field):
+    rows = client.execute(
+        f"SELECT {field} FROM system.tables WHERE database = currentDatabase() AND name = %(name)s",
+        {"name": table},
+    )
+    return rows[0][0] if rows else None
+
+
+def _replacing_news_articles(client):
+    """Creates news_articles, or copies a plain MergeTree news_articles into the new layout."""
+    engine = _table_info(client, TABLE, "engine")
+    if engine is None:
+        return [news_articles_ddl(TABLE)]
+    if engine == "ReplacingMergeTree":
+        return []
+    staging = f"{TABLE}_migrating"
+    return [
+        # Left over if an earlier attempt failed part way; it only ever holds copied rows.
+        f"DROP TABLE IF EXISTS {staging}",
+        news_articles_ddl(staging),
+        f'''
+            INSERT INTO {staging} (
+                title, description, content, published_at, url, publisher, category,
+                sentiment, processed_at, topic_id, topic_label, locations, coordinates, version
+            )
+            SELECT title, description, content, published_at, url, publisher, category,
+                   sentiment, processed_at, topic_id, topic_label, locations, coordinates,
+                   toUInt64(toUnixTimestamp(processed_at)) * 1000
+            FROM {TABLE}
+        ''',
+        f"RENAME TABLE {TABLE} TO {TABLE}_legacy, {staging} TO {TABLE}",
+    ]
+
+
+# Rollup table -> expression for its time bucket.
+ROLLUPS = {
+    "news_rollup_hourly": "toStartOfHour(published_at)",
+    "news_rollup_daily": "toDate(published_at)",
+}
+
+_ROLLUP_SELECT = '''
+    SELECT {bucket} AS bucket, category, topic_id, topic_label, publisher,
+           count() AS articles,
+           sum(toFloat64(sentiment)) AS sentiment_sum,
+           uniqState(url_hash) AS articles_uniq,
+           uniqState(publisher) AS publishers_uniq,
+           uniqState(topic_id) AS topics_uniq
+    FROM {source}
+    GROUP BY bucket, category, topic_id, topic_label, publisher
+'''
+
+
+def _rollups(client):
+    """Creates the rollup tables, fills them from existing articles, then attaches their views."""
+    statements = []
+    for table, bucket in ROLLUPS.items():
+        bucket_type = "Date" if bucket.startswith("toDate") else "DateTime"
+        statements += [
+            f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket {bucket_type},
+                    category String,
+                    topic_id Int32,
+                    topic_label String,
+                    publisher String,
+                    articles SimpleAggregateFunction(sum, UInt64),
+                    sentiment_sum SimpleAggregateFunction(sum, Float64),
+                    articles_uniq AggregateFunction(uniq, UInt64),
+                    publishers_uniq AggregateFunction(uniq, String),
+                    topics_uniq AggregateFunction(uniq, Int32)
+                ) ENGINE = AggregatingMergeTree()
+                PARTITION BY toYYYYMM(bucket)
+                ORDER BY (bucket, category, topic_id, topic_label, publisher)
+            ''',
+            # Re-running after a failed attempt must not count the backfill twice.
+            f"TRUNCATE TABLE {table}",
+            f"INSERT INTO {table} " + _ROLLUP_SELECT.format(bucket=bucket, source=f"{TABLE} FINAL"),
+        ]
+    return statements + _rollup_views()
+
+
+def _rollup_views():
+    return [
+        f"CREATE MATERIALIZED VIEW IF NOT EXISTS {table}_mv TO {table} AS "
+        + _ROLLUP_SELECT.format(bucket=bucket, source=TABLE)
+        for table, bucket in ROLLUPS.items()
+    ]
+
+
+_TABLE_OPTIONS_DDL = '''
+    CREATE TABLE IF NOT EXISTS table_options (
+        table String,
+        option String,
+        value String,
+        applied_at DateTime DEFAULT now()
+    ) ENGINE = ReplacingMergeTree(applied_at)
+    ORDER BY (table, option)
+'''
+
+
+def _storage_layout(client):
+    """Copies news_articles into the LowCardinality/ZSTD layout sorted by (category, published_at)."""
+    if _table_info(client, TABLE, "sorting_key") == SORTING_KEY:
+        return [_TABLE_OPTIONS_DDL]
+    staging = f"{TABLE}_migrating"
+    columns = ", ".join(["url_hash"] + INSERT_COLUMNS)
+    return [
+        _TABLE_OPTIONS_DDL,
+        f"DROP TABLE IF EXISTS {staging}",
+        news_articles_ddl(staging),
+        f"INSERT INTO {staging} ({columns}) SELECT {columns} FROM {TABLE}",
+        # The rollup views are re-attached to the new table; the rollups already count these rows.
+        *[f"DROP VIEW IF EXISTS {table}_mv" for table in ROLLUPS],
+        f"RENAME TABLE {TABLE} TO {TABLE}_pre_layout, {staging} TO {TABLE}",
+        *_rollup_views(),
+    ]
+
+
+KPI_TABLE = "news_kpi_snapshot"
+
+
+def _kpi_snapshot(client):
+    """Table of headline metrics, one row per load; dashboards read the newest row."""
+    return [f'''
+        CREATE TABLE IF NOT EXISTS {KPI_TABLE} (
+            computed_at DateTime64(3),
+            data_version String,
+            articles UInt64,
+            avg_sentiment Float64,
+            publishers UInt64,
+            topics UInt64
+        ) ENGINE = MergeTree()
+        ORDER BY computed_at
+        TTL toDateTime(computed_at) + INTERVAL 30 DAY
+    ''']
+
+
+GRAPH_NODES = "entity_graph_nodes"
+GRAPH_EDGES = "entity_graph_edges"
+
+
+def _entity_graph(client):
+    """Tables for the co-mention graph analytics; each run adds a snapshot stamped with computed_at."""
+    return [
+        f'''
+            CREATE TABLE IF NOT EXISTS {GRAPH_NODES} (
+                computed_at DateTime,
+                node_id String,
+                kind LowCardinality(String),
+                name String,
+                articles UInt64,
+                degree UInt32,
+                weighted_degree Float64,
+                pagerank Float64,
+                community Int32,
+                x Nullable(Float64),
+                y Nullable(Float64)
+            ) ENGINE = MergeTree()
+            ORDER BY (computed_at, kind, node_id)
+            TTL computed_at + INTERVAL 7 DAY
+        ''',
+        f'''
+            CREATE TABLE IF NOT EXISTS {GRAPH_EDGES} (
+                computed_at DateTime,
+                source String,
+                target String,
+                weight Float64
+            ) ENGINE = MergeTree()
+            ORDER BY (computed_at, source, target)
+            TTL computed_at + INTERVAL 7 DAY
+        ''',
+    ]
+
+
+BURSTS = "news_bursts"
+
+
+def _bursts(client):
+    """Breaking-news alerts from bursts.py; a still-open bucket is re-scored by later runs, newest wins."""
+    return [f'''
+        CREATE TABLE IF NOT EXISTS {BURSTS} (
+            bucket DateTime,
+            bucket_end DateTime,
+            kind LowCardinality(String),
+            key String,
+            signal LowCardinality(String),
+            articles UInt32,
+            sentiment Float64,
+            expected Float64,
+            score Float64,
+            detected_at DateTime
+        ) ENGINE = ReplacingMergeTree(detected_at)
+        ORDER BY (bucket, kind, key, signal)
+        TTL bucket + INTERVAL 30 DAY
+    ''']
+
+
+def _collapse_url_versions(client):
+    """Drops the older versions of URLs that were reloaded under another sort key and never collapsed.
+
+    The rollups counted those versions too, so they are refilled from what remains.
+    """
+    statements = [f'''
+        ALTER TABLE {TABLE} DELETE
+        WHERE (url, version) NOT IN (SELECT url, max(version) FROM {TABLE} GROUP BY url)
+        SETTINGS mutations_sync = 1
+    ''']
+    for table, bucket in ROLLUPS.items():
+        statements += [
+            f"TRUNCATE TABLE {table}",
+            f"INSERT INTO {table} " + _ROLLUP_SELECT.format(bucket=bucket, source=f"{TABLE} FINAL"),
+        ]
+    return statements
+
+
+def _version_index(client):
+    """Adds the minmax index on ``version`` and builds it for the parts already on disk."""
+    return [
+        f"ALTER TABLE {TABLE} ADD INDEX IF NOT EXISTS version_idx version TYPE minmax GRANULARITY 1",
+        f"ALTER TABLE {TABLE} MATERIALIZE INDEX version_idx SETTINGS mutations_sync = 1",
+    ]
+
+
+# (version, name, function returning the statements to run); append only.
+MIGRATIONS = [
+    (1, "replacing_merge_tree", _replacing_news_articles),
+    (2, "aggregating_rollups", _rollups),
+    (3, "storage_layout", _storage_layout),
+    (4, "kpi_snapshot", _kpi_snapshot),
+    (5, "entity_graph", _entity_graph),
+    (6, "bursts", _bursts),
+    (7, "collapse_url_versions", _collapse_url_versions),
+    (8, "version_index", _version_index),
+]
+
+
+def migrate(client):
+    """Applies pending migrations and returns the names of those applied."""
+    client.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version UInt32,
+            name String,
+            applied_at DateTime DEFAULT now()
+        ) ENGINE = MergeTree()
+        ORDER BY version
+    ''')
+    done = {row[0] for row in client.execute("SELECT version FROM schema_migrations")}
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in done:
+            continue
+        logger.info(f"Applying ClickHouse migration {version}: {name}")
+        for statement in statements(client):
+            client.execute(statement)
+        client.execute("INSERT INTO schema_migrations (version, name) VALUES", [(version, name)])
+        applied.append(name)
+    return applied
+
+
+_STRING_COLUMNS = ["title", "description", "content", "url", "publisher", "category", "topic_label"]
+_DATETIME_COLUMNS = ["published_at", "processed_at"]
+
+
+def ttl_clause(cfg):
+    """TTL expression for a ``clickhouse.ttl`` settings block, or "" when no TTL is configured.
+
+    ``action`` is "recompress" (re-encode with ``codec``), "move" (to the storage
+    policy's ``volume``) or "delete"; it applies ``after_days`` after publication.
+    """
+    days = int(cfg.get("after_days") or 0)
+    if days <= 0:
+        return ""
+    action = cfg.get("action", "recompress")
+    expr = f"published_at + INTERVAL {days} DAY"
+    if action == "recompress":
+        return f"{expr} RECOMPRESS CODEC({cfg.get('codec', 'ZSTD(12)')})"
+    if action == "move":
+        return f"{expr} TO VOLUME '{cfg.get('volume', 'cold')}'"
+    if action == "delete":
+        return f"{expr} DELETE"
+    raise ValueError(f"Unknown TTL action {action!r}, expected recompress, move or delete")
+
+
+def apply_ttl(client, cfg):
+    """Sets the table TTL from settings if it changed since it was last applied; returns the new clause or None."""
+    clause = ttl_clause(cfg)
+    rows = client.execute(
+        "SELECT value FROM table_options FINAL WHERE table = %(table)s AND option = 'ttl'", {"table": TABLE},
+    )
+    if clause == (rows[0][0] if rows else ""):
+        return None
+    # Existing parts are rewritten once to apply the new rule.
+    client.execute(f"ALTER TABLE {TABLE} MODIFY TTL {clause}" if clause else f"ALTER TABLE {TABLE} REMOVE TTL")
+    client.execute("INSERT INTO table_options (table, option, value) VALUES", [(TABLE, "ttl", clause)])
+    logger.info(f"Set {TABLE} TTL to {clause or 'none'}")
+    return clause
+
+
+def bump_data_version(client, kpis=True):
+    """Records a new data version for news_articles; dashboards drop cached results when it changes.
+
+    The KPI snapshot for the new version is written first, so a dashboard that
+    sees the new version also finds its snapshot. Assets that only add derived
+    tables (bursts, the entity graph) pass ``kpis=False`` to skip that scan.
+    """
+    version = str(time.time_ns() // 1_000_000)
+    if kpis:
+        # One scan of the collapsed table: each article counts once, however often it was reloaded.
+        client.execute(f'''
+            INSERT INTO {KPI_TABLE} (computed_at, data_version, articles, avg_sentiment, publishers, topics)
+            SELECT now64(3), %(version)s, count(), if(count() = 0, 0, avg(sentiment)),
+                   uniqExact(publisher), uniqExactIf(topic_id, topic_id >= 0)
+            FROM {TABLE} FINAL
+        ''', {"version": version})
+    client.execute("INSERT INTO table_options (table, option, value) VALUES", [(TABLE, "data_version", version)])
+    return version
+
+
+def entity_groups(client):
+    """(publisher, topic_label, locations, articles) per distinct combination, for the co-mention graph."""
+    return client.execute(f'''
+        SELECT publisher, topic_label, arraySort(arrayDistinct(locations)) AS locs, count() AS articles
+        FROM {TABLE} FINAL
+        GROUP BY publisher, topic_label, locs
+    ''')
+
+
+def latest_layout(client):
+    """{node_id: (x, y)} from the newest stored graph, to keep nodes in place across runs."""
+    rows = client.execute(f'''
+        SELECT node_id, x, y FROM {GRAPH_NODES}
+        WHERE computed_at = (SELECT max(computed_at) FROM {GRAPH_NODES}) AND x IS NOT NULL
+    ''')
+    return {node: (x, y) for node, x, y in rows}
+
+
+def store_entity_graph(client, graph, computed_at):
+    """Inserts an ``EntityGraph`` as the snapshot for ``computed_at``."""
+    nodes = graph.nodes.astype(object).where(graph.nodes.notna(), None)
+    client.execute(
+        f"INSERT INTO {GRAPH_NODES} (computed_at, {', '.join(nodes.columns)}) VALUES",
+        [(computed_at, *row) for row in nodes.itertuples(index=False, name=None)],
+    )
+    client.execute(
+        f"INSERT INTO {GRAPH_EDGES} (computed_at, {', '.join(graph.edges.columns)}) VALUES",
+        [(computed_at, *row) for row in graph.edges.itertuples(index=False, name=None)],
+    )
+
+
+def store_bursts(client, alerts, detected_at):
+    """Inserts burst alerts (``bursts.ALERT_COLUMNS``) stamped with ``detected_at``; times are taken as UTC."""
+    def epoch(values):
+        return pd.to_datetime(values).astype("datetime64[ns]").astype("int64") // 1_000_000_000
+
+    alerts = alerts.assign(bucket=epoch(alerts["bucket"]), bucket_end=epoch(alerts["bucket_end"]))
+    detected_at = int(epoch(pd.Series([detected_at])).iloc[0])
+    client.execute(
+        f"INSERT INTO {BURSTS} ({', '.join(alerts.columns)}, detected_at) VALUES",
+        [(*row, detected_at) for row in zip(*(alerts[column].tolist() for column in alerts.columns))],
+    )
+
+
+def row_versions(processed_at):
+    """Milliseconds since the epoch of each ``processed_at``, as the ReplacingMergeTree version."""
+    return pd.to_datetime(processed_at).astype("datetime64[ns]").astype("int64") // 1_000_000
+
+
+def loaded_versions(client, urls, chunk_size=1000):
+    """Returns {url: (version, category, published_at)} of the newest loaded row of each given URL.
+
+    ``published_at`` is in epoch seconds. Only the URLs' url_hash keys are probed.
+    """
+    urls = list(dict.fromkeys(urls))
+    found = {}
+    for start in range(0, len(urls), chunk_size):
+        chunk = urls[start:start + chunk_size]
+        rows = client.execute(
+            f'''
+                SELECT url, max(version), argMax(category, version), toUnixTimestamp(argMax(published_at, version))
+                FROM {TABLE}
+                WHERE url_hash IN (SELECT cityHash64(arrayJoin(%(urls)s))) AND url IN %(urls)s
+                GROUP BY url
+            ''',
+            {"urls": chunk},
+        )
+        found.update((url, (int(version), category, int(published_at))) for url, version, category, published_at in rows)
+    return found
+
+
+def duplicate_urls(client, urls, chunk_size=1000):
+    """Returns the given URLs that still have more than one row after ``FINAL``."""
+    urls = list(dict.fromkeys(urls))
+    found = []
+    for start in range(0, len(urls), chunk_size):
+        chunk = urls[start:start + chunk_size]
+        rows = client.execute(
+            f'''
+                SELECT url FROM {TABLE} FINAL
+                WHERE url_hash IN (SELECT cityHash64(arrayJoin(%(urls)s))) AND url IN %(urls)s
+                GROUP BY url
+                HAVING count() > 1
+            ''',
+            {"urls": chunk},
+        )
+        found.extend(url for url, in rows)
+    return found
+
+
+def aligned_locations(names, coordinates):
+    """Truncates each row's names and coordinates to the shorter of the two lists.
+
+    Lengths are compared as arrays, and only rows that actually differ are sliced.
+    Missing lists become empty ones. Returns two Series on the same index.
+    """
+    name_len = names.str.len().fillna(0).to_numpy(dtype=np.int64)
+    coord_len = coordinates.str.len().fillna(0).to_numpy(dtype=np.int64)
+    keep = np.minimum(name_len, coord_len)
+
+    def truncate(lists, lengths):
+        out = lists.to_numpy(dtype=object, copy=True)
+        for i in np.flatnonzero(lengths != keep):
+            out[i] = list(out[i][:keep[i]]) if keep[i] else []
+        return pd.Series(out, index=lists.index, dtype=object)
+
+    return truncate(names, name_len), truncate(coordinates, coord_len)
+
+
+def _row_bytes(df):
+    """Rough wire size of each row: string lengths, fixed-width columns and array payloads."""
+    size = np.full(len(df), 64, dtype=np.int64)
+    for column in _STRING_COLUMNS:
+        size += df[column].str.len().fillna(0).to_numpy(dtype=np.int64)
+    size += df["coordinates"].str.len().fillna(0).to_numpy(dtype=np.int64) * 16
+    name_bytes = df["locations"].explode().str.len().groupby(level=0).sum()
+    size += name_bytes.reindex(df.index, fill_value=0).fillna(0).to_numpy(dtype=np.int64)
+    return size
+
+
+def _columns(part):
+    """One Python list per INSERT_COLUMNS entry, in order."""
+    columns = []
+    for column in INSERT_COLUMNS:
+        values = part[column]
+        if column in _DATETIME_COLUMNS:
+            values = pd.to_datetime(values).astype("datetime64[ns]").astype("int64") // 1_000_000_000
+        elif column == "sentiment":
+            values = values.astype(np.float64)
+        elif column in ("topic_id", "version"):
+            values = values.astype(np.int64)
+        elif column in _STRING_COLUMNS:
+            values = values.astype(str)
+        columns.append(values.tolist())
+    return columns
+
+
+def insert_columnar(client, df, max_bytes=64 * 1024 * 1024):
+    """Inserts ``df[INSERT_COLUMNS]`` in column-oriented slices; returns (rows, slices)."""
+    if df.empty:
+        return 0, 0
+    ends = np.cumsum(_row_bytes(df))
+    # Slice boundaries wherever the running payload crosses another multiple of max_bytes.
+    cuts = np.flatnonzero(np.diff(ends // max(int(max_bytes), 1))) + 1
+    bounds = [0, *cuts.tolist(), len(df)]
+    query = f"INSERT INTO {TABLE} ({', '.join(INSERT_COLUMNS)}) VALUES"
+    for start, stop in zip(bounds, bounds[1:]):
+        client.execute(query, _columns(df.iloc[start:stop]), columnar=True)
+    return len(df), len(bounds) - 1
+
+
+# Layouts compared by the benchmark: the original plain MergeTree, the first
+# ReplacingMergeTree keyed by url_hash, and the current one. The older layouts'
+# text columns are pinned to LZ4 (a stock server's default) so the comparison
+# doesn't depend on the server's <compression> config.
+_BENCHMARK_LAYOUTS = {
+    "original": ("cityHash64(url)", '''
+        CREATE TABLE {name} (
+            title String CODEC(LZ4), description String CODEC(LZ4), content String DEFAULT description CODEC(LZ4),
+            published_at DateTime, url String, publisher String, category String,
+            sentiment Float32, processed_at DateTime, topic_id Int32, topic_label String,
+            locations Array(String), coordinates Array(Tuple(Float64, Float64))
+        ) ENGINE = MergeTree() ORDER BY published_at
+    '''),
+    "url_hash": ("url_hash", '''
+        CREATE TABLE {name} (
+            url_hash UInt64 DEFAULT cityHash64(url),
+            title String CODEC(LZ4), description String CODEC(LZ4), content String DEFAULT description CODEC(LZ4),
+            published_at DateTime, url String, publisher String, category String,
+            sentiment Float32, processed_at DateTime, topic_id Int32, topic_label String,
+            locations Array(String), coordinates Array(Tuple(Float64, Float64)), version UInt64
+        ) ENGINE = ReplacingMergeTree(version) PARTITION BY toYYYYMM(published_at) ORDER BY url_hash
+    '''),
+    "current": ("url_hash", news_articles_ddl("{name}")),
+}
+
+_BENCHMARK_QUERIES = {
+    "category totals": "SELECT category, count(), avg(sentiment) FROM {table} GROUP BY category",
+    "category hourly, 7 days": '''
+        SELECT toStartOfHour(published_at) AS hour, count() FROM {table}
+        WHERE category = 'Technology' AND published_at >= toDateTime('2024-12-24 00:00:00')
+        GROUP BY hour
+    ''',
+    "latest 20 in category": '''
+        SELECT title, publisher, published_at FROM {table}
+        WHERE category = 'Business' ORDER BY published_at DESC LIMIT 20
+    ''',
+    "top 10 publishers": "SELECT publisher, count() AS c FROM {table} GROUP BY publisher ORDER BY c DESC LIMIT 10",
+    "100 url lookups": '''
+        SELECT count() FROM {table}
+        WHERE {url_hash} IN (SELECT cityHash64('https://news.example/' || toString(number * 9973)) FROM numbers(100))
+    ''',
+}
+
+
+_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "web_app", "data", "articles.json")
+
+
+def _vocabulary(path):
+    """Words of the snapshot's titles and descriptions, most frequent first."""
+    import json
+    from collections import Counter
+
+    with open(path) as f:
+        articles = json.load(f)
+    words = Counter(w for a in articles for field in ("title", "description") for w in str(a.get(field) or "").split())
+    return [w for w, _ in words.most_common()]
+
+
+def _benchmark(client, n, corpus=_SNAPSHOT, repeat=5):
+    import statistics
+    import time
+
+    # Text is drawn from a real vocabulary with a skewed word frequency, so codecs see news-like text.
+    words = _vocabulary(corpus) if corpus and os.path.exists(corpus) else ["market", "election", "storm", "vaccine"]
+
+    # Identical synthetic rows for every layout: one year of articles, 6 categories, 300 publishers.
+    client.execute("DROP TABLE IF EXISTS bench_source")
+    client.execute(_BENCHMARK_LAYOUTS["url_hash"][1].format(name="bench_source"))
+    client.execute(f'''
+        INSERT INTO bench_source (title, description, content, published_at, url, publisher, category,
+                                  sentiment, processed_at, topic_id, topic_label, locations, coordinates, version)
+        WITH %(words)s AS words,
+             ['Technology', 'Business', 'Sports', 'Health', 'Science', 'Entertainment'] AS categories
+        SELECT
+            arrayStringConcat(arrayMap(i -> words[1 + toUInt32(pow((cityHash64(number, i) %% 1000000) / 1e6, 3) * length(words))], range(9)), ' ') AS title,
+            arrayStringConcat(arrayMap(i -> words[1 + toUInt32(pow((cityHash64(number, i, 1) %% 1000000) / 1e6, 3) * length(words))], range(35)), ' ') AS description,
+            description,
+            toDateTime('2024-01-01 00:00:00') + toIntervalSecond(cityHash64(number, 2) %% (365 * 86400)),
+            'https://news.example/' || toString(number),
+            'Publisher ' || toString(cityHash64(number, 3) %% 300),
+            categories[1 + number %% 6],
+            toFloat32((cityHash64(number, 4) %% 2001) / 1000.0 - 1.0),
+            now(),
+            toInt32(cityHash64(number, 5) %% 7) - 1,
+            categories[1 + cityHash64(number, 5) %% 6],
+            arrayMap(i -> words[1 + cityHash64(number, i, 6) %% length(words)], range(number %% 3)),
+            arrayMap(i -> (toFloat64(i), toFloat64(-i)), range(number %% 3)),
+            1
+        FROM numbers({int(n)})
+    ''', {"words": words})
+
+    for layout, (url_hash, ddl) in _BENCHMARK_LAYOUTS.items():
+        table = f"bench_{layout}"
+        client.execute(f"DROP TABLE IF EXISTS {table}")
+        client.execute(ddl.format(name=table))
+        columns = ", ".join(c for c in INSERT_COLUMNS if layout != "original" or c != "version")
+        client.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM bench_source")
+        client.execute(f"OPTIMIZE TABLE {table} FINAL")
+        size, text = client.execute(
+            '''
+                SELECT sum(column_data_compressed_bytes),
+                       sumIf(column_data_compressed_bytes, column IN ('title', 'description', 'content'))
+                FROM system.parts_columns
+                WHERE database = currentDatabase() AND table = %(table)s AND active
+            ''',
+            {"table": table},
+        )[0]
+        timings = []
+        for name, query in _BENCHMARK_QUERIES.items():
+            sql = query.format(table=table, url_hash=url_hash)
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                client.execute(sql)
+                runs.append(time.perf_counter() - start)
+            timings.append(f"{name} {statistics.median(runs) * 1000:.1f}ms")
+        print(f"{layout:>9}: {size / 2 ** 20:7.1f} MiB compressed ({text / 2 ** 20:.1f} MiB text) | " + " | ".join(timings))
+        client.execute(f"DROP TABLE {table}")
+    client.execute("DROP TABLE bench_source")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from clickhouse_driver import Client
+
+    parser = argparse.ArgumentParser(description="Compare news_articles storage layouts on synthetic data.")
+    parser.add_argument("--benchmark", type=int, default=1_000_000, metavar="N")
+    parser.add_argument("--host", default="clickhouse")
+    args = parser.parse_args()
+    _benchmark(Client(host=args.host), args.benchmark)
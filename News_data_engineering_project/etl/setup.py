@@ -18,6 +18,8 @@ setup(
         "bertopic",
         "spacy",
         "geopy",
+        "networkx",
+        "scipy",
     ],
     extras_require={"dev": ["dagster-webserver", "pytest"]},
 )
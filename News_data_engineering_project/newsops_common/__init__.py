@@ -0,0 +1,5 @@
+"""Code shared by the Dagster pipeline, the Streamlit dashboard and the web_app snapshot builder.
+
+Mounted next to ``shared_config`` in each container (see docker-compose.yml), so
+modules here must not depend on Dagster or Streamlit.
+"""
@@ -0,0 +1,142 @@
+"""Co-mention graph of publishers, topics and locations.
+
+Two entities are linked when they appear on the same article. A publisher, the
+article's topic and each of its locations are all linked to each other. The
+graph is built as a sparse matrix. ``B`` is the article x entity incidence
+matrix, and the co-mention weights are ``A = Bᵀ W B`` with the diagonal
+removed. Articles sharing the same (publisher, topic, locations) arrive as a
+single row, and ``W`` holds how many articles each row stands for.
+
+``build`` computes the following on ``A``:
+- Degree: linked entities and total link weight.
+- PageRank, by power iteration on the sparse matrix.
+- Louvain communities with a fixed seed. Ids are renumbered by community size,
+  so 0 is the largest.
+- A force-directed layout of the ``layout_nodes`` highest-ranked entities.
+  Nodes placed by the previous run keep their positions, and new ones settle
+  in around them. The whole layout is recomputed only when most nodes are new.
+
+Nothing here depends on Dagster or Streamlit. The pipeline stores the result
+and the dashboard's offline engine builds the same tables from its snapshot.
+"""
+from dataclasses import dataclass
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from networkx.algorithms.community import louvain_communities
+from scipy import sparse
+
+NODE_COLUMNS = ["node_id", "kind", "name", "articles", "degree", "weighted_degree", "pagerank", "community", "x", "y"]
+EDGE_COLUMNS = ["source", "target", "weight"]
+
+
+@dataclass(frozen=True)
+class EntityGraph:
+    nodes: pd.DataFrame  # NODE_COLUMNS, highest PageRank first; x and y are NaN outside the layout
+    edges: pd.DataFrame  # EDGE_COLUMNS, between laid-out nodes, heaviest first
+
+
+def node_id(kind, name):
+    return f"{kind}:{name}"
+
+
+def incidence(groups):
+    """(B, W, node ids) for rows of (publisher, topic_label, locations, articles)."""
+    ids = {}
+    rows, cols = [], []
+    weights = []
+    for row, (publisher, topic_label, locations, articles) in enumerate(groups):
+        keys = [node_id("publisher", publisher), node_id("topic", topic_label)]
+        keys += [node_id("location", name) for name in dict.fromkeys(locations or []) if name]
+        for key in keys:
+            rows.append(row)
+            cols.append(ids.setdefault(key, len(ids)))
+        weights.append(articles)
+    b = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(weights), len(ids)))
+    return b, np.asarray(weights, dtype="float64"), list(ids)
+
+
+def pagerank(a, damping=0.85, tol=1e-10, max_iter=100):
+    """PageRank of a weighted, undirected sparse adjacency matrix."""
+    n = a.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out = np.asarray(a.sum(axis=1)).ravel()
+    dangling = out == 0
+    # Column-stochastic transition matrix: each node spreads its rank over its links by weight.
+    inverse = np.divide(1.0, out, out=np.zeros(n), where=~dangling)
+    transition = (sparse.diags(inverse) @ a).T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = rank
+        rank = damping * (transition @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(rank - previous).sum() < n * tol:
+            break
+    return rank / rank.sum()
+
+
+def communities(a, seed=42):
+    """Community id per node, numbered by community size (largest first)."""
+    graph = nx.from_scipy_sparse_array(a)
+    groups = sorted(louvain_communities(graph, weight="weight", seed=seed), key=lambda c: (-len(c), min(c)))
+    labels = np.zeros(a.shape[0], dtype="int32")
+    for label, members in enumerate(groups):
+        labels[list(members)] = label
+    return labels
+
+
+def layout(a, keys, previous=None, seed=42, iterations=50):
+    """{key: (x, y)} for the nodes of ``a``, starting from ``previous`` positions where known."""
+    graph = nx.relabel_nodes(nx.from_scipy_sparse_array(a), dict(enumerate(keys)))
+    if graph.number_of_nodes() == 0:
+        return {}
+    previous = {key: xy for key, xy in (previous or {}).items() if key in graph}
+    if len(previous) < graph.number_of_nodes() / 2:
+        # Mostly new nodes: lay the whole graph out again.
+        pos = nx.spring_layout(graph, weight="weight", iterations=iterations, seed=seed)
+    elif len(previous) == graph.number_of_nodes():
+        pos = previous
+    else:
+        # Known nodes stay where they were; new ones settle in around them.
+        pos = nx.spring_layout(graph, pos=previous, fixed=list(previous), weight="weight",
+                               iterations=iterations, seed=seed)
+    return {key: (float(x), float(y)) for key, (x, y) in pos.items()}
+
+
+def build(groups, previous=None, layout_nodes=300, max_edges=2000, seed=42):
+    """Co-mention graph analytics for ``groups`` of (publisher, topic_label, locations, articles)."""
+    b, w, keys = incidence(groups)
+    if not keys:
+        return EntityGraph(pd.DataFrame(columns=NODE_COLUMNS), pd.DataFrame(columns=EDGE_COLUMNS))
+    a = (b.T @ sparse.diags(w) @ b).tocsr()
+    articles = a.diagonal()
+    a.setdiag(0)
+    a.eliminate_zeros()
+
+    rank = pagerank(a)
+    nodes = pd.DataFrame({
+        "node_id": keys,
+        "kind": [key.split(":", 1)[0] for key in keys],
+        "name": [key.split(":", 1)[1] for key in keys],
+        "articles": articles.astype("int64"),
+        "degree": np.diff(a.indptr).astype("int64"),
+        "weighted_degree": np.asarray(a.sum(axis=1)).ravel(),
+        "pagerank": rank,
+        "community": communities(a, seed=seed),
+    })
+
+    top = np.argsort(-rank, kind="stable")[:layout_nodes]
+    sub = a[top][:, top]
+    pos = layout(sub, [keys[i] for i in top], previous=previous, seed=seed)
+    nodes["x"] = nodes["node_id"].map(lambda key: pos[key][0] if key in pos else np.nan)
+    nodes["y"] = nodes["node_id"].map(lambda key: pos[key][1] if key in pos else np.nan)
+
+    upper = sparse.triu(sub).tocoo()
+    edges = pd.DataFrame({
+        "source": [keys[top[i]] for i in upper.row],
+        "target": [keys[top[j]] for j in upper.col],
+        "weight": upper.data,
+    }).sort_values("weight", ascending=False, kind="stable").head(max_edges).reset_index(drop=True)
+    nodes = nodes.sort_values("pagerank", ascending=False, kind="stable").reset_index(drop=True)
+    return EntityGraph(nodes[NODE_COLUMNS], edges[EDGE_COLUMNS])
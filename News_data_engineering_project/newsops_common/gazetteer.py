@@ -0,0 +1,116 @@
+"""Offline gazetteer of countries, regions and major cities.
+
+``data/gazetteer.csv`` ships with the repo: one row per place with a stable id,
+its ISO country code, coordinates and ``|``-separated alternate names. A
+GeoNames dump (e.g. ``cities15000.txt`` from download.geonames.org) can be
+layered on top for wider city coverage. Lookups are case-insensitive and ignore
+periods, so "U.S." and "us" find the same place.
+"""
+import csv
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.csv")
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Bundled names win over GeoNames, and official names over alternate ones.
+_KIND_ORDER = {"country": 0, "region": 1, "city": 2}
+
+
+def _is_geonames(place):
+    return place.id.startswith("geonames:")
+
+
+def normalize_name(name):
+    name = _WHITESPACE.sub(" ", str(name or "").replace(".", "").casefold()).strip()
+    if name.startswith("the "):
+        name = name[4:]
+    return name
+
+
+@dataclass(frozen=True)
+class Place:
+    id: str
+    name: str
+    kind: str
+    country_code: str
+    lat: float
+    lon: float
+
+
+class Gazetteer:
+    """Name -> Place index over the bundled table and optional GeoNames data."""
+
+    def __init__(self, places, alternate_names=None):
+        self.places = {}
+        self._by_name = {}
+        alternate_names = alternate_names or {}
+        for rank in (0, 1):
+            layer = sorted((p for p in places if _is_geonames(p) == bool(rank)),
+                           key=lambda p: _KIND_ORDER.get(p.kind, 3))
+            for place in layer:
+                self.places.setdefault(place.id, place)
+                self._by_name.setdefault(normalize_name(place.name), place.id)
+            for place in layer:
+                for alias in alternate_names.get(place.id, ()):
+                    self._by_name.setdefault(normalize_name(alias), place.id)
+
+    def __len__(self):
+        return len(self.places)
+
+    def lookup(self, name):
+        place_id = self._by_name.get(normalize_name(name))
+        return self.places[place_id] if place_id else None
+
+    def names(self):
+        """Every (normalized name, place id) pair in the index."""
+        return self._by_name.items()
+
+    @classmethod
+    def load(cls, path=None, geonames_path=None, min_population=15000):
+        places, alternate_names = [], {}
+        with open(path or DEFAULT_PATH, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                places.append(Place(row["id"], row["name"], row["kind"], row["country_code"],
+                                    float(row["lat"]), float(row["lon"])))
+                alternate_names[row["id"]] = [a for a in row["aliases"].split("|") if a]
+        if geonames_path:
+            geonames, geonames_names = _read_geonames(geonames_path, min_population)
+            places.extend(geonames)
+            alternate_names.update(geonames_names)
+        gazetteer = cls(places, alternate_names)
+        logger.info(f"Loaded gazetteer with {len(gazetteer)} places")
+        return gazetteer
+
+
+def _read_geonames(path, min_population):
+    """Reads populated places from a GeoNames tab-separated dump."""
+    places, alternate_names = [], {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 15 or cols[6] != "P":
+                continue
+            try:
+                population = int(cols[14] or 0)
+                lat, lon = float(cols[4]), float(cols[5])
+            except ValueError:
+                continue
+            if population < min_population:
+                continue
+            place_id = f"geonames:{cols[0]}"
+            places.append(Place(place_id, cols[1], "city", cols[8], lat, lon))
+            alternate_names[place_id] = [cols[2]] + [a for a in cols[3].split(",") if a]
+    return places, alternate_names
+
+
+@lru_cache(maxsize=4)
+def get_gazetteer(path=None, geonames_path=None):
+    """Process-wide gazetteer; the bundled table loads in a few milliseconds."""
+    return Gazetteer.load(path, geonames_path)
@@ -0,0 +1,192 @@
+"""Neo4j graph schema and batched loading.
+
+The graph has four node types and three relationship types:
+- ``(:Publisher)-[:PUBLISHED]->(:Article)``
+- ``(:Article)-[:BELONGS_TO]->(:Topic)``
+- ``(:Article)-[:MENTIONS]->(:Location)``
+
+Every node is MERGEd on one key: ``Article.url``, ``Publisher.name``,
+``Topic.label`` or ``Location.name``. ``ensure_constraints`` makes those keys
+unique, which also indexes them, so each MERGE is an index lookup rather than a
+label scan. The statements are ``IF NOT EXISTS`` and cost nothing once the
+constraints exist.
+
+``write_batches`` sends rows to one ``UNWIND`` statement in transactions of
+``batch_size`` rows, instead of one transaction per article. A batch that fails
+with a transient error (deadlock, leader switch, dropped connection) is retried
+on a new session, with jittered exponential backoff. Any other error fails only
+its own batch. The report counts rows, batches, failures, retries and
+throughput.
+
+``ENTITY_METRICS`` copies the co-mention graph analytics (PageRank, community,
+layout position) onto Publisher, Topic and Location nodes.
+"""
+import logging
+import random
+import time
+
+import pandas as pd
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+logger = logging.getLogger(__name__)
+
+CONSTRAINTS = [
+    "CREATE CONSTRAINT article_url IF NOT EXISTS FOR (a:Article) REQUIRE a.url IS UNIQUE",
+    "CREATE CONSTRAINT publisher_name IF NOT EXISTS FOR (p:Publisher) REQUIRE p.name IS UNIQUE",
+    "CREATE CONSTRAINT topic_label IF NOT EXISTS FOR (t:Topic) REQUIRE t.label IS UNIQUE",
+    "CREATE CONSTRAINT location_name IF NOT EXISTS FOR (l:Location) REQUIRE l.name IS UNIQUE",
+]
+
+UPSERT_ARTICLES = """
+    UNWIND $rows AS row
+    MERGE (p:Publisher {name: row.publisher})
+    MERGE (a:Article {url: row.url})
+    SET a.title = row.title,
+        a.sentiment = row.sentiment,
+        a.published_at = row.published_at,
+        a.topic_label = row.topic_label,
+        a.sync_run = coalesce($run, a.sync_run)
+    // A changed article may have moved publisher, topic or locations.
+    WITH row, p, a
+    CALL {
+        WITH a
+        OPTIONAL MATCH (a)-[old:BELONGS_TO|MENTIONS]->()
+        DELETE old
+    }
+    CALL {
+        WITH a, p
+        OPTIONAL MATCH (other:Publisher)-[old:PUBLISHED]->(a)
+        WHERE other <> p
+        DELETE old
+    }
+    MERGE (p)-[:PUBLISHED]->(a)
+
+    MERGE (t:Topic {label: row.topic_label})
+    MERGE (a)-[:BELONGS_TO]->(t)
+
+    FOREACH (loc IN row.locations |
+        MERGE (l:Location {name: loc.name})
+        SET l.location_id = coalesce(loc.id, l.location_id),
+            l.country_code = coalesce(loc.country_code, l.country_code)
+        MERGE (a)-[:MENTIONS]->(l)
+    )
+"""
+
+# Co-mention graph analytics (newsops_common/entity_graph.py) per entity kind, keyed like the MERGEs above.
+# Entities are only matched: the analytics never create nodes the article load didn't.
+ENTITY_METRICS = {
+    kind: f"""
+    UNWIND $rows AS row
+    MATCH (n:{label} {{{key}: row.name}})
+    SET n.articles = row.articles,
+        n.degree = row.degree,
+        n.pagerank = row.pagerank,
+        n.community = row.community,
+        n.x = row.x,
+        n.y = row.y,
+        n.graph_run = $run
+"""
+    for kind, label, key in [("publisher", "Publisher", "name"), ("topic", "Topic", "label"),
+                             ("location", "Location", "name")]
+}
+
+_TRANSIENT_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+
+def ensure_constraints(driver):
+    """Creates the uniqueness constraints (and their indexes) that the loaders MERGE on."""
+    with driver.session() as session:
+        for statement in CONSTRAINTS:
+            session.run(statement).consume()
+
+
+def _entity_lists(names, ids, countries):
+    # Missing ids and country codes are sent as null, so they don't erase what a Location already has.
+    names = list(names) if isinstance(names, (list, tuple)) else []
+    ids = list(ids) if isinstance(ids, (list, tuple)) else [None] * len(names)
+    countries = list(countries) if isinstance(countries, (list, tuple)) else [None] * len(names)
+    return [{"name": str(name), "id": str(loc_id) if loc_id else None, "country_code": str(country) if country else None}
+            for name, loc_id, country in zip(names, ids, countries)]
+
+
+def article_rows(df):
+    """``UPSERT_ARTICLES`` parameters for each article: plain Python values, locations as entity maps."""
+    if df is None or df.empty:
+        return []
+    n = len(df)
+
+    def column(name, default):
+        return df[name].tolist() if name in df.columns else [default] * n
+
+    locations = column("locations", [])
+    location_ids = column("location_ids", None)
+    location_countries = column("location_countries", None)
+    sentiment = pd.to_numeric(df["sentiment"], errors="coerce").fillna(0.0) if "sentiment" in df.columns \
+        else pd.Series([0.0] * n)
+    return [
+        {
+            "url": str(url),
+            "title": str(title),
+            "publisher": str(publisher),
+            "sentiment": float(score),
+            "published_at": str(published_at),
+            "topic_label": str(topic_label),
+            "locations": _entity_lists(names, ids, countries),
+        }
+        for url, title, publisher, score, published_at, topic_label, names, ids, countries in zip(
+            column("url", ""), column("title", ""), column("publisher", "Unknown"), sentiment.tolist(),
+            column("published_at", ""), column("topic_label", "General"),
+            locations, location_ids, location_countries,
+        )
+    ]
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _write_batch(driver, query, batch, params):
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            tx.run(query, rows=batch, **params).consume()
+            tx.commit()
+
+
+def write_batches(driver, query, rows, batch_size=2000, retries=3, backoff=1.0, params=None):
+    """Runs ``query`` with ``$rows`` bound to consecutive slices of ``rows``, one transaction per slice.
+
+    ``params`` are bound alongside ``$rows`` in every batch; ``UPSERT_ARTICLES``
+    takes ``$run`` (null outside a sync run). Returns a report dict: rows,
+    batches, failed_rows, retries, elapsed_s and rows_per_sec.
+    """
+    params = {"run": None, **(params or {})}
+    batch_size = max(1, int(batch_size))
+    report = {"rows": len(rows), "batches": 0, "failed_rows": 0, "retries": 0}
+    start = time.monotonic()
+    for offset in range(0, len(rows), batch_size):
+        batch = rows[offset:offset + batch_size]
+        report["batches"] += 1
+        for attempt in range(retries + 1):
+            try:
+                _write_batch(driver, query, batch, params)
+                break
+            except _TRANSIENT_ERRORS as e:
+                if attempt == retries:
+                    logger.error(f"Neo4j batch at row {offset} failed after {attempt + 1} attempts: {e}")
+                    report["failed_rows"] += len(batch)
+                    break
+                delay = backoff_delay(attempt, base=backoff)
+                logger.info(f"Retrying Neo4j batch at row {offset} in {delay:.2f}s after: {type(e).__name__}: {e}")
+                report["retries"] += 1
+                time.sleep(delay)
+            except Exception as e:
+                # Bad data or a bad query fails the same way every time; retrying won't help.
+                logger.error(f"Neo4j batch at row {offset} failed: {type(e).__name__}: {e}")
+                report["failed_rows"] += len(batch)
+                break
+    elapsed = time.monotonic() - start
+    written = report["rows"] - report["failed_rows"]
+    report["elapsed_s"] = round(elapsed, 3)
+    report["rows_per_sec"] = round(written / elapsed, 1) if elapsed > 0 else 0.0
+    return report
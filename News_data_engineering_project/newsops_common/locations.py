@@ -0,0 +1,65 @@
+"""Canonical location entities.
+
+NER and keyword matching produce surface forms ("US", "U.S.", "USA", "United
+States") that all mean one place. ``LocationIndex`` maps every surface form the
+gazetteer knows (names and aliases) to its canonical place id, name and country
+code. ``canonicalize`` rewrites a whole column of location lists at once:
+distinct surface forms are resolved once, and duplicates that collapse onto the
+same place within an article are dropped. Names the gazetteer doesn't know are
+kept as they are, with an empty id and country code.
+"""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .gazetteer import get_gazetteer
+
+
+@dataclass(frozen=True)
+class CanonicalLocations:
+    names: list
+    ids: list
+    country_codes: list
+    stats: dict
+
+
+class LocationIndex:
+    """Surface form -> canonical place, built from a Gazetteer's name index."""
+
+    def __init__(self, gazetteer=None):
+        self.gazetteer = gazetteer or get_gazetteer()
+
+    def resolve(self, name):
+        """Returns (canonical name, place id, country code) for one surface form."""
+        place = self.gazetteer.lookup(name)
+        if place is None:
+            return str(name).strip(), "", ""
+        return place.name, place.id, place.country_code
+
+    def canonicalize(self, location_lists):
+        """Maps a column of location lists to canonical names, ids and country codes."""
+        rows = pd.Series(list(location_lists), dtype=object)
+        rows = rows.map(lambda locs: list(locs) if isinstance(locs, (list, tuple)) else [])
+        flat = rows.explode().dropna()
+        flat = flat[flat.astype(str).str.strip() != ""]
+
+        surface = pd.unique(flat.to_numpy())
+        resolved = {s: self.resolve(s) for s in surface}
+        frame = pd.DataFrame({
+            "row": flat.index,
+            "name": flat.map(lambda s: resolved[s][0]).to_numpy(),
+            "id": flat.map(lambda s: resolved[s][1]).to_numpy(),
+            "country_code": flat.map(lambda s: resolved[s][2]).to_numpy(),
+        })
+        frame = frame.drop_duplicates(["row", "name"])
+        grouped = frame.groupby("row", sort=False).agg(list).reindex(range(len(rows)))
+
+        def column(name):
+            return [v if isinstance(v, list) else [] for v in grouped[name]]
+
+        stats = {
+            "surface_forms": len(surface),
+            "canonical_locations": int(frame["name"].nunique()),
+            "known_locations": sum(1 for r in resolved.values() if r[1]),
+        }
+        return CanonicalLocations(column("name"), column("id"), column("country_code"), stats)
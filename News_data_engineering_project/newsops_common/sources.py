@@ -0,0 +1,204 @@
+"""Article sources for ingestion.
+
+Every source exposes ``get_news(category, country)`` and returns articles in the
+shape ``GNews.get_news`` does (``title``, ``description``, ``published date``,
+``url``, ``publisher: {href, title}``), so callers don't care where they came from.
+
+- ``gnews``: live Google News, optionally recording every payload as a fixture.
+- ``replay``: serves recorded GNews/RSS payloads from local files, throttled to a
+  configurable rate and multiplied by ``scale`` to synthesize large volumes.
+"""
+import glob
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def to_gnews_article(record):
+    """Normalizes a recorded article (GNews payload or a flattened snapshot row) to the GNews shape."""
+    publisher = record.get("publisher", {})
+    if not isinstance(publisher, dict):
+        publisher = {"href": "", "title": publisher or "Unknown"}
+    return {
+        "title": record.get("title", "No Title"),
+        "description": record.get("description", ""),
+        "published date": record.get("published date") or record.get("published_at"),
+        "url": record.get("url", ""),
+        "publisher": publisher,
+    }
+
+
+def parse_rss(path):
+    """Reads a Google News RSS document into GNews-shaped articles."""
+    articles = []
+    for item in ET.parse(path).getroot().iter("item"):
+        source = item.find("source")
+        articles.append({
+            "title": item.findtext("title", "No Title"),
+            "description": _TAGS.sub(" ", item.findtext("description", "")).strip(),
+            "published date": item.findtext("pubDate"),
+            "url": item.findtext("link", ""),
+            "publisher": {
+                "href": source.get("url", "") if source is not None else "",
+                "title": source.text if source is not None and source.text else "Unknown",
+            },
+        })
+    return articles
+
+
+class GNewsSource:
+    """Live Google News. With ``record_dir`` set, each payload is also saved as a replay fixture."""
+
+    name = "gnews"
+
+    def __init__(self, language="en", period=None, max_results=20, record_dir=None):
+        self.language = language
+        self.period = period
+        self.max_results = max_results
+        self.record_dir = record_dir
+        self._clients = {}
+        self._lock = threading.Lock()
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+
+    def _client(self, country):
+        with self._lock:
+            if country not in self._clients:
+                from gnews import GNews
+                self._clients[country] = GNews(language=self.language, country=country,
+                                               period=self.period, max_results=self.max_results)
+            return self._clients[country]
+
+    def get_news(self, category, country="US"):
+        articles = self._client(country).get_news(category)
+        if self.record_dir:
+            path = os.path.join(self.record_dir, f"{country}_{category}.json")
+            with open(path, "w") as f:
+                json.dump(articles, f, default=str)
+        return articles
+
+
+class ReplaySource:
+    """Serves recorded payloads from ``fixtures_dir`` instead of the network.
+
+    Fixtures are ``*.json`` files (a list of GNews articles, or snapshot rows with a
+    ``category`` field such as web_app/data/articles.json) and ``*.xml``/``*.rss``
+    Google News feeds. Files named ``<category>.json`` or ``<country>_<category>.json``
+    are served for that category; categories without a fixture get the whole pool.
+
+    ``scale`` serves each recorded article that many times, giving every synthetic
+    copy its own URL, title suffix and an older timestamp, so downstream dedup and
+    time bucketing see distinct articles. ``max_results`` caps articles per call,
+    ``rate`` caps articles per second across all threads, and ``latency_s`` adds a
+    fixed delay per call to mimic network round trips.
+    """
+
+    name = "replay"
+
+    def __init__(self, fixtures_dir, scale=1, max_results=None, rate=None, latency_s=0.0):
+        self.fixtures_dir = fixtures_dir
+        self.scale = max(1, int(scale))
+        self.max_results = max_results
+        self.rate = rate
+        self.latency_s = latency_s
+        self._throttle_lock = threading.Lock()
+        self._next_slot = time.monotonic()
+        self.by_category, self.pool = self._load(fixtures_dir)
+        logger.info(f"Replay source loaded {len(self.pool)} recorded articles from {fixtures_dir}")
+
+    @staticmethod
+    def _load(fixtures_dir):
+        by_category, pool = {}, []
+        paths = sorted(glob.glob(os.path.join(fixtures_dir, "*")))
+        if not paths:
+            raise FileNotFoundError(f"No replay fixtures found in {fixtures_dir}")
+        for path in paths:
+            stem, ext = os.path.splitext(os.path.basename(path))
+            if ext in (".xml", ".rss"):
+                records = parse_rss(path)
+            elif ext == ".json":
+                with open(path) as f:
+                    records = json.load(f)
+            else:
+                continue
+            if not isinstance(records, list):
+                continue
+            file_category = stem.split("_", 1)[-1]
+            for record in records:
+                # Skip anything that isn't an article, e.g. the snapshot's categories.json.
+                if not isinstance(record, dict) or "title" not in record:
+                    continue
+                article = to_gnews_article(record)
+                key = (record.get("category") or file_category).lower()
+                by_category.setdefault(key, []).append(article)
+                pool.append(article)
+        return by_category, pool
+
+    def _throttle(self, n):
+        if not self.rate:
+            return
+        with self._throttle_lock:
+            now = time.monotonic()
+            end = max(now, self._next_slot) + n / float(self.rate)
+            self._next_slot = end
+        # Sleep until this batch's share of the rate budget has elapsed.
+        if end > now:
+            time.sleep(end - now)
+
+    def synthesize(self, recorded):
+        """Yields ``scale`` distinct copies of every recorded article."""
+        for copy in range(self.scale):
+            for article in recorded:
+                if copy == 0:
+                    yield article
+                    continue
+                published = article.get("published date")
+                try:
+                    published = format_datetime(parsedate_to_datetime(published) - timedelta(minutes=copy))
+                except (TypeError, ValueError):
+                    published = format_datetime(datetime.utcnow() - timedelta(minutes=copy))
+                yield {
+                    **article,
+                    "title": f"{article['title']} #{copy}",
+                    "url": f"{article['url']}{'&' if '?' in article['url'] else '?'}replay={copy}",
+                    "published date": published,
+                }
+
+    def get_news(self, category, country="US"):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        recorded = self.by_category.get(category.lower()) or self.pool
+        articles = self.synthesize(recorded)
+        if self.max_results:
+            articles = itertools.islice(articles, self.max_results)
+        articles = list(articles)
+        self._throttle(len(articles))
+        return articles
+
+
+def make_source(config, max_results=20, period=None):
+    """Builds the source described by a settings block such as ``{"type": "replay", ...}``."""
+    config = config or {}
+    kind = config.get("type", "gnews")
+    if kind == "gnews":
+        return GNewsSource(period=period, max_results=max_results, record_dir=config.get("record_dir"))
+    if kind == "replay":
+        return ReplaySource(
+            config["fixtures_dir"],
+            scale=config.get("scale", 1),
+            max_results=config.get("max_results"),
+            rate=config.get("rate"),
+            latency_s=config.get("latency_s", 0.0),
+        )
+    raise ValueError(f"Unknown article source type: {kind}")
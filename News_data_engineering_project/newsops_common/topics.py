@@ -0,0 +1,142 @@
+"""Keyword topic classifier shared by the pipeline and the web snapshot builder.
+
+A taxonomy is an ordered list of topics, each with keywords that count as a hit
+when they occur anywhere in the lowercased text (so "politic" matches
+"political"). All keywords are compiled into one trie-shaped regex. A column is
+split into words once and the regex only scans the distinct words, whose hits
+are then summed per text, so cost grows with the text, not with the number of
+keywords; keywords containing spaces are found with one scan over the texts. Every text gets a score per topic (its share of keyword
+hits); the primary topic is the first topic in taxonomy order with any hit,
+which is how the original per-topic ``any()`` chains behaved.
+"""
+import hashlib
+import itertools
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TAXONOMY = [
+    {"id": 0, "label": "Technology", "keywords": ["tech", "ai", "digital", "cyber", "software"]},
+    {"id": 1, "label": "Business", "keywords": ["business", "market", "economy", "finance", "stock"]},
+    {"id": 2, "label": "Sports", "keywords": ["sport", "game", "player", "team", "match"]},
+    {"id": 3, "label": "Health", "keywords": ["health", "medical", "hospital", "doctor", "virus"]},
+    {"id": 4, "label": "Politics", "keywords": ["politic", "government", "election", "policy", "law"]},
+    {"id": 5, "label": "Science", "keywords": ["science", "space", "nasa", "research"]},
+]
+
+DEFAULT_TOPIC = (-1, "General")
+
+# Joins texts (or words) for a single scan; no keyword can contain it.
+_SEPARATOR = "\n"
+
+
+def _trie_pattern(words):
+    """Regex matching the longest of ``words`` that starts at the current position."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # An optional tail is tried first, so the longest keyword wins.
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class TopicClassifier:
+    """Classifies whole columns of text against a keyword taxonomy."""
+
+    def __init__(self, taxonomy=None, default=DEFAULT_TOPIC):
+        self.taxonomy = taxonomy or DEFAULT_TAXONOMY
+        self.default = tuple(default)
+        self.ids = [int(topic["id"]) for topic in self.taxonomy]
+        self.labels = [topic["label"] for topic in self.taxonomy]
+        self.version = hashlib.blake2b(json.dumps([self.taxonomy, self.default]).encode("utf-8"),
+                                       digest_size=8).hexdigest()
+
+        keywords = {}
+        for col, topic in enumerate(self.taxonomy):
+            for keyword in topic["keywords"]:
+                keyword = keyword.lower().strip()
+                if keyword and _SEPARATOR not in keyword:
+                    keywords.setdefault(keyword, set()).add(col)
+        if not keywords:
+            raise ValueError("Topic taxonomy has no keywords")
+        self.keywords = sorted(keywords)
+        # Single words can only occur inside one whitespace-separated word of the text.
+        self._word_scan = self._compile({k: c for k, c in keywords.items() if not any(ch.isspace() for ch in k)})
+        self._phrase_scan = self._compile({k: c for k, c in keywords.items() if any(ch.isspace() for ch in k)})
+
+    def _compile(self, keywords):
+        if not keywords:
+            return None
+        ordered = sorted(keywords)
+        # The scan only reports the longest keyword at each position; shorter keywords
+        # starting at the same position are prefixes of it, so credit those too.
+        hits = np.zeros((len(ordered), len(self.taxonomy)), dtype=np.float64)
+        for row, keyword in enumerate(ordered):
+            for other, cols in keywords.items():
+                if keyword.startswith(other):
+                    hits[row, list(cols)] += 1
+        pattern = re.compile("(?=(" + _trie_pattern(ordered) + "))")
+        return pattern, {keyword: row for row, keyword in enumerate(ordered)}, hits
+
+    def _scan(self, scan, chunks):
+        """Keyword hit counts per chunk, (len(chunks), n_topics), from one pass over the joined chunks."""
+        counts = np.zeros((len(chunks), len(self.taxonomy)), dtype=np.float64)
+        if scan is None or not chunks:
+            return counts
+        pattern, index, hits = scan
+        starts = np.cumsum([0] + [len(c) + 1 for c in chunks[:-1]])
+        positions, rows = [], []
+        for match in pattern.finditer(_SEPARATOR.join(chunks)):
+            positions.append(match.start())
+            rows.append(index[match.group(1)])
+        if positions:
+            np.add.at(counts, np.searchsorted(starts, positions, side="right") - 1, hits[rows])
+        return counts
+
+    def scores(self, texts):
+        """Returns an (n_texts, n_topics) array with each topic's share of keyword hits."""
+        texts = ["" if t is None else str(t).lower() for t in texts]
+        n = len(texts)
+        word_lists = [t.split() for t in texts]
+        doc_ids = np.repeat(np.arange(n), np.fromiter(map(len, word_lists), dtype=np.int64, count=n))
+        codes, vocabulary = pd.factorize(pd.Series(list(itertools.chain.from_iterable(word_lists)), dtype=object))
+
+        word_hits = self._scan(self._word_scan, list(vocabulary))
+        matched = word_hits.any(axis=1)[codes] if len(codes) else np.zeros(0, dtype=bool)
+        counts = self._scan(self._phrase_scan, [t.replace(_SEPARATOR, " ") for t in texts])
+        np.add.at(counts, doc_ids[matched], word_hits[codes[matched]])
+
+        totals = counts.sum(axis=1, keepdims=True)
+        np.divide(counts, totals, out=counts, where=totals > 0)
+        return counts
+
+    def classify(self, texts):
+        """Returns one ``(topic_id, label, {label: score})`` per text."""
+        scores = self.scores(texts)
+        rows, cols = np.nonzero(scores)
+        multi = [{} for _ in range(len(scores))]
+        for row, col, score in zip(rows.tolist(), cols.tolist(), scores[rows, cols].round(4).tolist()):
+            multi[row][self.labels[col]] = score
+        # Primary topic: the first topic in taxonomy order with a hit.
+        hit = scores > 0
+        first = np.where(hit.any(axis=1), hit.argmax(axis=1), -1).tolist()
+        return [(self.ids[col], self.labels[col], m) if col >= 0 else (self.default[0], self.default[1], m)
+                for col, m in zip(first, multi)]
+
+def load_taxonomy(settings):
+    """Taxonomy from a settings dict's ``topics.taxonomy``, falling back to the default."""
+    return (settings.get("topics") or {}).get("taxonomy") or DEFAULT_TAXONOMY
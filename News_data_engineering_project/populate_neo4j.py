@@ -1,63 +1,322 @@
-from neo4j import GraphDatabase
-from clickhouse_driver import Client
+"""Syncs the Neo4j graph from ClickHouse's ``news_articles``.
+
+Incremental mode (the default) keeps a watermark: the (version, url_hash) of the
+last row written, stored on a ``(:SyncState)`` node in the graph itself. A run
+reads only rows past the watermark, in keyset-ordered pages of ``--page-size``
+rows; the minmax index on ``version`` lets ClickHouse skip granules loaded
+before each page. Rows are written through the same batched ``UNWIND`` upsert
+as the pipeline, and the watermark advances after every page, so an
+interrupted sync resumes where it stopped. ``version`` comes from
+``processed_at``, so a reloaded (changed) article sorts past the watermark and
+is written again. The read starts ``--overlap-s`` before the watermark to pick
+up rows from loads that committed out of order; upserts are idempotent.
+
+``--full`` rebuilds from every row without clearing the graph first. Each
+article written in the run is tagged with the run's id. Only after every page
+succeeds are articles from earlier runs deleted, followed by publishers, topics
+and locations left without relationships. The graph stays queryable throughout.
+Articles removed from ClickHouse (for example by a TTL) only leave the graph on
+a full rebuild.
+
+``--bulk-export DIR`` is for first-time builds and recovery. It writes node and
+relationship CSVs in the ``neo4j-admin database import`` layout instead of
+running transactions:
+- Articles are streamed from ClickHouse sorted by URL, so the newest version of
+  each URL is kept without holding the table in memory.
+- Publishers, topics and locations are deduplicated by ``ExternalDistinct``,
+  which spills sorted runs to disk once it holds ``--distinct-buffer`` keys.
+- A ``SyncState`` node carries the watermark, so incremental syncs continue
+  from where the export ended.
+
+The import skips constraints. The first sync creates them.
+
+    python populate_neo4j.py [--full] [--page-size 5000] [--batch-size 2000]
+    python populate_neo4j.py --bulk-export /path/to/neo4j/import
+"""
+import argparse
+import csv
+import heapq
 import logging
+import os
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+from clickhouse_driver import Client
+from neo4j import GraphDatabase
+
+from newsops_common.graph import UPSERT_ARTICLES, article_rows, ensure_constraints, write_batches
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SYNC_STATE = "clickhouse.news_articles"
+
+_COLUMNS = ["version", "url_hash", "url", "title", "publisher", "sentiment", "published_at", "topic_label", "locations"]
+
+_PAGE_QUERY = f"""
+    SELECT {", ".join(_COLUMNS)}
+    FROM news_articles
+    WHERE version >= %(version)s AND (version, url_hash) > (%(version)s, %(url_hash)s)
+    ORDER BY version, url_hash
+    LIMIT %(limit)s
+"""
+
+
+def read_watermark(driver):
+    """(version, url_hash) of the last synced row, or (0, 0) before the first sync."""
+    with driver.session() as session:
+        record = session.run("MATCH (s:SyncState {name: $name}) RETURN s.version AS version, s.url_hash AS url_hash",
+                             name=SYNC_STATE).single()
+    if record is None or record["version"] is None:
+        return 0, 0
+    # url_hash is a UInt64 and can overflow Neo4j's signed integers, so it is stored as a string.
+    return int(record["version"]), int(record["url_hash"])
+
+
+def write_watermark(driver, version, url_hash):
+    with driver.session() as session:
+        session.run("""
+            MERGE (s:SyncState {name: $name})
+            SET s.version = $version, s.url_hash = $url_hash, s.updated_at = datetime()
+        """, name=SYNC_STATE, version=int(version), url_hash=str(url_hash)).consume()
+
+
+def pages(client, version, url_hash, page_size):
+    """Yields lists of rows past (version, url_hash), in order, ``page_size`` at a time."""
+    while True:
+        rows = client.execute(_PAGE_QUERY, {"version": version, "url_hash": url_hash, "limit": page_size})
+        if not rows:
+            return
+        yield rows
+        version, url_hash = rows[-1][0], rows[-1][1]
+        if len(rows) < page_size:
+            return
+
+
+def _delete_in_batches(driver, query, limit=10000, **params):
+    deleted = 0
+    while True:
+        with driver.session() as session:
+            count = session.run(query, limit=limit, **params).single()["deleted"]
+        deleted += count
+        if count < limit:
+            return deleted
+
+
+def sweep(driver, run):
+    """Deletes articles not written by ``run``, then nodes left without relationships."""
+    articles = _delete_in_batches(driver, """
+        MATCH (a:Article) WHERE a.sync_run IS NULL OR a.sync_run <> $run
+        WITH a LIMIT $limit
+        DETACH DELETE a
+        RETURN count(*) AS deleted
+    """, run=run)
+    orphans = _delete_in_batches(driver, """
+        MATCH (n) WHERE (n:Publisher OR n:Topic OR n:Location) AND NOT (n)--()
+        WITH n LIMIT $limit
+        DELETE n
+        RETURN count(*) AS deleted
+    """)
+    return articles, orphans
+
+
+def sync(client, driver, full=False, page_size=5000, batch_size=2000, overlap_s=600):
+    """Writes new and changed articles (every article with ``full``) to Neo4j; returns a summary dict."""
+    ensure_constraints(driver)
+    run = uuid.uuid4().hex if full else None
+    if full:
+        version, url_hash = 0, 0
+    else:
+        version, url_hash = read_watermark(driver)
+        if version and overlap_s > 0:
+            version, url_hash = max(0, version - int(overlap_s * 1000)), 0
+
+    summary = {"mode": "full" if full else "incremental", "rows": 0, "pages": 0, "failed_rows": 0}
+    start = time.monotonic()
+    for page in pages(client, version, url_hash, page_size):
+        frame = pd.DataFrame(page, columns=_COLUMNS)
+        report = write_batches(driver, UPSERT_ARTICLES, article_rows(frame), batch_size=batch_size,
+                               params={"run": run})
+        summary["pages"] += 1
+        summary["rows"] += report["rows"] - report["failed_rows"]
+        if report["failed_rows"]:
+            # Keep the watermark before this page so the next run retries it; a full run must not sweep.
+            summary["failed_rows"] += report["failed_rows"]
+            logger.error(f"Stopping sync: {report['failed_rows']} rows of page {summary['pages']} failed.")
+            break
+        write_watermark(driver, page[-1][0], page[-1][1])
+        elapsed = time.monotonic() - start
+        logger.info(f"Synced {summary['rows']} articles ({summary['rows'] / elapsed:.0f} rows/s).")
+
+    if full and not summary["failed_rows"]:
+        summary["deleted_articles"], summary["deleted_orphans"] = sweep(driver, run)
+    summary["elapsed_s"] = round(time.monotonic() - start, 3)
+    return summary
+
+
+class ExternalDistinct:
+    """Distinct strings in bounded memory: sorted runs are spilled to disk and merged at the end."""
+
+    def __init__(self, max_items=1_000_000, tmp_dir=None):
+        self.max_items = max_items
+        self.tmp_dir = tmp_dir
+        self._buffer = set()
+        self._runs = []
+
+    def add(self, key):
+        self._buffer.add(key)
+        if len(self._buffer) >= self.max_items:
+            self._spill()
+
+    def _spill(self):
+        run = tempfile.TemporaryFile("w+", newline="", encoding="utf-8", dir=self.tmp_dir)
+        csv.writer(run).writerows([key] for key in sorted(self._buffer))
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = set()
+
+    def __iter__(self):
+        """Yields every distinct key once, in sorted order; consumes the spilled runs."""
+        runs = [(row[0] for row in csv.reader(run)) for run in self._runs]
+        previous = None
+        try:
+            for key in heapq.merge(sorted(self._buffer), *runs):
+                if key != previous:
+                    yield key
+                    previous = key
+        finally:
+            for run in self._runs:
+                run.close()
+            self._runs, self._buffer = [], set()
+
+
+_EXPORT_QUERY = """
+    SELECT version, url_hash, url, title, publisher, sentiment, published_at, topic_label, locations
+    FROM news_articles
+    ORDER BY url_hash, url, version DESC
+"""
+
+# File name -> header, in the neo4j-admin import layout.
+_NODE_FILES = {
+    "Article": ("articles.csv", ["url:ID(Article)", "title", "sentiment:float", "published_at", "topic_label"]),
+    "Publisher": ("publishers.csv", ["name:ID(Publisher)"]),
+    "Topic": ("topics.csv", ["label:ID(Topic)"]),
+    "Location": ("locations.csv", ["name:ID(Location)"]),
+    "SyncState": ("sync_state.csv", ["name:ID(SyncState)", "version:long", "url_hash"]),
+}
+_RELATIONSHIP_FILES = {
+    "PUBLISHED": ("published.csv", [":START_ID(Publisher)", ":END_ID(Article)"]),
+    "BELONGS_TO": ("belongs_to.csv", [":START_ID(Article)", ":END_ID(Topic)"]),
+    "MENTIONS": ("mentions.csv", [":START_ID(Article)", ":END_ID(Location)"]),
+}
+
+
+def _text(value):
+    # One record per line keeps the import from needing --multiline-fields.
+    return str(value).replace("\r", " ").replace("\n", " ")
+
+
+def bulk_export(client, out_dir, distinct_buffer=1_000_000, block_size=10000):
+    """Writes the graph as neo4j-admin import CSVs under ``out_dir``; returns row counts per file."""
+    os.makedirs(out_dir, exist_ok=True)
+    handles = {name: open(os.path.join(out_dir, filename), "w", newline="", encoding="utf-8")
+               for name, (filename, _) in {**_NODE_FILES, **_RELATIONSHIP_FILES}.items()}
+    writers = {name: csv.writer(handle) for name, handle in handles.items()}
+    for name, (_, header) in {**_NODE_FILES, **_RELATIONSHIP_FILES}.items():
+        writers[name].writerow(header)
+    entities = {name: ExternalDistinct(distinct_buffer, tmp_dir=out_dir) for name in ("Publisher", "Topic", "Location")}
+    counts = {name: 0 for name in handles}
+    watermark = (0, 0)
+    previous_url = None
+    start = time.monotonic()
+    try:
+        rows = client.execute_iter(_EXPORT_QUERY, settings={"max_block_size": block_size})
+        for version, url_hash, url, title, publisher, sentiment, published_at, topic_label, locations in rows:
+            watermark = max(watermark, (version, url_hash))
+            # Rows come newest version first within each URL; older versions are skipped.
+            if url == previous_url:
+                continue
+            previous_url = url
+            url, publisher, topic_label = _text(url), _text(publisher), _text(topic_label)
+            writers["Article"].writerow([url, _text(title), sentiment, published_at, topic_label])
+            writers["PUBLISHED"].writerow([publisher, url])
+            writers["BELONGS_TO"].writerow([url, topic_label])
+            entities["Publisher"].add(publisher)
+            entities["Topic"].add(topic_label)
+            for location in dict.fromkeys(_text(name) for name in locations or []):
+                writers["MENTIONS"].writerow([url, location])
+                entities["Location"].add(location)
+                counts["MENTIONS"] += 1
+            counts["Article"] += 1
+            if counts["Article"] % 100000 == 0:
+                logger.info(f"Exported {counts['Article']} articles "
+                            f"({counts['Article'] / (time.monotonic() - start):.0f} rows/s).")
+        counts["PUBLISHED"] = counts["BELONGS_TO"] = counts["Article"]
+        for name, keys in entities.items():
+            for key in keys:
+                writers[name].writerow([key])
+                counts[name] += 1
+        writers["SyncState"].writerow([SYNC_STATE, watermark[0], str(watermark[1])])
+        counts["SyncState"] = 1
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return counts
+
+
+def import_command(out_dir, database="neo4j"):
+    """The neo4j-admin command that imports a ``bulk_export`` directory (with the server stopped)."""
+    nodes = [f"--nodes={label}={os.path.join(out_dir, filename)}" for label, (filename, _) in _NODE_FILES.items()]
+    relationships = [f"--relationships={rel_type}={os.path.join(out_dir, filename)}"
+                     for rel_type, (filename, _) in _RELATIONSHIP_FILES.items()]
+    return " ".join(["neo4j-admin database import full --overwrite-destination", *nodes, *relationships, database])
+
+
 def populate_neo4j():
+    parser = argparse.ArgumentParser(description="Sync the Neo4j graph from ClickHouse news_articles.")
+    parser.add_argument("--full", action="store_true", help="rebuild from every row, then remove stale nodes")
+    parser.add_argument("--page-size", type=int, default=5000, help="ClickHouse rows read per page")
+    parser.add_argument("--batch-size", type=int, default=2000, help="articles per Neo4j transaction")
+    parser.add_argument("--overlap-s", type=float, default=600, help="re-read this far behind the watermark")
+    parser.add_argument("--bulk-export", metavar="DIR", help="write neo4j-admin import CSVs instead of syncing")
+    parser.add_argument("--distinct-buffer", type=int, default=1_000_000,
+                        help="entity names held in memory before spilling to disk (--bulk-export)")
+    parser.add_argument("--clickhouse-host", default=os.environ.get("CLICKHOUSE_HOST", "localhost"))
+    parser.add_argument("--clickhouse-port", type=int, default=int(os.environ.get("CLICKHOUSE_PORT", 9000)))
+    parser.add_argument("--neo4j-uri", default=os.environ.get("NEO4J_URI", "bolt://localhost:7687"))
+    args = parser.parse_args()
+
+    if args.bulk_export:
+        clickhouse_client = Client(host=args.clickhouse_host, port=args.clickhouse_port)
+        try:
+            counts = bulk_export(clickhouse_client, args.bulk_export, distinct_buffer=args.distinct_buffer)
+        finally:
+            clickhouse_client.disconnect()
+        logger.info(f"Exported {counts} to {args.bulk_export}. Import with the server stopped:")
+        logger.info(import_command(args.bulk_export))
+        return
+
     # Connect to databases
-    neo4j_driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
-    clickhouse_client = Client(host='localhost', port=9000)
-    
-    # Get data from ClickHouse
-    articles = clickhouse_client.execute("""
-        SELECT title, publisher, sentiment, published_at, topic_label, locations, url
-        FROM news_articles 
-        LIMIT 50
-    """)
-    
-    logger.info(f"Retrieved {len(articles)} articles from ClickHouse")
-    
-    with neo4j_driver.session() as session:
-        # Clear existing data
-        session.run("MATCH (n) DETACH DELETE n")
-        
-        for article in articles:
-            title, publisher, sentiment, published_at, topic_label, locations, url = article
-            
-            # Create article and relationships
-            session.run("""
-                MERGE (p:Publisher {name: $publisher})
-                MERGE (a:Article {url: $url})
-                SET a.title = $title, 
-                    a.sentiment = $sentiment, 
-                    a.published_at = $published_at,
-                    a.topic_label = $topic_label
-                MERGE (p)-[:PUBLISHED]->(a)
-                
-                MERGE (t:Topic {label: $topic_label})
-                MERGE (a)-[:BELONGS_TO]->(t)
-            """, title=title, publisher=publisher, sentiment=sentiment, 
-                published_at=published_at, topic_label=topic_label, url=url)
-            
-            # Add locations
-            if locations:
-                for location in locations:
-                    session.run("""
-                        MATCH (a:Article {url: $url})
-                        MERGE (l:Location {name: $location})
-                        MERGE (a)-[:MENTIONS]->(l)
-                    """, url=url, location=location)
-    
-    # Verify data
-    with neo4j_driver.session() as session:
-        result = session.run("MATCH (n) RETURN labels(n)[0] as type, count(n) as count")
-        for record in result:
-            logger.info(f"{record['type']}: {record['count']} nodes")
-    
-    neo4j_driver.close()
+    neo4j_driver = GraphDatabase.driver(args.neo4j_uri, auth=(os.environ.get("NEO4J_USER", "neo4j"),
+                                                              os.environ.get("NEO4J_PASSWORD", "password")))
+    clickhouse_client = Client(host=args.clickhouse_host, port=args.clickhouse_port)
+    try:
+        summary = sync(clickhouse_client, neo4j_driver, full=args.full, page_size=args.page_size,
+                       batch_size=args.batch_size, overlap_s=args.overlap_s)
+        logger.info(f"Sync finished: {summary}")
+
+        # Verify data
+        with neo4j_driver.session() as session:
+            result = session.run("MATCH (n) RETURN labels(n)[0] as type, count(n) as count")
+            for record in result:
+                logger.info(f"{record['type']}: {record['count']} nodes")
+    finally:
+        neo4j_driver.close()
+        clickhouse_client.disconnect()
     logger.info("Neo4j population complete!")
 
+
 if __name__ == "__main__":
-    populate_neo4j()
\ No newline at end of file
+    populate_neo4j()
@@ -1,84 +1,94 @@
 
+import argparse
 import json
 import os
+import sys
 import pandas as pd
-from gnews import GNews
-from textblob import TextBlob
 from datetime import datetime
 import random
 
-def fetch_and_process_data():
-    print("Fetching news data from GNews...")
-    
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from newsops_common.locations import LocationIndex
+from newsops_common.sentiment import get_engine
+from newsops_common.sources import make_source
+from newsops_common.topics import TopicClassifier, load_taxonomy
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared_config', 'settings.json')
+
+def load_settings():
+    try:
+        with open(SETTINGS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def fetch_and_process_data(source_config=None):
     # Configuration matches project settings
     categories = ['Technology', 'Business', 'Sports', 'Health', 'Politics', 'Science']
-    google_news = GNews(max_results=10) # 10 per category = 60 articles
+    source = make_source(source_config, max_results=10) # 10 per category = 60 articles
+    print(f"Fetching news data from {source.name}...")
     
-    all_data = []
+    fetched = []
     
     for category in categories:
         try:
             print(f"Fetching {category}...")
-            news = google_news.get_news(category)
-            for article in news:
-                title = article.get('title', 'No Title')
-                desc = article.get('description', '')
-                
-                # Sentiment Analysis
-                blob = TextBlob(str(title) + " " + str(desc))
-                sentiment = blob.sentiment.polarity
-                subjectivity = blob.sentiment.subjectivity
-                
-                # Simple Broker Topic Extraction (from assets.py)
-                topic_label = 'General'
-                title_lower = str(title).lower()
-                if any(word in title_lower for word in ['tech', 'ai', 'digital', 'cyber', 'software']):
-                    topic_label = 'Technology'
-                elif any(word in title_lower for word in ['business', 'market', 'economy', 'finance', 'stock']):
-                    topic_label = 'Business'
-                elif any(word in title_lower for word in ['sport', 'game', 'player', 'team', 'match']):
-                    topic_label = 'Sports'
-                elif any(word in title_lower for word in ['health', 'medical', 'virus', 'doctor']):
-                    topic_label = 'Health'
-                elif any(word in title_lower for word in ['politic', 'law', 'election', 'government']):
-                    topic_label = 'Politics'
-                elif any(word in title_lower for word in ['science', 'space', 'nasa', 'research']):
-                    topic_label = 'Science'
+            news = source.get_news(category)
+            fetched.extend((category, article) for article in news)
+        except Exception as e:
+            print(f"Error fetching {category}: {e}")
 
-                # Breaking News Detection (Logic from assets.py)
-                breaking_keywords = ['breaking', 'urgent', 'alert', 'emergency', 'crisis', 'developing', 'live']
-                is_breaking = False
-                if any(k in str(title).lower() for k in breaking_keywords):
-                    is_breaking = True
-                if abs(sentiment) > 0.5: # Extreme sentiment
-                    is_breaking = True
+    # Sentiment Analysis, scored for the whole batch at once
+    texts = [str(article.get('title', 'No Title')) + " " + str(article.get('description', '')) for _, article in fetched]
+    polarities, subjectivities = get_engine().score(texts)
 
-                # Simple Location Extraction (Mocking SpaCy)
-                common_locs = ['US', 'USA', 'UK', 'China', 'Japan', 'India', 'Russia', 'Ukraine', 'Gaza', 'Israel', 'London', 'New York', 'California']
-                locations = [loc for loc in common_locs if loc in str(title) or loc in str(desc)]
+    # Topic Extraction, with the pipeline's taxonomy
+    classifier = TopicClassifier(load_taxonomy(load_settings()))
+    topics = classifier.classify([article.get('title', 'No Title') for _, article in fetched])
 
-                # FORCE DEMO: Make the first article Breaking News
-                if len(all_data) == 0:
-                    is_breaking = True
-                    sentiment = -0.8 # Force negative sentiment for drama
+    all_data = []
+    
+    for (category, article), sentiment, subjectivity, (_, topic_label, _) in zip(fetched, polarities, subjectivities, topics):
+        title = article.get('title', 'No Title')
+        desc = article.get('description', '')
+        sentiment = float(sentiment)
+        subjectivity = float(subjectivity)
+        
+        # Breaking News Detection (Logic from assets.py)
+        breaking_keywords = ['breaking', 'urgent', 'alert', 'emergency', 'crisis', 'developing', 'live']
+        is_breaking = False
+        if any(k in str(title).lower() for k in breaking_keywords):
+            is_breaking = True
+        if abs(sentiment) > 0.5: # Extreme sentiment
+            is_breaking = True
 
-                all_data.append({
-                    "title": title,
-                    "description": desc,
-                    "published_at": article.get('published date'),
-                    "url": article.get('url', ''),
-                    "publisher": article.get('publisher', {}).get('title', 'Unknown'),
-                    "category": category,
-                    "sentiment": sentiment,
-                    "subjectivity": subjectivity,
-                    "topic_label": topic_label,
-                    "is_breaking": is_breaking,
-                    "locations": locations
-                })
-        except Exception as e:
-            print(f"Error fetching {category}: {e}")
+        # Simple Location Extraction (Mocking SpaCy)
+        common_locs = ['US', 'USA', 'UK', 'China', 'Japan', 'India', 'Russia', 'Ukraine', 'Gaza', 'Israel', 'London', 'New York', 'California']
+        locations = [loc for loc in common_locs if loc in str(title) or loc in str(desc)]
+
+        # FORCE DEMO: Make the first article Breaking News
+        if len(all_data) == 0:
+            is_breaking = True
+            sentiment = -0.8 # Force negative sentiment for drama
+
+        all_data.append({
+            "title": title,
+            "description": desc,
+            "published_at": article.get('published date'),
+            "url": article.get('url', ''),
+            "publisher": article.get('publisher', {}).get('title', 'Unknown'),
+            "category": category,
+            "sentiment": sentiment,
+            "subjectivity": subjectivity,
+            "topic_label": topic_label,
+            "is_breaking": is_breaking,
+            "locations": locations
+        })
 
     df = pd.DataFrame(all_data)
+    if not df.empty:
+        # "US" and "USA" are the same place; store one canonical name per place.
+        df['locations'] = LocationIndex().canonicalize(df['locations']).names
     print(f"Total articles fetched: {len(df)}")
     
     # 1. Metrics.json
@@ -116,4 +126,18 @@ def fetch_and_process_data():
     print("Data successfully saved to data/metrics.json, data/articles.json, and data/categories.json")
 
 if __name__ == "__main__":
-    fetch_and_process_data()
+    parser = argparse.ArgumentParser(description="Build the web_app data snapshot.")
+    parser.add_argument("--source", choices=["gnews", "replay"], default="gnews")
+    parser.add_argument("--fixtures", help="Directory of recorded GNews/RSS payloads (replay only)")
+    parser.add_argument("--scale", type=int, default=1, help="Serve each recorded article this many times (replay only)")
+    parser.add_argument("--rate", type=float, help="Max articles per second (replay only)")
+    parser.add_argument("--record", help="Save live GNews payloads to this directory as replay fixtures")
+    args = parser.parse_args()
+
+    if args.source == "replay":
+        if not args.fixtures:
+            parser.error("--fixtures is required with --source replay")
+        config = {"type": "replay", "fixtures_dir": args.fixtures, "scale": args.scale, "rate": args.rate}
+    else:
+        config = {"type": "gnews", "record_dir": args.record}
+    fetch_and_process_data(config)